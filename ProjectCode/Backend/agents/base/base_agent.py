@@ -1,13 +1,14 @@
 import os
 from openai import OpenAI
 from dotenv import load_dotenv
+from utils.http_pool import get_http_client
 
 load_dotenv()
 
 class BaseAgent:
     def __init__(self, name):
         self.name = name
-        self.client = OpenAI(api_key = os.getenv("OPENROUTER_API_KEY"), base_url=os.getenv("OPENROUTER_URL"))
+        self.client = OpenAI(api_key = os.getenv("OPENROUTER_API_KEY"), base_url=os.getenv("OPENROUTER_URL"), http_client=get_http_client())
         print(f"\033[95m[BaseAgent]\033[0m {self.name} initialized")
 
 
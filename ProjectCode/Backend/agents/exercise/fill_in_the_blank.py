@@ -1,68 +1,52 @@
-import os
-import yaml
-from crewai import Agent, Task, Crew, LLM
 import json
 from utils.json_utils import parse_llm_json
+from core.llm_runner import kickoff, akickoff
 
 class FillInTheBlankAgent:
   def __init__(self, config_path):
     print("\033[94m[fill_in_the_blank_agent]\033[0m initialized")
     self.config_path = config_path
 
-  def refresh(self):
-    """Recrea Agent y Task frescos para evitar contaminación entre memorias."""
-    with open(os.path.join(self.config_path, "agents.yaml"), "r") as f:
-        agents_config = yaml.safe_load(f)
-
-    llm = LLM(
-        model="gpt-4o-mini",
-        temperature=0.5
-    )
+  def _request(self, data, validation, difficulty, content_to_avoid) -> dict:
+    """ Arguments of the kickoff/akickoff call. """
+    # A regeneration after a failed validation waits behind first attempts
+    priority = "retry" if validation != "" else None
+    if validation != "":
+      validation = f"\n!!!ATENCIÓN: ERROR CRÍTICO EN EL INTENTO ANTERIOR !!!\nEl revisor detectó el siguiente problema: '{validation}'\nDEBES corregir este error específicamente en tu nueva respuesta y asegurarte de que el JSON sea válido y fiel a la información original.\n"
 
-    agents_config["fill_in_the_blank_agent"]["llm"] = llm
+    return dict(config_path=self.config_path, agent_name="fill_in_the_blank_agent", task_name="fill_in_the_blank_task", inputs={
+      "informacion": data,
+      "feedback_ia": validation,
+      "dificultad": difficulty,
+      "content_to_avoid": content_to_avoid
+    }, parse=parse_llm_json, variant=difficulty, priority=priority)
 
-    self.agent = Agent(**agents_config["fill_in_the_blank_agent"])
+  def _finish(self, parsed: dict) -> dict:
+    print("\033[94m[fill_in_the_blank_agent]\033[0m Parsed: " + str(parsed))
 
-    with open(os.path.join(self.config_path, "tasks.yaml"), "r") as f:
-        tasks_config = yaml.safe_load(f)
+    # Post-procesado: reemplazar la palabra correct_answer por "_______" en la question
+    word = parsed.get("correct_answer", "")
+    question = parsed.get("question", "")
+    if word and word in question:
+      parsed["question"] = question.replace(word, "_______", 1)
+    parsed["type"] = "fill_in_the_blank"
 
-    tasks_config["fill_in_the_blank_task"]["agent"] = self.agent
-    self.task = Task(**tasks_config["fill_in_the_blank_task"])
+    return parsed
 
   def generate(self, data:dict, validation="", difficulty="media", content_to_avoid=""):
     print(f"\033[94m[fill_in_the_blank_agent]\033[0m Generating exercise")
-    self.refresh()
 
-    if validation != "":
-      validation = f"\n!!!ATENCIÓN: ERROR CRÍTICO EN EL INTENTO ANTERIOR !!!\nEl revisor detectó el siguiente problema: '{validation}'\nDEBES corregir este error específicamente en tu nueva respuesta y asegurarte de que el JSON sea válido y fiel a la información original.\n"
-    
     try:
-        crew = Crew(
-        agents=[self.agent],
-        tasks=[self.task],
-        verbose=False,
-        memory=False
-        )
+        return self._finish(kickoff(**self._request(data, validation, difficulty, content_to_avoid)))
+    except Exception as e:
+        print(f"\033[94m[fill_in_the_blank_agent]\033[0m Error: {e}")
+        return {}
 
-        result = crew.kickoff(inputs={
-        "informacion": data,
-        "feedback_ia": validation,
-        "dificultad": difficulty,
-        "content_to_avoid": content_to_avoid
-        })
-        
-        print("\033[94m[fill_in_the_blank_agent]\033[0m Raw: " + str(result.raw))
-        result = result.raw.strip()
-        parsed = parse_llm_json(result)
+  async def agenerate(self, data:dict, validation="", difficulty="media", content_to_avoid=""):
+    print(f"\033[94m[fill_in_the_blank_agent]\033[0m Generating exercise (async)")
 
-        # Post-procesado: reemplazar la palabra correct_answer por "_______" en la question
-        word = parsed.get("correct_answer", "")
-        question = parsed.get("question", "")
-        if word and word in question:
-            parsed["question"] = question.replace(word, "_______", 1)
-        parsed["type"] = "fill_in_the_blank"
-        
-        return parsed
+    try:
+        return self._finish(await akickoff(**self._request(data, validation, difficulty, content_to_avoid)))
     except Exception as e:
         print(f"\033[94m[fill_in_the_blank_agent]\033[0m Error: {e}")
         return {}
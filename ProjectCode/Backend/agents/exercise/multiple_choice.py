@@ -1,60 +1,46 @@
-import os
-import yaml
-from crewai import Agent, Task, Crew, LLM
 import json
 from utils.json_utils import parse_llm_json
+from core.llm_runner import kickoff, akickoff
 
 class MultipleChoiceAgent:
   def __init__(self, config_path):
     print("\033[94m[multiple_choice_agent]\033[0m initialized")
     self.config_path = config_path
 
-  def refresh(self):
-    """Recrea Agent y Task frescos para evitar contaminación entre memorias."""
-    with open(os.path.join(self.config_path, "agents.yaml"), "r") as f:
-        agents_config = yaml.safe_load(f)
-
-    llm = LLM(
-        model="gpt-4o-mini",
-        temperature=0.5
-    )
-    agents_config["multiple_choice_agent"]["llm"] = llm
+  def _request(self, data, validation, difficulty, content_to_avoid) -> dict:
+    """ Arguments of the kickoff/akickoff call. """
+    # A regeneration after a failed validation waits behind first attempts
+    priority = "retry" if validation != "" else None
+    if validation != "":
+      validation = "COSAS A MEJORAR: " + validation
 
-    self.agent = Agent(**agents_config["multiple_choice_agent"])
+    return dict(config_path=self.config_path, agent_name="multiple_choice_agent", task_name="multiple_choice_task", inputs={
+      "informacion": data,
+      "feedback_ia": validation,
+      "dificultad": difficulty,
+      "content_to_avoid": content_to_avoid
+    }, parse=parse_llm_json, variant=difficulty, priority=priority)
 
-    with open(os.path.join(self.config_path, "tasks.yaml"), "r") as f:
-        tasks_config = yaml.safe_load(f)
+  def _finish(self, parsed: dict) -> dict:
+    print("\033[94m[multiple_choice_agent]\033[0m Parsed: " + str(parsed))
+    parsed["type"] = "multiple_choice"
 
-    tasks_config["multiple_choice_task"]["agent"] = self.agent
-    self.task = Task(**tasks_config["multiple_choice_task"])
+    return parsed
 
   def generate(self, data:dict, validation="", difficulty="media", content_to_avoid=""):
     print(f"\033[94m[multiple_choice_agent]\033[0m Generating exercise")
-    self.refresh()
-    if validation != "":
-      validation = "COSAS A MEJORAR: " + validation
-      
+
+    try:
+        return self._finish(kickoff(**self._request(data, validation, difficulty, content_to_avoid)))
+    except Exception as e:
+        print(f"\033[94m[multiple_choice_agent]\033[0m Error: {e}")
+        return {}
+
+  async def agenerate(self, data:dict, validation="", difficulty="media", content_to_avoid=""):
+    print(f"\033[94m[multiple_choice_agent]\033[0m Generating exercise (async)")
+
     try:
-        crew = Crew(
-        agents=[self.agent],
-        tasks=[self.task],
-        verbose=False,
-        memory=False
-        )
-
-        result = crew.kickoff(inputs={
-        "informacion": data,
-        "feedback_ia": validation,
-        "dificultad": difficulty,
-        "content_to_avoid": content_to_avoid
-        })
-
-        print("\033[94m[multiple_choice_agent]\033[0m Raw: " + str(result.raw))
-        result = result.raw.strip()
-        parsed = parse_llm_json(result)
-        parsed["type"] = "multiple_choice"
-
-        return parsed
+        return self._finish(await akickoff(**self._request(data, validation, difficulty, content_to_avoid)))
     except Exception as e:
         print(f"\033[94m[multiple_choice_agent]\033[0m Error: {e}")
         return {}
@@ -1,65 +1,51 @@
-import os
-import yaml
-from crewai import Agent, Task, Crew, LLM
 import json
 from utils.json_utils import parse_llm_json
+from core.config_registry import ConfigRegistry
+from core.llm_runner import kickoff, akickoff
 
 class CorrectorAgent:
     def __init__(self, config_path):
         print("\033[95m[corrector]\033[0m initialized")
         self.config_path = config_path
 
-    def refresh(self):
-        """Recrea Agent y Task frescos para evitar contaminación entre memorias."""
-        with open(os.path.join(self.config_path, "agents.yaml"), "r") as f:
-            agents_config = yaml.safe_load(f)
-
-        llm = LLM(
-            model="gpt-4o-mini",
-            temperature=0
-        )
-
-        agents_config["corrector_agent"]["llm"] = llm
-
-        self.agent = Agent(**agents_config["corrector_agent"])
-
-        with open(os.path.join(self.config_path, "tasks.yaml"), "r") as f:
-            tasks_config = yaml.safe_load(f)
-
+    def _request(self, user_answer: str, correct_answer: str) -> dict:
+        """ Arguments of the kickoff/akickoff call (None if the task is missing). """
         task_name = "corrector_task"
-        if task_name not in tasks_config:
-             # Fallback simple si no existe la específica
-             print(f"\033[95m[corrector_agent]\033[0m Advertencia: No existe la tarea {task_name}")
-             return False
+        if not ConfigRegistry.get(self.config_path).has_task(task_name):
+            print(f"\033[95m[corrector_agent]\033[0m Advertencia: No existe la tarea {task_name}")
+            return None
 
-        tasks_config[task_name]["agent"] = self.agent
-        self.task = Task(**tasks_config[task_name])
-        return True
+        return dict(config_path=self.config_path, agent_name="corrector_agent", task_name=task_name, inputs={
+            "correct_answer": correct_answer,
+            "user_answer": user_answer
+        }, parse=parse_llm_json)
 
     def correct_exercise(self, user_answer: str, correct_answer:str):
         print("\033[95m[corrector]\033[0m Validating exercises")
 
         # Call the agent
-        if not self.refresh():
+        request = self._request(user_answer, correct_answer)
+        if request is None:
             return {"status": "error", "Analysis": f"No se encontró la tarea"}
-        
+
         try:
-            crew = Crew(
-                agents=[self.agent],
-                tasks=[self.task],
-                verbose=False,
-                memory=False
-            )
+            parsed = kickoff(**request)
+            print("\033[95m[corrector]\033[0m Parsed: " + str(parsed))
+            return parsed
+        except Exception as e:
+            print(f"\033[95m[corrector]\033[0m Error: {e}")
+            return {"status": "error", "Analysis": "Error en el proceso de corrección."}
 
-            result = crew.kickoff(inputs={
-                "correct_answer": correct_answer,
-                "user_answer": user_answer
-            })
+    async def acorrect_exercise(self, user_answer: str, correct_answer:str):
+        print("\033[95m[corrector]\033[0m Validating exercises (async)")
 
-            print("\033[95m[corrector]\033[0m Raw: " + str(result.raw))
-            result = result.raw.strip()
-            parsed = parse_llm_json(result)
+        request = self._request(user_answer, correct_answer)
+        if request is None:
+            return {"status": "error", "Analysis": f"No se encontró la tarea"}
 
+        try:
+            parsed = await akickoff(**request)
+            print("\033[95m[corrector]\033[0m Parsed: " + str(parsed))
             return parsed
         except Exception as e:
             print(f"\033[95m[corrector]\033[0m Error: {e}")
@@ -0,0 +1,127 @@
+import json
+import threading
+import unicodedata
+
+BLANK = "_______"
+
+# Number of events expected in an ordering exercise per difficulty (see ordering_task)
+ORDERING_SIZES = {"fácil": (3, 3), "media": (4, 4), "difícil": (5, 6)}
+
+
+def _normalize(text) -> str:
+    """ Lower-case, accent-free, single-spaced version of a text for literal comparisons. """
+    if not isinstance(text, str):
+        text = json.dumps(text, ensure_ascii=False)
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.casefold().split())
+
+
+def _error(analysis: str) -> dict:
+    return {"status": "error", "Analysis": analysis}
+
+
+# _______________ Rules per exercise type _______________
+def check_fill_in_the_blank(exercise: dict, original_information) -> dict:
+    question = exercise.get("question")
+    answer = exercise.get("correct_answer")
+
+    if not isinstance(question, str) or BLANK not in question:
+        return _error(f"La pregunta debe contener el hueco '{BLANK}' en lugar de la palabra oculta.")
+    if not isinstance(answer, str) or not answer.strip():
+        return _error("'correct_answer' debe ser una palabra no vacía.")
+    if _normalize(answer) not in _normalize(original_information):
+        return _error(f"La respuesta '{answer}' no aparece en la información original; elige una palabra que exista literalmente en el texto.")
+    return None
+
+
+def check_multiple_choice(exercise: dict, original_information) -> dict:
+    options = exercise.get("options")
+    answer = exercise.get("correct_answer")
+
+    if not isinstance(options, list) or len(options) < 2:
+        return _error("'options' debe ser un array de al menos 2 opciones.")
+    if any(not isinstance(o, str) or not o.strip() for o in options):
+        return _error("Todas las opciones deben ser textos no vacíos.")
+    if len({_normalize(o) for o in options}) != len(options):
+        return _error("Hay opciones repetidas; todas las opciones deben ser distintas.")
+
+    if isinstance(answer, str) and answer.strip().isdigit():
+        answer = int(answer.strip())
+    if isinstance(answer, bool) or not isinstance(answer, int):
+        return _error("'correct_answer' debe ser el ÍNDICE (entero empezando en 0) de la opción correcta.")
+    if not 0 <= answer < len(options):
+        return _error(f"'correct_answer' = {answer} está fuera de rango; debe estar entre 0 y {len(options) - 1}.")
+    return None
+
+
+def check_ordering(exercise: dict, original_information) -> dict:
+    options = exercise.get("options")
+    answer = exercise.get("correct_answer")
+
+    if not isinstance(options, list) or not isinstance(answer, list):
+        return _error("'options' y 'correct_answer' deben ser arrays de frases.")
+    if any(not isinstance(o, str) or not o.strip() for o in options + answer):
+        return _error("Todas las frases deben ser textos no vacíos.")
+    if len(set(options)) != len(options):
+        return _error("Hay frases repetidas en 'options'.")
+    if sorted(options) != sorted(answer):
+        return _error("'correct_answer' debe contener exactamente las mismas frases que 'options' (carácter por carácter), solo que ordenadas.")
+
+    sizes = ORDERING_SIZES.get(exercise.get("difficulty"))
+    if sizes and not sizes[0] <= len(options) <= sizes[1]:
+        expected = str(sizes[0]) if sizes[0] == sizes[1] else f"entre {sizes[0]} y {sizes[1]}"
+        return _error(f"Para la dificultad '{exercise.get('difficulty')}' debe haber {expected} frases, hay {len(options)}.")
+    return None
+
+
+RULES = {
+    "fill_in_the_blank": check_fill_in_the_blank,
+    "multiple_choice": check_multiple_choice,
+    "ordering": check_ordering,
+}
+
+
+class RuleEngine:
+    """
+    Deterministic pre-validation run before the LLM verificador.
+
+    Catches mechanical errors locally and returns the same {"status", "Analysis"}
+    shape as the verificador, so the retry loop can feed the analysis back to the
+    generator. Every rejection is one LLM validation saved.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {"checked": 0, "passed": 0, "llm_validations_saved": 0}
+        self.rejected_by_type = {}
+
+    def check(self, exercise: dict, original_information) -> dict:
+        """ Returns an error verdict if a hard rule fails, None if the exercise must go to the LLM. """
+        exercise_type = exercise.get("type")
+        rule = RULES.get(exercise_type)
+        verdict = rule(exercise, original_information) if rule else None
+
+        with self._lock:
+            self.counters["checked"] += 1
+            if verdict is None:
+                self.counters["passed"] += 1
+            else:
+                self.counters["llm_validations_saved"] += 1
+                self.rejected_by_type[exercise_type] = self.rejected_by_type.get(exercise_type, 0) + 1
+
+        return verdict
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+            stats["rejected_by_type"] = dict(self.rejected_by_type)
+        return stats
+
+
+_engine = RuleEngine()
+
+
+def get_rule_engine() -> RuleEngine:
+    """ Returns the process-wide rule engine (its counters feed /api/metrics). """
+    return _engine
@@ -1,73 +1,152 @@
-import os
-import yaml
-from crewai import Agent, Task, Crew, LLM
 import json
-from utils.json_utils import parse_llm_json
+from utils.json_utils import parse_llm_json, parse_llm_json_array
+from core.config_registry import ConfigRegistry
+from core.llm_runner import kickoff, akickoff
+from agents.validation.rules import get_rule_engine
 
 class VerificadorAgent:
     def __init__(self, config_path):
         print("\033[95m[verificador_agent]\033[0m initialized")
         self.config_path = config_path
 
-    def refresh(self, exercise_type):
-        """Recrea Agent y Task frescos para evitar contaminación entre memorias."""
-        with open(os.path.join(self.config_path, "agents.yaml"), "r") as f:
-            agents_config = yaml.safe_load(f)
-
-        llm = LLM(
-            model="gpt-4o-mini",
-            temperature=0
-        )
+    def precheck(self, exercise: dict, original_information, structure: dict):
+        """ Local checks (structure + deterministic rules). Returns an error verdict or None if the LLM must decide. """
+        # First thing verify the structure
+        for key in structure:
+            if key not in exercise:
+                print(f"\033[95m[verificador_agent]\033[0m Error: Falta el apartado llamado {key}")
+                return {"status": "error", "Analysis": f"Estructura incorrecta, falta el apartado llamado {key}"}
 
-        agents_config["validator_agent"]["llm"] = llm
+        # Then the deterministic rules: a hard failure skips the LLM call
+        verdict = get_rule_engine().check(exercise, original_information)
+        if verdict is not None:
+            print(f"\033[95m[verificador_agent]\033[0m Rejected locally: {verdict['Analysis']}")
+            return verdict
 
-        self.agent = Agent(**agents_config["validator_agent"])
+        return None
 
-        with open(os.path.join(self.config_path, "tasks.yaml"), "r") as f:
-            tasks_config = yaml.safe_load(f)
+    def _validate_request(self, exercise: dict, original_information: str, structure: dict):
+        """ Returns (verdict, None) when no LLM call is needed, else (None, kickoff arguments). """
+        verdict = self.precheck(exercise, original_information, structure)
+        if verdict is not None:
+            return verdict, None
 
+        # Call the agent
+        exercise_type = exercise.get("type", "fill_in_the_blank")
         task_name = f"validate_{exercise_type}_task"
-        if task_name not in tasks_config:
-             # Fallback simple si no existe la específica
-             print(f"\033[95m[verificador_agent]\033[0m Advertencia: No existe la tarea {task_name}")
-             return False
+        if not ConfigRegistry.get(self.config_path).has_task(task_name):
+            print(f"\033[95m[verificador_agent]\033[0m Advertencia: No existe la tarea {task_name}")
+            return {"status": "error", "Analysis": f"No se encontró una tarea de validación para {exercise_type}"}, None
 
-        tasks_config[task_name]["agent"] = self.agent
-        self.task = Task(**tasks_config[task_name])
-        return True
+        return None, dict(config_path=self.config_path, agent_name="validator_agent", task_name=task_name, inputs={
+            "ejercicio": json.dumps(exercise, ensure_ascii=False),
+            "informacion_original": original_information
+        }, parse=parse_llm_json)
 
     def validate(self, exercise: dict, original_information: str, structure:dict):
         print("\033[95m[verificador_agent]\033[0m Validating exercises")
 
-        # First thing verify the structure
-        for key in structure:
-            if key not in exercise:
-                print(f"\033[95m[verificador_agent]\033[0m Error: Falta el apartado llamado {key}")
-                return {"status": "error", "Analysis": f"Estructura incorrecta, falta el apartado llamado {key}"}
+        verdict, request = self._validate_request(exercise, original_information, structure)
+        if verdict is not None:
+            return verdict
 
-        # Call the agent
-        exercise_type = exercise.get("type", "fill_in_the_blank")
-        if not self.refresh(exercise_type):
-            return {"status": "error", "Analysis": f"No se encontró una tarea de validación para {exercise_type}"}
-        
         try:
-            crew = Crew(
-                agents=[self.agent],
-                tasks=[self.task],
-                verbose=False,
-                memory=False
-            )
-
-            result = crew.kickoff(inputs={
-                "ejercicio": json.dumps(exercise, ensure_ascii=False),
-                "informacion_original": original_information
-            })
-
-            print("\033[95m[verificador_agent]\033[0m Raw: " + str(result.raw))
-            result = result.raw.strip()
-            parsed = parse_llm_json(result)
+            parsed = kickoff(**request)
+            print("\033[95m[verificador_agent]\033[0m Parsed: " + str(parsed))
+            return parsed
+        except Exception as e:
+            print(f"\033[95m[verificador_agent]\033[0m Error: {e}")
+            return {"status": "error", "Analysis": "Error en el proceso de validación."}
+
+    async def avalidate(self, exercise: dict, original_information: str, structure:dict):
+        print("\033[95m[verificador_agent]\033[0m Validating exercises (async)")
 
+        verdict, request = self._validate_request(exercise, original_information, structure)
+        if verdict is not None:
+            return verdict
+
+        try:
+            parsed = await akickoff(**request)
+            print("\033[95m[verificador_agent]\033[0m Parsed: " + str(parsed))
             return parsed
         except Exception as e:
             print(f"\033[95m[verificador_agent]\033[0m Error: {e}")
             return {"status": "error", "Analysis": "Error en el proceso de validación."}
+
+    def _batch_request(self, items: list, pending: list) -> dict:
+        """ Arguments of the single kickoff/akickoff call that validates every pending item. """
+        batch = [{
+            "index": idx,
+            "type": items[idx][0].get("type"),
+            "ejercicio": items[idx][0],
+            "informacion_original": items[idx][1]
+        } for idx in pending]
+
+        return dict(config_path=self.config_path, agent_name="validator_agent", task_name="validate_batch_task", inputs={
+            "ejercicios": json.dumps(batch, ensure_ascii=False)
+        }, parse=parse_llm_json_array)
+
+    def _merge_batch(self, parsed: list, verdicts: list, pending: list):
+        """ Puts the verdicts of the batch answer in the slot of their item. """
+        print("\033[95m[verificador_agent]\033[0m Parsed: " + str(parsed))
+
+        by_index = {item.get("index"): item for item in parsed if isinstance(item, dict)}
+        for position, idx in enumerate(pending):
+            # Trust the "index" field, fall back to the position in the array
+            verdict = by_index.get(idx)
+            if verdict is None and position < len(parsed) and isinstance(parsed[position], dict):
+                verdict = parsed[position]
+            verdicts[idx] = verdict if verdict is not None else {"status": "error", "Analysis": "El revisor no devolvió un veredicto para este ejercicio."}
+
+    def validate_batch(self, items: list):
+        """
+        Validates several exercises with a single LLM call.
+
+        `items` is a list of (exercise, original_information, structure) tuples.
+        Returns one {"status", "Analysis"} verdict per item, in the same order.
+        Items rejected by the local checks never reach the LLM.
+        """
+        print(f"\033[95m[verificador_agent]\033[0m Validating {len(items)} exercises in batch")
+
+        verdicts = [self.precheck(exercise, information, structure) for exercise, information, structure in items]
+        pending = [idx for idx, verdict in enumerate(verdicts) if verdict is None]
+
+        if len(pending) == 1:
+            # A single exercise uses its own (more detailed) validation task
+            idx = pending[0]
+            verdicts[idx] = self.validate(*items[idx])
+            return verdicts
+        if not pending:
+            return verdicts
+
+        try:
+            self._merge_batch(kickoff(**self._batch_request(items, pending)), verdicts, pending)
+        except Exception as e:
+            print(f"\033[95m[verificador_agent]\033[0m Error: {e}")
+            for idx in pending:
+                verdicts[idx] = {"status": "error", "Analysis": "Error en el proceso de validación."}
+
+        return verdicts
+
+    async def avalidate_batch(self, items: list):
+        """ Async version of validate_batch. """
+        print(f"\033[95m[verificador_agent]\033[0m Validating {len(items)} exercises in batch (async)")
+
+        verdicts = [self.precheck(exercise, information, structure) for exercise, information, structure in items]
+        pending = [idx for idx, verdict in enumerate(verdicts) if verdict is None]
+
+        if len(pending) == 1:
+            idx = pending[0]
+            verdicts[idx] = await self.avalidate(*items[idx])
+            return verdicts
+        if not pending:
+            return verdicts
+
+        try:
+            self._merge_batch(await akickoff(**self._batch_request(items, pending)), verdicts, pending)
+        except Exception as e:
+            print(f"\033[95m[verificador_agent]\033[0m Error: {e}")
+            for idx in pending:
+                verdicts[idx] = {"status": "error", "Analysis": "Error en el proceso de validación."}
+
+        return verdicts
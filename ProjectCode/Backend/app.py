@@ -1,15 +1,44 @@
-from flask import Flask, request, jsonify
+from flask import Blueprint, Flask, Response, current_app, request, jsonify
 from flask_cors import CORS
+import json
+import os
+import queue
+import threading
 import database.db as db
-from services.exercise_service import ExerciseService
+from services.exercise_service import get_exercise_service
+from services.job_queue import JobQueue, QueueFull
+from core.llm_cache import get_cache
+from core.selection_cache import get_selection_cache
+from core.novelty import get_novelty_index
+from core.prompt_compiler import get_prompt_stats
+from core.llm_scheduler import get_scheduler
+from core.backend_router import get_router
+from core.deadline import Deadline, budget_for
+from agents.validation.rules import get_rule_engine
+from utils import answer_matcher, http_pool
+from core import llm_runner
+from utils.answer_matcher import match_answer, CORRECT, INCORRECT
 
 # ______________________________________ API END Points ______________________________________
 
-print("\033[42m[INFO] Server initialized\033[0m")
-app = Flask(__name__)
-CORS(app)
+api = Blueprint("api", __name__)
 
-@app.route('/api/excercise_correction', methods=['POST'])
+def run_generation_job(memory_data):
+    """ Runs one /api/jobs/generate_exercise job, same result as /api/generate_exercise. """
+    service = get_exercise_service()
+    # The latency budget starts when a worker picks the job, not while it waits in the queue
+    deadline = Deadline(budget_for("generate_exercise", memory_data.get("latency_budget_ms")))
+    try:
+        return service.generate(memory_data.get('user_id'), memory_data['title'], memory_data['user_description'], memory_data.get("ai_analysis", {}), deadline=deadline, selector=memory_data.get("selector"), memory_id=memory_data.get("memory_id"))
+    except Exception as e:
+        print(f"\033[91m[app]\033[0m Error generating exercises: {e}")
+        print(f"\033[91m[app]\033[0m Generating fallback exercises:")
+        return service.generate_fallback_exercises(memory_data, count=3)
+
+# Longest a GET /api/jobs/<id>?wait= may hold the connection
+JOB_MAX_WAIT_S = 30
+
+@api.route('/api/excercise_correction', methods=['POST'])
 def excercise_correction_endpoint():
     """
     Endpoint to correct cognitive exercises from memory data.
@@ -49,16 +78,13 @@ def excercise_correction_endpoint():
         print(f"\033[91m[app]\033[0m Error updating user stats: {e}")
         return jsonify({"error": "Could not update user stats."}), 500
 
-@app.route('/api/excercise_correction/fill_in_the_blank', methods=['POST'])
+@api.route('/api/excercise_correction/fill_in_the_blank', methods=['POST'])
 def fill_in_the_blank_correction_endpoint():
     """
     Endpoint to correct the fill in the blank exercise using an agent
     """
     print("\033[91m[app]\033[0m fill_in_the_blank_correction_endpoint")
 
-    # --- Inicializar el service una vez por llamada ---
-    service = ExerciseService()
-
     # --- Request Input validation ---
     if not request.is_json:
         return jsonify({"error": "Request must be JSON"}), 400
@@ -82,12 +108,16 @@ def fill_in_the_blank_correction_endpoint():
     
     # --- Exercise correction ---
 
-    # Si la respuesta es la palabra exacta
-    if user_answer == correct_answer:
+    # Primero el comparador local: tildes, mayúsculas, artículos, typos, plurales y género
+    verdict = match_answer(user_answer, correct_answer)
+    if verdict == CORRECT:
         return jsonify({"status": "correct"}), 200
+    if verdict == INCORRECT:
+        return jsonify({"status": "incorrect", "feedback": "La respuesta no coincide con la palabra del recuerdo."}), 200
 
-    # Si la respuesta no es tal cual la palabra exacta, comprobar con agente de ai si se parece a la original
-    result = service.correct_fill_in_the_blank(user_answer, correct_answer)
+    # Caso dudoso (posible sinónimo): comprobar con agente de ai si se parece a la original
+    deadline = Deadline(budget_for("fill_in_the_blank_correction", exercise_data.get("latency_budget_ms")))
+    result = get_exercise_service().correct_fill_in_the_blank(user_answer, correct_answer, deadline=deadline)
     status = result.get('status')
 
     if status == "ok":
@@ -96,15 +126,14 @@ def fill_in_the_blank_correction_endpoint():
         feedback_msg = result.get('analysis', result.get('Analysis', ''))
         return jsonify({"status": "incorrect", "feedback": feedback_msg}), 200
 
-@app.route('/api/generate_exercise', methods=['POST'])
+@api.route('/api/generate_exercise', methods=['POST'])
 def generate_exercise_endpoint():
     """
     Endpoint to generate cognitive exercises from memory data.
     """
     print("\033[91m[app]\033[0m generate_exercise_endpoint")
 
-    # --- Inicializar el service una vez por llamada ---
-    service = ExerciseService()
+    service = get_exercise_service()
 
     # --- Request Input validation ---
     if not request.is_json:
@@ -119,10 +148,13 @@ def generate_exercise_endpoint():
         }), 400
 
     # --- Exercise generation logic ---
+    # Latency budget of this request: per-endpoint default, overridable with "latency_budget_ms"
+    deadline = Deadline(budget_for("generate_exercise", memory_data.get("latency_budget_ms")))
+
     try:
-        exercise_set = service.generate(user_id, memory_data['title'], memory_data['user_description'], memory_data.get("ai_analysis", {}))
-        
-        exercise_set = {"exercises": exercise_set}
+        # {"exercises": [...], "slots": [provenance + timing per slot], "timing": {...}}
+        # "selector": "local" skips the selector LLM call (core/local_selector.py)
+        exercise_set = service.generate(user_id, memory_data['title'], memory_data['user_description'], memory_data.get("ai_analysis", {}), deadline=deadline, selector=memory_data.get("selector"), memory_id=memory_data.get("memory_id"))
 
         print("\033[91m[app]\033[0m Answer: " + str(exercise_set) + " | Type: " + str(type(exercise_set)))
         return jsonify(exercise_set)
@@ -132,7 +164,189 @@ def generate_exercise_endpoint():
         print(f"\033[91m[app]\033[0m Generating fallback exercises:")
         return jsonify(service.generate_fallback_exercises(memory_data, count=3))
 
-@app.route('/api/test', methods=['GET'])
+@api.route('/api/generate_exercise/stream', methods=['POST'])
+def generate_exercise_stream_endpoint():
+    """
+    Streaming variant of /api/generate_exercise.
+
+    Sends one JSON event per line (NDJSON), or Server-Sent Events when the client
+    sends "Accept: text/event-stream": selector_done, slot_generating, slot_retry,
+    every exercise as soon as it is final, and a final summary.
+    """
+    print("\033[91m[app]\033[0m generate_exercise_stream_endpoint")
+
+    # --- Request Input validation ---
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    memory_data = request.get_json()
+    user_id = memory_data.get('user_id')
+
+    if not memory_data or 'title' not in memory_data or 'user_description' not in memory_data:
+        return jsonify({
+            "error": "JSON must contain 'title' and 'user_description'."
+        }), 400
+
+    deadline = Deadline(budget_for("generate_exercise", memory_data.get("latency_budget_ms")))
+    use_sse = "text/event-stream" in request.headers.get("Accept", "")
+    service = get_exercise_service()
+    events = queue.Queue()
+
+    # --- Exercise generation logic (in the background, events go through the queue) ---
+    def produce():
+        try:
+            service.generate(user_id, memory_data['title'], memory_data['user_description'], memory_data.get("ai_analysis", {}), deadline=deadline, on_event=events.put, selector=memory_data.get("selector"), memory_id=memory_data.get("memory_id"))
+        except Exception as e:
+            print(f"\033[91m[app]\033[0m Error generating exercises: {e}")
+            print(f"\033[91m[app]\033[0m Generating fallback exercises:")
+            fallback = service.generate_fallback_exercises(memory_data, count=3)["exercises"]
+            for idx, exercise in enumerate(fallback):
+                events.put({"event": "exercise", "index": idx, "type": exercise["type"], "provenance": "fallback", "exercise": exercise})
+            events.put({"event": "summary", "error": "Could not generate exercises, fallback exercises sent."})
+        finally:
+            events.put(None)
+
+    threading.Thread(target=produce, name="generate-stream", daemon=True).start()
+
+    def stream():
+        while True:
+            event = events.get()
+            if event is None:
+                break
+            payload = json.dumps(event, ensure_ascii=False)
+            if use_sse:
+                yield f"event: {event['event']}\ndata: {payload}\n\n"
+            else:
+                yield payload + "\n"
+
+    return Response(
+        stream(),
+        mimetype="text/event-stream" if use_sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api.route('/api/jobs/generate_exercise', methods=['POST'])
+def submit_generate_exercise_job_endpoint():
+    """
+    Asynchronous variant of /api/generate_exercise.
+
+    Queues the generation and answers at once with 202 and a job id; the result
+    is read with GET /api/jobs/<job_id>. An identical job of the same user that
+    is still running is reused. Answers 429 when the queue is full.
+    """
+    print("\033[91m[app]\033[0m submit_generate_exercise_job_endpoint")
+
+    # --- Request Input validation ---
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    memory_data = request.get_json()
+    user_id = memory_data.get('user_id')
+
+    if not memory_data or 'title' not in memory_data or 'user_description' not in memory_data:
+        return jsonify({
+            "error": "JSON must contain 'title' and 'user_description'."
+        }), 400
+
+    try:
+        job, deduplicated = current_app.extensions["job_queue"].submit(user_id, memory_data)
+    except QueueFull as e:
+        print(f"\033[91m[app]\033[0m Job queue full: {e}")
+        return jsonify({"error": "Too many pending jobs, try again later."}), 429, {"Retry-After": "5"}
+
+    return jsonify({"job_id": job.id, "status": job.status, "deduplicated": deduplicated}), 202
+
+@api.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job_endpoint(job_id):
+    """
+    Status and result of a generation job.
+
+    With "?wait=<seconds>" (long-poll) the answer is held until the job finishes
+    or the wait runs out (at most JOB_MAX_WAIT_S).
+    """
+    print("\033[91m[app]\033[0m get_job_endpoint")
+
+    try:
+        wait = min(max(float(request.args.get('wait', 0)), 0), JOB_MAX_WAIT_S)
+    except ValueError:
+        return jsonify({"error": "'wait' must be a number of seconds."}), 400
+
+    jobs = current_app.extensions["job_queue"]
+    job = jobs.wait(job_id, wait) if wait > 0 else jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job."}), 404
+
+    return jsonify(job.to_dict()), 200
+
+@api.route('/api/memories/preprocess', methods=['POST'])
+def preprocess_memory_endpoint():
+    """
+    Called by the frontend after a memory is created or edited.
+
+    Drops the selections cached for the previous text of the memory ("memory_id")
+    and fills the selection cache in the background, so the practice sessions of
+    the memory skip the selector. Answers 202 at once.
+    """
+    print("\033[91m[app]\033[0m preprocess_memory_endpoint")
+
+    # --- Request Input validation ---
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    memory_data = request.get_json()
+
+    if not memory_data or 'title' not in memory_data or 'user_description' not in memory_data:
+        return jsonify({
+            "error": "JSON must contain 'title' and 'user_description'."
+        }), 400
+
+    result = get_exercise_service().preprocess(memory_data.get('memory_id'), memory_data.get('user_id'), memory_data['title'], memory_data['user_description'],
+                                               memory_data.get("ai_analysis", {}), selector=memory_data.get("selector"))
+    return jsonify(result), 202
+
+@api.route('/api/memories/invalidate', methods=['POST'])
+def invalidate_memory_endpoint():
+    """ Called by the frontend after a memory is deleted: drops its cached selections. """
+    print("\033[91m[app]\033[0m invalidate_memory_endpoint")
+
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    memory_data = request.get_json()
+    if not memory_data or memory_data.get('memory_id') is None:
+        return jsonify({"error": "JSON must contain 'memory_id'."}), 400
+
+    return jsonify({"memory_id": memory_data['memory_id'], "invalidated": get_exercise_service().invalidate(memory_data['memory_id'])}), 200
+
+@api.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Runtime counters of the LLM layer (cache hits/misses...)."""
+    print("\033[91m[app]\033[0m metrics_endpoint")
+
+    return jsonify({
+        "llm_cache": get_cache().stats(),
+        "selection_cache": get_selection_cache().stats() if get_selection_cache() is not None else None,
+        "novelty": get_novelty_index().stats() if get_novelty_index() is not None else None,
+        "prevalidation": get_rule_engine().stats(),
+        "answer_matcher": answer_matcher.stats(),
+        "http_pool": http_pool.stats(),
+        "prompts": get_prompt_stats().stats(),
+        "scheduler": get_scheduler().stats(),
+        "backends": get_router().stats(),
+        "coalescing": {"llm": llm_runner.stats(), "pipeline": get_exercise_service().coalescing_stats()},
+        "jobs": current_app.extensions["job_queue"].stats(),
+        "stats_buffer": db.get_stats_buffer().stats() if db.get_stats_buffer() is not None else None
+    })
+
+@api.route('/api/ready', methods=['GET'])
+def ready_endpoint():
+    """Readiness probe: 200 only once the boot warm-up has finished, 503 before."""
+    service = get_exercise_service()
+    if service.ready.is_set():
+        return jsonify({"ready": True, "warmup": service.warmup}), 200
+    return jsonify({"ready": False, "warmup": service.warmup}), 503
+
+@api.route('/api/test', methods=['GET'])
 def test_endpoint():
     """Test endpoint to verify that the API is working."""
     print("\033[91m[app]\033[0m test_endpoint")
@@ -142,6 +356,36 @@ def test_endpoint():
         "usage": "Send a POST request to /api/generate_exercise with the memory data."
     })
 
+# ______________________________________ App factory ______________________________________
+
+def create_app() -> Flask:
+    """
+    Builds the Flask app of one worker process.
+
+    The ExerciseService (orchestrator, selector and agents) is built once here and
+    shared by every request; its warm-up runs in the background and /api/ready
+    answers 200 once it is done. WARMUP_PING=1 also pings the LLM provider;
+    WARMUP_LLM=0 leaves crewai and the LLM clients for the first LLM call.
+    """
+    print("\033[42m[INFO] Server initialized\033[0m")
+    app = Flask(__name__)
+    CORS(app)
+    app.register_blueprint(api)
+
+    service = get_exercise_service()
+    warm_up_options = {"ping": os.getenv("WARMUP_PING", "0") == "1", "llm": os.getenv("WARMUP_LLM", "1") == "1"}
+    threading.Thread(target=service.warm_up, kwargs=warm_up_options, name="warm-up", daemon=True).start()
+
+    app.extensions["job_queue"] = JobQueue(
+        run_generation_job,
+        max_workers=int(os.getenv("JOB_WORKERS", "4")),
+        max_pending=int(os.getenv("JOB_MAX_PENDING", "32")),
+        result_ttl=float(os.getenv("JOB_RESULT_TTL_S", "600"))
+    )
+    return app
+
+app = create_app()
+
 if __name__ == '__main__':
     print("Starting Cognitive Exercise Generation API...")
     print("Test endpoint: http://localhost:5001/api/test")
@@ -0,0 +1,118 @@
+"""
+ASGI entry point of the API.
+
+The exercise generation and the fill in the blank correction run on the async
+LLM path (ExerciseService.agenerate / acorrect_fill_in_the_blank), so a request
+waiting on the provider holds no thread. Every other route is served by the
+Flask app from app.py.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5001
+"""
+import json
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import app as flask_app
+from services.exercise_service import get_exercise_service
+from core.deadline import Deadline, budget_for
+from utils.answer_matcher import match_answer, CORRECT, INCORRECT
+
+wsgi_app = WsgiToAsgi(flask_app)
+
+
+async def read_json(receive):
+    """ Body of the request parsed as JSON (None if it is not valid JSON). """
+    body = b""
+    more = True
+    while more:
+        message = await receive()
+        body += message.get("body", b"")
+        more = message.get("more_body", False)
+    try:
+        return json.loads(body)
+    except ValueError:
+        return None
+
+
+async def send_json(send, status: int, payload):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"access-control-allow-origin", b"*")]
+    })
+    await send({"type": "http.response.body", "body": json.dumps(payload, ensure_ascii=False).encode("utf-8")})
+
+
+async def generate_exercise_endpoint(scope, receive, send):
+    """ Async version of /api/generate_exercise. """
+    print("\033[91m[asgi]\033[0m generate_exercise_endpoint")
+
+    memory_data = await read_json(receive)
+    if not isinstance(memory_data, dict):
+        return await send_json(send, 400, {"error": "Request must be JSON"})
+    if 'title' not in memory_data or 'user_description' not in memory_data:
+        return await send_json(send, 400, {"error": "JSON must contain 'title' and 'user_description'."})
+
+    service = get_exercise_service()
+    deadline = Deadline(budget_for("generate_exercise", memory_data.get("latency_budget_ms")))
+
+    try:
+        exercise_set = await service.agenerate(memory_data.get('user_id'), memory_data['title'], memory_data['user_description'], memory_data.get("ai_analysis", {}), deadline=deadline, selector=memory_data.get("selector"), memory_id=memory_data.get("memory_id"))
+    except Exception as e:
+        print(f"\033[91m[asgi]\033[0m Error generating exercises: {e}")
+        exercise_set = service.generate_fallback_exercises(memory_data, count=3)
+
+    await send_json(send, 200, exercise_set)
+
+
+async def fill_in_the_blank_correction_endpoint(scope, receive, send):
+    """ Async version of /api/excercise_correction/fill_in_the_blank. """
+    print("\033[91m[asgi]\033[0m fill_in_the_blank_correction_endpoint")
+
+    exercise_data = await read_json(receive)
+    if not isinstance(exercise_data, dict):
+        return await send_json(send, 400, {"error": "Request must be JSON"})
+    if not exercise_data.get('exercise_type') or exercise_data.get('resultado') is None:
+        return await send_json(send, 400, {"error": "JSON must contain 'exercise_type' and 'resultado'."})
+    if exercise_data.get('user_id') is None:
+        return await send_json(send, 400, {"error": "JSON must contain 'user_id'."})
+
+    user_answer = exercise_data.get('user_answer')
+    correct_answer = exercise_data.get('correct_answer')
+
+    verdict = match_answer(user_answer, correct_answer)
+    if verdict == CORRECT:
+        return await send_json(send, 200, {"status": "correct"})
+    if verdict == INCORRECT:
+        return await send_json(send, 200, {"status": "incorrect", "feedback": "La respuesta no coincide con la palabra del recuerdo."})
+
+    deadline = Deadline(budget_for("fill_in_the_blank_correction", exercise_data.get("latency_budget_ms")))
+    result = await get_exercise_service().acorrect_fill_in_the_blank(user_answer, correct_answer, deadline=deadline)
+
+    if result.get('status') == "ok":
+        return await send_json(send, 200, {"status": "correct"})
+    await send_json(send, 200, {"status": "incorrect", "feedback": result.get('analysis', result.get('Analysis', ''))})
+
+
+ROUTES = {
+    ("POST", "/api/generate_exercise"): generate_exercise_endpoint,
+    ("POST", "/api/excercise_correction/fill_in_the_blank"): fill_in_the_blank_correction_endpoint,
+}
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        # Warm-up already runs from create_app(); nothing else to do at startup/shutdown
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    handler = ROUTES.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+    if handler is not None:
+        return await handler(scope, receive, send)
+
+    await wsgi_app(scope, receive, send)
@@ -0,0 +1,138 @@
+"""
+Benchmark: threaded vs async LLM execution under many in-flight calls.
+
+Starts benchmarks/stub_llm_server.py and fires `calls` concurrent corrector
+calls at it, once through kickoff() on one thread per call (the Flask path) and
+once through akickoff() on a single event loop (the ASGI path). Each mode runs
+in its own process so their memory does not mix.
+
+Needs the real crewai/litellm/openai packages. Run from Backend/:
+    python -m benchmarks.bench_async_llm [calls] [latency_s]
+"""
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+CONFIG_PATH = os.path.join(BACKEND_DIR, "config")
+# The stub server stands in for the provider, whatever backends the corrector profile lists
+STUB_PROFILE = {"backend": "openai"}
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+class Monitor:
+    """ Samples RSS and thread count while a mode runs. """
+
+    def __init__(self):
+        self.base_rss = rss_mb()
+        self.peak_rss = self.base_rss
+        self.peak_threads = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+
+    def _sample(self):
+        while not self._stop.wait(0.02):
+            self.peak_rss = max(self.peak_rss, rss_mb())
+            self.peak_threads = max(self.peak_threads, threading.active_count())
+
+    def stop(self) -> dict:
+        self._stop.set()
+        self._thread.join()
+        return {"rss_growth_mb": round(self.peak_rss - self.base_rss, 1), "peak_threads": self.peak_threads}
+
+
+def inputs(i: int) -> dict:
+    return {"correct_answer": "playa", "user_answer": f"respuesta {i}"}
+
+
+def run_threaded(calls: int) -> dict:
+    from core.llm_runner import kickoff
+    from utils.json_utils import parse_llm_json
+
+    kickoff(CONFIG_PATH, "corrector_agent", "corrector_task", inputs(-1), "gpt-4o-mini", 0, parse_llm_json, profile=STUB_PROFILE)
+    monitor = Monitor()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=calls) as executor:
+        results = list(executor.map(lambda i: kickoff(CONFIG_PATH, "corrector_agent", "corrector_task", inputs(i), "gpt-4o-mini", 0, parse_llm_json, profile=STUB_PROFILE), range(calls)))
+    elapsed = time.perf_counter() - start
+    return dict(monitor.stop(), seconds=round(elapsed, 2), ok=sum(r.get("status") == "ok" for r in results))
+
+
+def run_async(calls: int) -> dict:
+    from core.llm_runner import akickoff
+    from utils.json_utils import parse_llm_json
+
+    async def main():
+        await akickoff(CONFIG_PATH, "corrector_agent", "corrector_task", inputs(-1), "gpt-4o-mini", 0, parse_llm_json, profile=STUB_PROFILE)
+        monitor = Monitor()
+        start = time.perf_counter()
+        results = await asyncio.gather(*(akickoff(CONFIG_PATH, "corrector_agent", "corrector_task", inputs(i), "gpt-4o-mini", 0, parse_llm_json, profile=STUB_PROFILE) for i in range(calls)))
+        elapsed = time.perf_counter() - start
+        return dict(monitor.stop(), seconds=round(elapsed, 2), ok=sum(r.get("status") == "ok" for r in results))
+
+    return asyncio.run(main())
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--mode":
+        # Child process: run one mode and print its result as JSON
+        mode, calls = sys.argv[2], int(sys.argv[3])
+        result = run_threaded(calls) if mode == "threaded" else run_async(calls)
+        print("RESULT " + json.dumps(result))
+        sys.exit(0)
+
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+
+    port = free_port()
+    server = subprocess.Popen([sys.executable, "-m", "benchmarks.stub_llm_server", str(port), str(latency)], cwd=BACKEND_DIR, stdout=subprocess.PIPE, text=True)
+    server.stdout.readline()
+
+    env = dict(os.environ,
+               LLM_API_BASE=f"http://127.0.0.1:{port}/v1",
+               OPENAI_API_KEY="stub",
+               LLM_CACHE_SIZE="0",
+               LLM_CALL_THREADS=str(calls),
+               HTTP_POOL_MAX_CONNECTIONS=str(calls),
+               OTEL_SDK_DISABLED="true",
+               CREWAI_DISABLE_TELEMETRY="true")
+    env.pop("LLM_CACHE_DB", None)
+
+    results = {}
+    try:
+        for mode in ("threaded", "async"):
+            out = subprocess.run([sys.executable, "-m", "benchmarks.bench_async_llm", "--mode", mode, str(calls)], cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+            line = next((l for l in out.stdout.splitlines() if l.startswith("RESULT ")), None)
+            if line is None:
+                print(f"{mode} run failed:\n{out.stderr[-2000:]}")
+                continue
+            results[mode] = json.loads(line[len("RESULT "):])
+    finally:
+        server.terminate()
+
+    print(f"in-flight calls: {calls} | stub latency: {latency}s")
+    print(f"{'mode':<10}{'seconds':>10}{'ok':>6}{'peak threads':>15}{'RSS growth MB':>16}")
+    for mode, r in results.items():
+        print(f"{mode:<10}{r['seconds']:>10}{r['ok']:>6}{r['peak_threads']:>15}{r['rss_growth_mb']:>16}")
@@ -0,0 +1,184 @@
+"""
+Benchmark: tail latency with hedged requests and circuit breaking across two backends.
+
+Starts two benchmarks/stub_llm_server.py instances standing in for the
+backends of config/backends.yaml:
+
+- "openai": fast (0.1s) but 4% of its answers take 2s
+- "ollama": steady 0.3s
+
+and sends `calls` corrector calls (`concurrency` at a time) in these setups,
+each in its own process:
+
+- primary only (async):    LLM_BACKENDS=openai through akickoff()
+- hedged (async):          LLM_BACKENDS=openai,ollama through akickoff()
+- primary only (threaded): LLM_BACKENDS=openai through kickoff() (crewai on threads)
+- hedged (threaded):       LLM_BACKENDS=openai,ollama and LLM_HEDGING_SYNC=1 through
+                           kickoff(); the abandoned losers still reach the provider
+- primary down:            "openai" points to a closed port; its circuit opens and
+                           traffic goes to "ollama"
+
+Needs the real crewai/litellm/openai packages. Run from Backend/:
+    python -m benchmarks.bench_backend_router [calls] [concurrency]
+"""
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+CONFIG_PATH = os.path.join(BACKEND_DIR, "config")
+WARMUP_CALLS = 30
+
+
+def inputs(i: int) -> dict:
+    return {"correct_answer": "playa", "user_answer": f"respuesta {i}"}
+
+
+def profile() -> dict:
+    # The setups pick the backends through LLM_BACKENDS instead of the corrector's own profile
+    from core.config_registry import DEFAULT_PROFILE
+    return {"backend": DEFAULT_PROFILE["backend"]}
+
+
+def summary(latencies: list) -> dict:
+    latencies = sorted(latencies)
+    pick = lambda q: round(latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000)
+    return {"p50_ms": pick(0.5), "p95_ms": pick(0.95), "p99_ms": pick(0.99)} if latencies else {}
+
+
+def run_async(calls: int, concurrency: int) -> dict:
+    from core.llm_runner import akickoff
+    from utils.json_utils import parse_llm_json
+
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies, errors = [], 0
+
+        async def one(i: int, measure: bool):
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    await akickoff(CONFIG_PATH, "corrector_agent", "corrector_task", inputs(i), "gpt-4o-mini", 0, parse_llm_json, profile=profile())
+                except Exception:
+                    errors += 1
+                    return
+                if measure:
+                    latencies.append(time.perf_counter() - start)
+
+        # Warm-up: the router needs some latencies before it hedges at the p95
+        await asyncio.gather(*(one(-1 - i, False) for i in range(WARMUP_CALLS)))
+        await asyncio.gather(*(one(i, True) for i in range(calls)))
+        return latencies, errors
+
+    latencies, errors = asyncio.run(main())
+    return latencies, errors
+
+
+def run_threaded(calls: int, concurrency: int) -> dict:
+    from core.llm_runner import kickoff
+    from utils.json_utils import parse_llm_json
+
+    def one(i: int):
+        start = time.perf_counter()
+        try:
+            kickoff(CONFIG_PATH, "corrector_agent", "corrector_task", inputs(i), "gpt-4o-mini", 0, parse_llm_json, profile=profile())
+        except Exception:
+            return None
+        return time.perf_counter() - start
+
+    # crewai's first calls pay its lazy initialisation (seconds); one alone first keeps it out of the percentiles
+    one(-WARMUP_CALLS - 1)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(-WARMUP_CALLS, 0)))
+        results = list(executor.map(one, range(calls)))
+    return [r for r in results if r is not None], sum(r is None for r in results)
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def server_requests(port: int) -> int:
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/stats") as response:
+        return json.loads(response.read())["requests"]
+
+
+def start_server(latency: float, slow_share: float = 0, slow_latency: float = 0):
+    port = free_port()
+    server = subprocess.Popen([sys.executable, "-m", "benchmarks.stub_llm_server", str(port), str(latency), "0", str(slow_share), str(slow_latency)],
+                              cwd=BACKEND_DIR, stdout=subprocess.PIPE, text=True)
+    server.stdout.readline()
+    return port, server
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--mode":
+        mode, calls, concurrency = sys.argv[2], int(sys.argv[3]), int(sys.argv[4])
+        latencies, errors = run_threaded(calls, concurrency) if mode == "threaded" else run_async(calls, concurrency)
+        from core.backend_router import get_router
+        router = get_router().stats()
+        print("RESULT " + json.dumps(dict(summary(latencies), errors=errors,
+                                          router={k: router[k] for k in ("hedged", "hedge_wins", "losers_cancelled", "failovers")},
+                                          circuits={name: b.get("circuit") for name, b in router["backends"].items()},
+                                          attempts={name: b.get("attempts") for name, b in router["backends"].items()})))
+        sys.exit(0)
+
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    primary_port, primary = start_server(0.1, 0.04, 2.0)
+    secondary_port, secondary = start_server(0.3)
+    dead_port = free_port()
+
+    setups = [
+        ("primary only (async)", "async", {"LLM_BACKENDS": "openai"}),
+        ("hedged (async)", "async", {"LLM_BACKENDS": "openai,ollama"}),
+        ("primary only (threaded)", "threaded", {"LLM_BACKENDS": "openai"}),
+        ("hedged (threaded)", "threaded", {"LLM_BACKENDS": "openai,ollama", "LLM_HEDGING_SYNC": "1"}),
+        ("primary down", "async", {"LLM_BACKENDS": "openai,ollama", "LLM_API_BASE": f"http://127.0.0.1:{dead_port}/v1"}),
+    ]
+
+    print(f"calls: {calls} (+{WARMUP_CALLS} warm-up) | concurrency: {concurrency}")
+    print("openai stub: 0.1s, 4% at 2s | ollama stub: 0.3s")
+    try:
+        for name, mode, overrides in setups:
+            env = dict(os.environ,
+                       LLM_API_BASE=f"http://127.0.0.1:{primary_port}/v1",
+                       OLLAMA_URL=f"http://127.0.0.1:{secondary_port}/v1",
+                       OPENAI_API_KEY="stub",
+                       LLM_CACHE_SIZE="0",
+                       LLM_RPM="0",
+                       LLM_TPM="0",
+                       OTEL_SDK_DISABLED="true",
+                       CREWAI_DISABLE_TELEMETRY="true",
+                       LITELLM_LOCAL_MODEL_COST_MAP="True")
+            env.update(overrides)
+            env.pop("LLM_CACHE_DB", None)
+
+            before = (server_requests(primary_port), server_requests(secondary_port))
+            out = subprocess.run([sys.executable, "-m", "benchmarks.bench_backend_router", "--mode", mode, str(calls), str(concurrency)],
+                                 cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+            line = next((l for l in out.stdout.splitlines() if l.startswith("RESULT ")), None)
+            if line is None:
+                print(f"{name} run failed:\n{out.stderr[-2000:]}")
+                continue
+            r = json.loads(line[len("RESULT "):])
+            sent = (server_requests(primary_port) - before[0], server_requests(secondary_port) - before[1])
+
+            print(f"\n{name}: p50 {r.get('p50_ms')}ms | p95 {r.get('p95_ms')}ms | p99 {r.get('p99_ms')}ms | errors {r['errors']}")
+            print(f"  requests served: openai {sent[0]}, ollama {sent[1]} | router {r['router']}")
+            print(f"  attempts {r['attempts']} | circuits {r['circuits']}")
+    finally:
+        primary.terminate()
+        secondary.terminate()
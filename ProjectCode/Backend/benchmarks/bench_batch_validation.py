@@ -0,0 +1,59 @@
+"""
+Benchmark: LLM calls per exercise set with per-slot vs batched validation.
+
+Runs the real Orchestrator.run_pipeline against the stub LLM (benchmarks/stub_llm.py)
+with a configurable share of verificador verdicts failing, once with
+BATCH_VALIDATION off (one verificador call per slot and attempt) and once on
+(one call per round).
+
+Run from Backend/:
+    python -m benchmarks.bench_batch_validation [sets] [error_rate]
+"""
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# The response cache would hide repeated validations: keep it out of the measurement
+os.environ["LLM_CACHE_SIZE"] = "0"
+os.environ["NOVELTY"] = "0"
+os.environ.pop("LLM_CACHE_DB", None)
+
+from benchmarks import stub_llm
+from core.orchestrator import Orchestrator
+
+DIFFICULTY = {"fill_in_the_blank": "media", "multiple_choice": "media", "ordering": "media"}
+
+
+def run(batch: bool, sets: int, error_rate: float):
+    stub_llm.install(stub_llm.StubResponder(error_rate=error_rate, seed=42))
+    stub_llm.reset_calls()
+
+    orchestrator = Orchestrator()
+    orchestrator.batch_validation = batch
+    orchestrator.get_difficulties = lambda user_id: dict(DIFFICULTY)
+
+    start = time.perf_counter()
+    for _ in range(sets):
+        orchestrator.run_pipeline("Día de playa", "Fui a la playa con mi nieto Leo.", "", "bench-user")
+    elapsed = time.perf_counter() - start
+
+    calls = list(stub_llm.CALLS)
+    validations = sum(1 for call in calls if "Revisor" in call["role"])
+    return len(calls) / sets, validations / sets, elapsed / sets
+
+
+if __name__ == "__main__":
+    sets = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    error_rate = float(sys.argv[2]) if len(sys.argv) > 2 else 0.3
+
+    per_slot = run(False, sets, error_rate)
+    batched = run(True, sets, error_rate)
+
+    print(f"sets: {sets} | verificador error rate: {error_rate:.0%}")
+    print(f"{'mode':<12}{'LLM calls/set':>16}{'validations/set':>18}")
+    print(f"{'per-slot':<12}{per_slot[0]:>16.2f}{per_slot[1]:>18.2f}")
+    print(f"{'batched':<12}{batched[0]:>16.2f}{batched[1]:>18.2f}")
+    print(f"LLM calls saved per set: {per_slot[0] - batched[0]:.2f} ({1 - batched[0] / per_slot[0]:.0%})")
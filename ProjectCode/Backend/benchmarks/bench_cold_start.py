@@ -0,0 +1,140 @@
+"""
+Benchmark: cold start of a worker.
+
+1. Import-time profile of `import app` (python -X importtime): total time, the
+   slowest imports of app and which heavy stacks (crewai, litellm, openai,
+   httpx, supabase) were loaded.
+2. Cold start of a real server process (Flask dev server): time from spawn to
+   the first served /api/test, the first /api/excercise_correction and
+   /api/ready, for:
+   - lazy:           the tree as it is (WARMUP_LLM=1, the warm-up loads crewai in the background)
+   - lazy, no LLM:   WARMUP_LLM=0, crewai waits for the first LLM call
+   - eager:          crewai, openai, httpx (and supabase if installed) imported
+                     before app, what every worker did when they were module-level imports
+
+The database is a seeded temporary SQLite file (DB_BACKEND=sqlite), so the run
+needs no network.
+
+Run from Backend/:
+    python -m benchmarks.bench_cold_start [runs]
+"""
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+HEAVY = ("crewai", "litellm", "openai", "httpx", "supabase")
+EAGER_IMPORTS = "import crewai, openai, httpx\ntry:\n    import supabase\nexcept ImportError:\n    pass\n"
+SERVER = "import sys\n{preload}from app import app\napp.run(host='127.0.0.1', port=int(sys.argv[1]), threaded=True)\n"
+
+MODES = (
+    ("lazy", "", {"WARMUP_LLM": "1"}),
+    ("lazy, no LLM", "", {"WARMUP_LLM": "0"}),
+    ("eager", EAGER_IMPORTS, {"WARMUP_LLM": "1"}),
+)
+
+
+def import_profile(env: dict, top: int = 12) -> dict:
+    """ Parses `python -X importtime -c "import app"`: total, slowest imports of app, heavy stacks loaded. """
+    code = "import app, os, sys\nprint('loaded:' + ','.join(m for m in %r if m in sys.modules))\nos._exit(0)" % (HEAVY,)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+    total_ms, entries, children = 0, [], []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # One space after the bar, plus two per nesting level; a module is printed after its imports
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            children.append((int(cumulative) / 1000, name.strip()))
+        elif depth == 0:
+            if name.strip() == "app":
+                total_ms, entries = int(cumulative) / 1000, children
+            children = []
+    entries.sort(reverse=True)
+    loaded = next((line[len("loaded:"):] for line in result.stdout.splitlines() if line.startswith("loaded:")), "")
+    return {"total_ms": round(total_ms), "top": entries[:top], "loaded": [m for m in loaded.split(",") if m]}
+
+
+def request(url: str, payload: dict = None, timeout: float = 60) -> int:
+    data = json.dumps(payload).encode() if payload is not None else None
+    headers = {"Content-Type": "application/json"} if payload is not None else {}
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data, headers=headers), timeout=timeout) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def cold_start(preload: str, env: dict, user_id: str) -> dict:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    base = f"http://127.0.0.1:{port}"
+
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-c", SERVER.format(preload=preload), str(port)], cwd=BACKEND_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while True:
+            try:
+                if request(f"{base}/api/test", timeout=5) == 200:
+                    break
+            except (urllib.error.URLError, ConnectionError):
+                if server.poll() is not None:
+                    raise RuntimeError("server exited during start-up")
+                time.sleep(0.01)
+        first_test = time.perf_counter() - start
+
+        status = request(f"{base}/api/excercise_correction", {"user_id": user_id, "exercise_type": "ordering", "resultado": "succeed"})
+        if status != 200:
+            raise RuntimeError(f"/api/excercise_correction answered {status}")
+        first_correction = time.perf_counter() - start
+
+        while request(f"{base}/api/ready") != 200:
+            if time.perf_counter() - start > 120:
+                raise RuntimeError("not ready after 120 s")
+            time.sleep(0.05)
+        ready = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+
+    return {"test": first_test * 1000, "correction": first_correction * 1000, "ready": ready * 1000}
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+
+    from database import seed
+    from database.sqlite_storage import SQLiteStorage
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "cold_start.db")
+        seed.seed(SQLiteStorage(db_path), 10)
+        user_id = seed.generate(10)["users"][0]["id"]
+        env = dict(os.environ, DB_BACKEND="sqlite", SQLITE_DB_PATH=db_path, STATS_BUFFER="0",
+                   # litellm would otherwise download its model cost map during the warm-up
+                   LITELLM_LOCAL_MODEL_COST_MAP="True", PYTHONUNBUFFERED="1")
+
+        profile = import_profile(env)
+        print(f"import app: {profile['total_ms']} ms | heavy stacks loaded: {profile['loaded'] or 'none'}")
+        print(f"  {'cumulative ms':>14}  import of app")
+        for ms, name in profile["top"]:
+            print(f"  {ms:>14.1f}  {name}")
+
+        print(f"\ncold start, median of {runs} runs (ms from spawn)")
+        print(f"{'mode':<16}{'/api/test':>12}{'correction':>12}{'/api/ready':>12}")
+        for name, preload, mode_env in MODES:
+            results = [cold_start(preload, dict(env, **mode_env), user_id) for _ in range(runs)]
+            medians = {key: round(statistics.median(result[key] for result in results)) for key in results[0]}
+            print(f"{name:<16}{medians['test']:>12}{medians['correction']:>12}{medians['ready']:>12}")
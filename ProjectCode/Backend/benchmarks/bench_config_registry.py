@@ -0,0 +1,77 @@
+"""
+Micro-benchmark: per-call Agent/Task setup time before and after ConfigRegistry.
+
+"before" reproduces the old refresh(): open + yaml.safe_load of agents.yaml and
+tasks.yaml, a new LLM, a new Agent and a new Task on every call.
+"after" asks the shared ConfigRegistry for the same objects.
+
+Run from Backend/:
+    python -m benchmarks.bench_config_registry [iterations]
+"""
+import os
+import sys
+import time
+
+import yaml
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from crewai import Agent, Task, LLM
+from core.config_registry import ConfigRegistry
+
+CONFIG_PATH = os.path.join(BACKEND_DIR, "config")
+
+# (agent, task, temperature) used by every refresh() of the pipeline
+CALLS = [
+    ("selector_agent", "select_task", 0),
+    ("fill_in_the_blank_agent", "fill_in_the_blank_task", 0.5),
+    ("multiple_choice_agent", "multiple_choice_task", 0.5),
+    ("ordering_agent", "ordering_task", 0.5),
+    ("validator_agent", "validate_ordering_task", 0),
+    ("corrector_agent", "corrector_task", 0),
+]
+
+
+def old_refresh(agent_name, task_name, temperature):
+    with open(os.path.join(CONFIG_PATH, "agents.yaml"), "r") as f:
+        agents_config = yaml.safe_load(f)
+
+    agents_config[agent_name]["llm"] = LLM(model="gpt-4o-mini", temperature=temperature)
+    agent = Agent(**agents_config[agent_name])
+
+    with open(os.path.join(CONFIG_PATH, "tasks.yaml"), "r") as f:
+        tasks_config = yaml.safe_load(f)
+
+    tasks_config[task_name]["agent"] = agent
+    return agent, Task(**tasks_config[task_name])
+
+
+def new_refresh(agent_name, task_name, temperature):
+    registry = ConfigRegistry.get(CONFIG_PATH)
+    return registry.build(agent_name, task_name, registry.llm("gpt-4o-mini", temperature))
+
+
+def measure(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for agent_name, task_name, temperature in CALLS:
+            fn(agent_name, task_name, temperature)
+    elapsed = time.perf_counter() - start
+    return elapsed / (iterations * len(CALLS))
+
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+    # Warm both paths once so imports and the first YAML parse are not measured
+    old_refresh(*CALLS[0])
+    new_refresh(*CALLS[0])
+
+    before = measure(old_refresh, iterations)
+    after = measure(new_refresh, iterations)
+
+    print(f"calls per path : {iterations * len(CALLS)}")
+    print(f"before (yaml)  : {before * 1000:.3f} ms/call")
+    print(f"after (cached) : {after * 1000:.3f} ms/call")
+    print(f"speed-up       : x{before / after:.1f}")
@@ -0,0 +1,92 @@
+"""
+Benchmark: database round trips of Orchestrator.get_difficulties per generate request.
+
+Runs against the SQLite stand-in of the Supabase client (benchmarks/stub_supabase.py)
+with `latency_ms` per round trip, for users whose three exercise types are all
+past the min_done threshold (the worst case: every level changes):
+
+- per type: the previous flow, select * and then update_current_level +
+  reset_exercise_stats for every type (1 read + 6 writes)
+- batched:  get_difficulties as it is now, one projected read + one
+  apply_level_transitions call
+
+Both must end with the same levels and counters.
+
+Run from Backend/:
+    python -m benchmarks.bench_difficulty_roundtrips [users] [latency_ms]
+"""
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from benchmarks import stub_llm
+from benchmarks.stub_supabase import StubSupabase
+import database.db as db
+from database.storage import set_storage
+from database.supabase_storage import SupabaseStorage
+from core.orchestrator import Orchestrator
+
+# done, right per type: up a level, stay, up a level
+SEED = {
+    "multiple_choice_done": 5, "multiple_choice_right": 4, "multiple_choice_current_level": 1,
+    "fill_in_the_blank_done": 5, "fill_in_the_blank_right": 3, "fill_in_the_blank_current_level": 1,
+    "ordering_done": 6, "ordering_right": 6, "ordering_current_level": 0,
+}
+
+
+def per_type(orchestrator: Orchestrator, user_id: str, min_done: int = 3) -> dict:
+    """ The previous get_difficulties: one write per level change and per counter reset. """
+    data = db.get_user_stats(user_id)[0]
+    new_difficulties = {}
+    for exercise_type in orchestrator.exercise_types:
+        done, right = data[f"{exercise_type}_done"], data[f"{exercise_type}_right"]
+        current_level = data[f"{exercise_type}_current_level"]
+        if done < min_done:
+            new_difficulties[exercise_type] = orchestrator.difficulty_levels[current_level]
+            continue
+        new_level = orchestrator.adaptative_difficulty(current_level, right / done)
+        db.update_current_level(user_id, exercise_type, new_level)
+        db.reset_exercise_stats(user_id, exercise_type)
+        new_difficulties[exercise_type] = orchestrator.difficulty_levels[new_level] if new_level >= 0 else None
+    return new_difficulties
+
+
+def run(mode: str, users: int, latency_s: float):
+    client = StubSupabase(latency_s)
+    set_storage(SupabaseStorage(client))
+    orchestrator = Orchestrator()
+
+    for i in range(users):
+        client.seed_user(f"user-{i}", **SEED)
+
+    client.round_trips = 0
+    start = time.perf_counter()
+    for i in range(users):
+        if mode == "per type":
+            difficulties = per_type(orchestrator, f"user-{i}")
+        else:
+            difficulties = orchestrator.get_difficulties(f"user-{i}")
+    elapsed = time.perf_counter() - start
+
+    final = client.row("user-0")
+    final.pop("full_name")
+    return client.round_trips / users, elapsed / users * 1000, difficulties, final
+
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    latency_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    stub_llm.install()
+    results = {mode: run(mode, users, latency_ms / 1000) for mode in ("per type", "batched")}
+
+    print(f"users: {users} | latency per round trip: {latency_ms:.0f} ms")
+    print(f"{'mode':<12}{'round trips':>13}{'ms/request':>12}")
+    for mode, (trips, ms, _, _) in results.items():
+        print(f"{mode:<12}{trips:>13.1f}{ms:>12.1f}")
+
+    same = results["per type"][2:] == results["batched"][2:]
+    print(f"same difficulties and final row: {same} {results['batched'][2]}")
@@ -0,0 +1,78 @@
+"""
+Benchmark: per-call connection setup vs the shared HTTP pool.
+
+Sends `calls` sequential chat completions to benchmarks/stub_llm_server.py with
+an OpenAI client created for every call (what BaseAgent did per instance) and
+with clients on the shared pool of utils/http_pool.py. Reports per-call latency
+and how many TCP connections the server saw.
+
+Run from Backend/ (add a TLS-terminating proxy in front of the stub to also see
+the handshake cost):
+    python -m benchmarks.bench_http_pool [calls] [latency_s]
+"""
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from openai import OpenAI
+
+from utils import http_pool
+
+MESSAGES = [{"role": "user", "content": "ping"}]
+
+
+def server_connections(base_url: str) -> int:
+    with urllib.request.urlopen(base_url.replace("/v1", "/stats")) as response:
+        return json.loads(response.read())["connections"]
+
+
+def run(base_url: str, calls: int, shared: bool) -> dict:
+    before = server_connections(base_url)
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        if shared:
+            client = OpenAI(api_key="stub", base_url=base_url, http_client=http_pool.get_http_client())
+        else:
+            client = OpenAI(api_key="stub", base_url=base_url)
+        client.chat.completions.create(model="gpt-4o-mini", messages=MESSAGES)
+        latencies.append((time.perf_counter() - start) * 1000)
+        if not shared:
+            client.close()
+    return {
+        "p50_ms": round(statistics.median(latencies), 2),
+        "p95_ms": round(sorted(latencies)[int(len(latencies) * 0.95) - 1], 2),
+        "connections": server_connections(base_url) - before - 1
+    }
+
+
+if __name__ == "__main__":
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.01
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = subprocess.Popen([sys.executable, "-m", "benchmarks.stub_llm_server", str(port), str(latency)], cwd=BACKEND_DIR, stdout=subprocess.PIPE, text=True)
+    server.stdout.readline()
+    base_url = f"http://127.0.0.1:{port}/v1"
+
+    try:
+        per_call = run(base_url, calls, shared=False)
+        shared = run(base_url, calls, shared=True)
+    finally:
+        server.terminate()
+
+    print(f"calls: {calls} | stub latency: {latency}s")
+    print(f"{'client':<12}{'p50 ms':>10}{'p95 ms':>10}{'connections':>14}")
+    print(f"{'per call':<12}{per_call['p50_ms']:>10}{per_call['p95_ms']:>10}{per_call['connections']:>14}")
+    print(f"{'shared pool':<12}{shared['p50_ms']:>10}{shared['p95_ms']:>10}{shared['connections']:>14}")
+    print(f"pool: {http_pool.stats()}")
@@ -0,0 +1,77 @@
+"""
+Benchmark: asynchronous job queue driven by the stub LLM.
+
+A burst of users submits generation jobs to services.job_queue.JobQueue, whose
+runner is the real Orchestrator pipeline on top of the stub LLM
+(benchmarks/stub_llm.py). Some users submit the same memory twice while the
+first job is still running, and the burst is bigger than the queue depth, so
+the run shows deduplication, 429 rejections and job latency.
+
+Run from Backend/:
+    python -m benchmarks.bench_job_queue [users] [workers] [max_pending] [latency_s]
+"""
+import os
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+os.environ["LLM_CACHE_SIZE"] = "0"
+os.environ["NOVELTY"] = "0"
+os.environ.pop("LLM_CACHE_DB", None)
+
+from benchmarks import stub_llm
+from core.deadline import Deadline, budget_for
+from core.orchestrator import Orchestrator
+from services.job_queue import JobQueue, QueueFull
+
+DIFFICULTY = {"fill_in_the_blank": "media", "multiple_choice": "media", "ordering": "media"}
+
+
+def make_runner():
+    orchestrator = Orchestrator()
+    orchestrator.get_difficulties = lambda user_id: dict(DIFFICULTY)
+
+    def runner(memory_data):
+        deadline = Deadline(budget_for("generate_exercise", memory_data.get("latency_budget_ms")))
+        return orchestrator.run_pipeline(memory_data["title"], memory_data["user_description"], "", memory_data["user_id"], deadline=deadline)
+
+    return runner
+
+
+if __name__ == "__main__":
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    max_pending = int(sys.argv[3]) if len(sys.argv) > 3 else 24
+    latency = float(sys.argv[4]) if len(sys.argv) > 4 else 0.05
+
+    stub_llm.install(stub_llm.StubResponder(latency=latency, seed=42))
+    jobs = JobQueue(make_runner(), max_workers=workers, max_pending=max_pending, result_ttl=60)
+
+    accepted, rejected, deduplicated = {}, 0, 0
+    start = time.perf_counter()
+    for i in range(users):
+        memory = {"user_id": f"user-{i}", "title": "Día de playa", "user_description": f"Fui a la playa con mi nieto número {i}."}
+        # One user in four double-submits (e.g. a double tap in the app)
+        for _ in range(2 if i % 4 == 0 else 1):
+            try:
+                job, dup = jobs.submit(memory["user_id"], memory)
+            except QueueFull:
+                rejected += 1
+                continue
+            deduplicated += dup
+            accepted[job.id] = job
+    submit_ms = (time.perf_counter() - start) * 1000
+
+    for job in accepted.values():
+        job.done.wait()
+    elapsed = time.perf_counter() - start
+
+    latencies = [job.finished - job.created for job in accepted.values()]
+    print(f"users: {users} | workers: {workers} | max pending: {max_pending} | stub latency: {latency}s")
+    print(f"submit burst: {submit_ms:.1f} ms")
+    print(f"jobs run: {len(accepted)} | deduplicated submits: {deduplicated} | rejected (429): {rejected}")
+    print(f"job latency p50: {statistics.median(latencies):.2f}s | max: {max(latencies):.2f}s | total: {elapsed:.2f}s")
+    print(f"stats: {jobs.stats()}")
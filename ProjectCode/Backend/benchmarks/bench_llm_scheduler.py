@@ -0,0 +1,126 @@
+"""
+Benchmark: LLM scheduler against a rate-limited provider.
+
+Starts benchmarks/stub_llm_server.py limited to `max_rps` requests/second and
+sends a burst of `generations` generation-priority calls through akickoff()
+(the ASGI path, so crewai's per-call CPU cost does not hide the scheduling),
+followed shortly after by `corrections` interactive corrections. Runs twice,
+each in its own process since the limits are read at import time:
+
+- "no limits": LLM_RPM/LLM_TPM = 0, the scheduler only reacts to 429s
+- "limited":   LLM_RPM set just under the provider's limit
+
+Needs the real crewai/litellm/openai packages. Run from Backend/:
+    python -m benchmarks.bench_llm_scheduler [generations] [corrections] [max_rps]
+"""
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+CONFIG_PATH = os.path.join(BACKEND_DIR, "config")
+
+
+def percentiles(values: list) -> dict:
+    if not values:
+        return {"p50": None, "p95": None}
+    values = sorted(values)
+    return {"p50": round(statistics.median(values), 2), "p95": round(values[max(0, int(len(values) * 0.95) - 1)], 2)}
+
+
+async def run_mode(generations: int, corrections: int) -> dict:
+    from core.llm_runner import akickoff
+    from core.llm_scheduler import get_scheduler
+    from utils.json_utils import parse_llm_json
+
+    latencies = {"generation": [], "correction": []}
+    failures = {"generation": 0, "correction": 0}
+
+    async def call(kind: str, i: int, delay: float = 0.0):
+        await asyncio.sleep(delay)
+        start = time.perf_counter()
+        try:
+            await akickoff(CONFIG_PATH, "corrector_agent", "corrector_task", {"correct_answer": "playa", "user_answer": f"{kind} {i}"},
+                           "gpt-4o-mini", 0, parse_llm_json, priority=kind, profile={"backend": "openai"})
+        except Exception:
+            failures[kind] += 1
+            return
+        latencies[kind].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    # The corrections arrive while the generation burst is still queued
+    await asyncio.gather(*[call("generation", i) for i in range(generations)],
+                         *[call("correction", i, delay=0.2) for i in range(corrections)])
+
+    return {
+        "seconds": round(time.perf_counter() - start, 2),
+        "failures": failures,
+        "generation_s": percentiles(latencies["generation"]),
+        "correction_s": percentiles(latencies["correction"]),
+        "scheduler": {k: v for k, v in get_scheduler().stats().items() if k in ("granted", "rate_limited", "retried", "timed_out")}
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def server_stats(port: int) -> dict:
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/stats") as response:
+        return json.loads(response.read())
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--mode":
+        result = asyncio.run(run_mode(int(sys.argv[2]), int(sys.argv[3])))
+        print("RESULT " + json.dumps(result))
+        sys.exit(0)
+
+    generations = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    corrections = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    max_rps = float(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    modes = {
+        "no limits": {"LLM_RPM": "0", "LLM_TPM": "0"},
+        # The stub counts a sliding one-second window, so keep bursts short
+        "limited": {"LLM_RPM": str(max_rps * 60 * 0.8), "LLM_TPM": "0", "LLM_BURST_S": "0.25"},
+    }
+
+    print(f"provider limit: {max_rps} req/s | {generations} generations + {corrections} corrections")
+    for mode, limits in modes.items():
+        port = free_port()
+        server = subprocess.Popen([sys.executable, "-m", "benchmarks.stub_llm_server", str(port), "0.1", str(max_rps)], cwd=BACKEND_DIR, stdout=subprocess.PIPE, text=True)
+        server.stdout.readline()
+
+        env = dict(os.environ, **limits,
+                   LLM_API_BASE=f"http://127.0.0.1:{port}/v1",
+                   OPENAI_API_KEY="stub",
+                   LLM_CACHE_SIZE="0",
+                   OTEL_SDK_DISABLED="true",
+                   CREWAI_DISABLE_TELEMETRY="true")
+        env.pop("LLM_CACHE_DB", None)
+
+        try:
+            out = subprocess.run([sys.executable, "-m", "benchmarks.bench_llm_scheduler", "--mode", str(generations), str(corrections)], cwd=BACKEND_DIR, env=env, capture_output=True, text=True)
+            line = next((l for l in out.stdout.splitlines() if l.startswith("RESULT ")), None)
+            if line is None:
+                print(f"{mode} run failed:\n{out.stderr[-2000:]}")
+                continue
+            r = json.loads(line[len("RESULT "):])
+            provider = server_stats(port)
+        finally:
+            server.terminate()
+
+        print(f"\n{mode}: {r['seconds']}s | 429s from provider: {provider['rate_limited']} | failed calls: {r['failures']}")
+        print(f"  correction latency s: {r['correction_s']} | generation latency s: {r['generation_s']}")
+        print(f"  scheduler: {r['scheduler']}")
@@ -0,0 +1,135 @@
+"""
+Benchmark: generation latency and prompt sizes against the length of the memory.
+
+Runs the pipeline (ExerciseService.generate) on generated Spanish memories of
+200 to 20,000 words, against a stub LLM whose latency grows with its prompt and
+its answer: `base` seconds + input tokens / `input_tps` + output tokens / `output_tps`.
+The stub selector answers like the real one, copying a contiguous excerpt of
+about 15% of the text it got (at most 600 words) for every slot.
+
+- whole:   SELECTOR_CHUNK_WORDS=0 and SLOT_MAX_TOKENS=0, the whole description in one selector call
+- chunked: the defaults (core/chunker.py), one call per chosen chunk and capped slot content
+
+Reports selector and total latency, selector calls, the largest description
+sent to the selector and the largest input of a generator / verificador call
+(tokens), plus the latency of the local selector on the same text.
+
+Run from Backend/:
+    python -m benchmarks.bench_long_memory [input_tps] [output_tps]
+"""
+import json
+import os
+import random
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+os.environ["LLM_CACHE_SIZE"] = "0"
+os.environ["NOVELTY"] = "0"
+os.environ.pop("LLM_CACHE_DB", None)
+os.environ["SELECTION_CACHE"] = "0"
+
+from benchmarks import stub_llm
+from core import chunker, local_selector
+from core.prompt_compiler import count_tokens
+from services.exercise_service import ExerciseService
+
+LENGTHS = (200, 1000, 2000, 5000, 10000, 20000)
+DIFFICULTY = {"fill_in_the_blank": "media", "multiple_choice": "media", "ordering": "media"}
+
+PEOPLE = ("mi madre", "mi hermano Paco", "la abuela Felisa", "mi marido Andrés", "mi amiga Carmen", "el tío Julián", "mi hija Lucía")
+PLACES = ("Benidorm", "el pueblo", "la fábrica de Vigo", "el mercado de Ruzafa", "la playa de Levante", "Bilbao", "la plaza Mayor")
+THINGS = ("una tortilla de patatas", "un Seat 600", "una máquina de coser", "un acordeón", "una caja de mazapanes", "un balde de castañas")
+SENTENCES = (
+    "En {year} fui a {place} con {person}.",
+    "Aquel verano {person} llevaba {thing} a todas partes.",
+    "Recuerdo que en {place} hacía mucho calor y {person} se reía de todo.",
+    "Después de comer, {person} nos contaba historias de cuando era joven.",
+    "Un domingo de {month} compramos {thing} en {place}.",
+    "Por la noche cenábamos en casa y {person} cantaba coplas.",
+    "Años después volví a {place} y ya nada era igual.",
+    "Mi padre trabajaba mucho, pero los sábados íbamos con {person} a {place}.",
+)
+MONTHS = ("enero", "marzo", "mayo", "julio", "agosto", "octubre", "diciembre")
+
+
+def memory_text(words: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    sentences, count = [], 0
+    while count < words:
+        sentence = rng.choice(SENTENCES).format(year=rng.randrange(1940, 2000), place=rng.choice(PLACES), person=rng.choice(PEOPLE),
+                                                thing=rng.choice(THINGS), month=rng.choice(MONTHS))
+        sentences.append(sentence)
+        count += len(sentence.split())
+    return " ".join(sentences)
+
+
+class LengthAwareResponder(stub_llm.StubResponder):
+    """ StubResponder whose latency depends on the size of the prompt and of the answer. """
+
+    def __init__(self, base: float, input_tps: float, output_tps: float):
+        super().__init__(seed=42)
+        self.base, self.input_tps, self.output_tps = base, input_tps, output_tps
+
+    def __call__(self, agent, task, inputs: dict) -> str:
+        if "exercise_types" in inputs:
+            words = inputs["description"].split()
+            size = min(600, max(60, len(words) * 15 // 100))
+            rng = random.Random(len(words))
+            answer = []
+            for _ in inputs["exercise_types"]:
+                start = rng.randrange(0, max(1, len(words) - size))
+                answer.append(" ".join(words[start:start + size]))
+            answer = json.dumps(answer, ensure_ascii=False)
+        else:
+            answer = super().__call__(agent, task, inputs)
+        time.sleep(self.base + count_tokens(json.dumps(inputs, ensure_ascii=False)) / self.input_tps + count_tokens(answer) / self.output_tps)
+        return answer
+
+
+def run(service: ExerciseService, text: str) -> dict:
+    stub_llm.reset_calls()
+    start = time.perf_counter()
+    result = service.generate("bench-user", "Mis recuerdos", text, "")
+    elapsed = (time.perf_counter() - start) * 1000
+
+    selector_calls = [call["inputs"] for call in stub_llm.CALLS if "exercise_types" in call["inputs"]]
+    downstream = [call["inputs"] for call in stub_llm.CALLS if "exercise_types" not in call["inputs"]]
+    return {
+        "selector_ms": result["timing"]["selector_ms"],
+        "total_ms": round(elapsed),
+        "calls": len(selector_calls),
+        "selector_tokens": max(count_tokens(inputs["description"]) for inputs in selector_calls),
+        "agent_tokens": max((count_tokens(str(value)) for inputs in downstream for value in inputs.values()), default=0),
+    }
+
+
+def local_ms(text: str) -> float:
+    start = time.perf_counter()
+    local_selector.select("Mis recuerdos", text, "", list(DIFFICULTY))
+    return round((time.perf_counter() - start) * 1000, 1)
+
+
+if __name__ == "__main__":
+    input_tps = float(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    output_tps = float(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    stub_llm.install(LengthAwareResponder(0.1, input_tps, output_tps))
+
+    service = ExerciseService()
+    service.orchestrator.get_difficulties = lambda user_id: dict(DIFFICULTY)
+    defaults = (chunker.CHUNK_WORDS, chunker.SLOT_MAX_TOKENS)
+    # First calls pay the lazy imports and the tokenizer load: keep them out of the table
+    run(service, memory_text(200))
+    local_ms(memory_text(200))
+
+    print(f"stub LLM: 0.1 s + input tokens / {input_tps:g} + output tokens / {output_tps:g} | chunks of {defaults[0]} words, slots capped at {defaults[1]} tokens")
+    print(f"{'words':>6} {'mode':<8}{'selector ms':>12}{'total ms':>10}{'calls':>7}{'selector tok':>14}{'agent tok':>11}{'local ms':>10}")
+    for words in LENGTHS:
+        text = memory_text(words)
+        for mode, (chunk_words, max_tokens) in (("whole", (0, 0)), ("chunked", defaults)):
+            chunker.CHUNK_WORDS, chunker.SLOT_MAX_TOKENS = chunk_words, max_tokens
+            result = run(service, text)
+            local = local_ms(text) if mode == "chunked" else ""
+            print(f"{words:>6} {mode:<8}{result['selector_ms']:>12}{result['total_ms']:>10}{result['calls']:>7}{result['selector_tokens']:>14}{result['agent_tokens']:>11}{local:>10}")
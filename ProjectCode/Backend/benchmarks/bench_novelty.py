@@ -0,0 +1,133 @@
+"""
+Benchmark: the novelty index (core/novelty.py) against the size of a user's history.
+
+A user's history is filled with `size` generated exercises, PER_MEMORY per
+memory; then 400 candidates are checked against the memory they are about:
+
+- repeat:       a served exercise asked with other words (same facts)
+- same answer:  a served question with a fact other than its answer changed;
+                it asks for the same thing again, so it counts as a repeat
+- other answer: a served question whose answer is another one; a new exercise
+- new:          an exercise about people and places not in the history
+
+Reports the mean lookup time of NoveltyIndex.near_duplicate (MinHash + LSH
+buckets of the memory), of an exact Jaccard scan over the whole history (what
+the lookup would cost without the index), the mean time of to_avoid(), and the
+share of each kind of candidate rejected. "other answer" and "new" should stay
+near 0% whatever the size of the history. The history is a temporary SQLite file.
+
+Run from Backend/:
+    python -m benchmarks.bench_novelty [sizes...]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+os.environ["NOVELTY"] = "0"
+
+from core import novelty
+
+SIZES = (100, 1000, 5000, 20000)
+CANDIDATES = 100  # Per kind
+PER_MEMORY = 50
+
+NAMES = ("Paco", "Felisa", "Andrés", "Carmen", "Julián", "Lucía", "Ramón", "Dolores", "Hugo", "Pilar", "Tomás", "Encarna",
+         "Vicente", "Rosario", "Manolo", "Amparo", "Emilio", "Concha", "Rafael", "Teresa")
+RELATIVES = ("mi hermano", "la abuela", "mi marido", "mi amiga", "el tío", "mi hija", "mi primo", "la vecina", "mi nieto", "el maestro")
+PLACES = ("la playa", "el mercado", "la fábrica", "la ermita", "el cine", "la plaza", "el puerto", "la estación", "el colegio", "la feria")
+TOWNS = ("Benidorm", "Vigo", "Ruzafa", "Bilbao", "Santander", "Cuenca", "Lugo", "Jaén", "Teruel", "Gandía", "Soria", "Huelva",
+         "Ávila", "Cádiz", "Zamora", "Segovia", "Tarifa", "Ronda", "Jaca", "Llanes")
+THINGS = ("una tortilla", "un acordeón", "una radio", "un cuadro", "una bicicleta", "una máquina de coser", "un balde", "una cesta",
+          "un sombrero", "una guitarra", "un reloj", "una muñeca")
+MATERIALS = ("de madera", "de lata", "de mimbre", "de cuero", "de plata", "de colores", "de castañas", "de mazapanes", "de flores", "de nácar")
+# (question, the same question with other words), answer field
+QUESTIONS = (
+    ("¿Con quién fuiste a {place} en {year}?", "¿Quién te acompañó a {place} en el año {year}?", "person"),
+    ("¿Qué llevaba {person} a {place} en {year}?", "En {year}, ¿qué objeto se llevaba {person} cuando iba a {place}?", "thing"),
+    ("¿A dónde fuiste con {person} en {year}?", "¿Qué lugar visitaste junto a {person} en {year}?", "place"),
+    ("¿Qué compraste en {place} con {person} en {year}?", "Cuando fuiste a {place} con {person} en {year}, ¿qué comprasteis?", "thing"),
+)
+
+
+def facts(rng: random.Random, held_out: bool = False) -> dict:
+    """ Facts of one exercise; the last two names and towns are held out of the history ("new" candidates). """
+    names, towns = (NAMES[-2:], TOWNS[-2:]) if held_out else (NAMES[:-2], TOWNS[:-2])
+    return {"kind": rng.randrange(len(QUESTIONS)), "place": f"{rng.choice(PLACES)} de {rng.choice(towns)}",
+            "person": f"{rng.choice(RELATIVES)} {rng.choice(names)}", "thing": f"{rng.choice(THINGS)} {rng.choice(MATERIALS)}",
+            "year": rng.randrange(1940, 2000)}
+
+
+def exercise(fact: dict, reworded: bool = False) -> dict:
+    question, other_words, answer = QUESTIONS[fact["kind"]]
+    return {"type": "fill_in_the_blank", "question": (other_words if reworded else question).format(**fact), "correct_answer": fact[answer]}
+
+
+def one_fact_changed(rng: random.Random, fact: dict, answer: bool) -> dict:
+    """ The exercise of `fact` with its answer (or another of its facts) changed. """
+    fact = dict(fact)
+    answer_field = QUESTIONS[fact["kind"]][2]
+    fields = [field for field in ("place", "person", "thing", "year") if field in QUESTIONS[fact["kind"]][0] or field == answer_field]
+    field = answer_field if answer else rng.choice([field for field in fields if field != answer_field])
+    fact[field] = facts(rng, held_out=True)[field] if field != "year" else fact["year"] + rng.randrange(1, 10)
+    return exercise(fact)
+
+
+def run(size: int) -> dict:
+    rng = random.Random(size)
+    with tempfile.TemporaryDirectory() as tmp:
+        index = novelty.NoveltyIndex(os.path.join(tmp, "novelty.db"))
+        served_facts = [facts(rng) for _ in range(size)]
+        served = [exercise(fact) for fact in served_facts]
+        memories = -(-size // PER_MEMORY)
+        for start in range(0, size, PER_MEMORY):
+            index.record("bench-user", f"Recuerdo {start // PER_MEMORY}", served[start:start + PER_MEMORY])
+        shingle_sets = [set(novelty.exercise_shingles(ex).tolist()) for ex in served]
+
+        def served_one():
+            i = rng.randrange(size)
+            return f"Recuerdo {i // PER_MEMORY}", served_facts[i]
+
+        candidates = {"repeat": [], "same answer": [], "other answer": [], "new": []}
+        for _ in range(CANDIDATES):
+            title, fact = served_one()
+            candidates["repeat"].append((title, exercise(fact, reworded=True)))
+            title, fact = served_one()
+            candidates["same answer"].append((title, one_fact_changed(rng, fact, answer=False)))
+            title, fact = served_one()
+            candidates["other answer"].append((title, one_fact_changed(rng, fact, answer=True)))
+            candidates["new"].append((f"Recuerdo {rng.randrange(memories)}", exercise(facts(rng, held_out=True))))
+        every = [ex for kind in candidates.values() for _, ex in kind]
+
+        start = time.perf_counter()
+        rejected = {kind: sum(index.near_duplicate("bench-user", title, ex) is not None for title, ex in exs) / len(exs) for kind, exs in candidates.items()}
+        lsh_ms = (time.perf_counter() - start) * 1000 / len(every)
+
+        start = time.perf_counter()
+        for ex in every:
+            hashes = set(novelty.exercise_shingles(ex).tolist())
+            max(len(hashes & other) / max(1, len(hashes | other)) for other in shingle_sets)
+        scan_ms = (time.perf_counter() - start) * 1000 / len(every)
+
+        start = time.perf_counter()
+        for i in range(CANDIDATES):
+            index.to_avoid("bench-user", f"Recuerdo {i % memories}", "fill_in_the_blank", "Fui a Benidorm con mi madre en 1975.")
+        avoid_ms = (time.perf_counter() - start) * 1000 / CANDIDATES
+
+    return {"lsh_ms": lsh_ms, "scan_ms": scan_ms, "avoid_ms": avoid_ms, "rejected": rejected}
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    print(f"threshold: {novelty.NOVELTY_THRESHOLD} (identical: {novelty.NOVELTY_IDENTICAL}) | {novelty.NUM_PERM} permutations, {novelty.BANDS} bands"
+          f" | {PER_MEMORY} exercises per memory | {CANDIDATES} candidates per kind")
+    print(f"{'history':>8}{'lsh ms':>9}{'scan ms':>9}{'to_avoid ms':>13}   rejected: {'repeat':>7}{'same answer':>13}{'other answer':>14}{'new':>6}")
+    for size in sizes:
+        r = run(size)
+        rejected = r["rejected"]
+        print(f"{size:>8}{r['lsh_ms']:>9.3f}{r['scan_ms']:>9.3f}{r['avoid_ms']:>13.3f}   {'':>9} {rejected['repeat']:>7.0%}{rejected['same answer']:>13.0%}"
+              f"{rejected['other answer']:>14.0%}{rejected['new']:>6.0%}")
@@ -0,0 +1,82 @@
+"""
+Benchmark: selector work of repeated practice sessions on the same memories.
+
+Every memory is practised `sessions` times through ExerciseService.generate,
+against the stub LLM (benchmarks/stub_llm.py) with `latency` seconds per call:
+
+- no cache:  SELECTION_CACHE=0, every session runs the selector
+- on demand: the first session of a memory selects and stores, the rest hit
+- eager:     the memory is preprocessed (as on create/edit) before its sessions
+
+Reports selector LLM calls per session and the p50 of timing["selector_ms"].
+The cache is a temporary SQLite file.
+
+Run from Backend/:
+    python -m benchmarks.bench_selection_cache [memories] [sessions] [latency]
+"""
+import os
+import statistics
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+os.environ["LLM_CACHE_SIZE"] = "0"
+os.environ["NOVELTY"] = "0"
+os.environ.pop("LLM_CACHE_DB", None)
+
+from benchmarks import stub_llm
+import core.selection_cache as selection_cache
+from services.exercise_service import ExerciseService
+
+DIFFICULTY = {"fill_in_the_blank": "media", "multiple_choice": "media", "ordering": "media"}
+
+
+def memory(i: int) -> tuple:
+    return f"Recuerdo {i}", f"Fui a la playa con mi nieto número {i}. Comimos paella en el chiringuito. Volvimos en tren por la tarde."
+
+
+def run(memories: int, sessions: int, cached: bool, eager: bool) -> dict:
+    os.environ["SELECTION_CACHE"] = "1" if cached else "0"
+    if selection_cache.get_selection_cache() is not None:
+        selection_cache.get_selection_cache().clear()
+
+    service = ExerciseService()
+    service.orchestrator.get_difficulties = lambda user_id: dict(DIFFICULTY)
+
+    if eager:
+        for i in range(memories):
+            service.preprocess(i, None, *memory(i), "")
+        service.preprocessing.shutdown(wait=True)
+
+    stub_llm.reset_calls()
+    selector_ms = []
+    for _ in range(sessions):
+        for i in range(memories):
+            result = service.generate("bench-user", *memory(i), "")
+            selector_ms.append(result["timing"]["selector_ms"])
+
+    selector_calls = sum(1 for call in stub_llm.CALLS if "exercise_types" in (call["inputs"] or {}))
+    return {"calls": selector_calls / (memories * sessions), "p50": statistics.median(selector_ms)}
+
+
+if __name__ == "__main__":
+    memories = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    sessions = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    latency = float(sys.argv[3]) if len(sys.argv) > 3 else 0.2
+
+    stub_llm.install(stub_llm.StubResponder(latency=latency, seed=42))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["SELECTION_CACHE_DB"] = os.path.join(tmp, "selection_cache.db")
+        results = {
+            "no cache": run(memories, sessions, cached=False, eager=False),
+            "on demand": run(memories, sessions, cached=True, eager=False),
+            "eager": run(memories, sessions, cached=True, eager=True),
+        }
+        print(f"memories: {memories} | sessions per memory: {sessions} | stub LLM latency: {latency} s")
+        print(f"{'cache':<12}{'selector calls/session':>24}{'selector p50 ms':>18}")
+        for name, result in results.items():
+            print(f"{name:<12}{result['calls']:>24.2f}{result['p50']:>18}")
+        print(f"selection cache: {selection_cache.get_selection_cache().stats()}")
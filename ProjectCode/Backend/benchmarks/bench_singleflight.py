@@ -0,0 +1,61 @@
+"""
+Benchmark: LLM calls when the same memory is requested twice at the same time.
+
+Simulates a caretaker opening each memory on two devices (or a frontend retry):
+every memory gets `copies` concurrent ExerciseService.generate calls, run against
+the stub LLM (benchmarks/stub_llm.py) with some latency so they overlap. The
+baseline sends each memory once.
+
+Run from Backend/:
+    python -m benchmarks.bench_singleflight [memories] [copies]
+"""
+import os
+import sys
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+os.environ["LLM_CACHE_SIZE"] = "0"
+os.environ["NOVELTY"] = "0"
+os.environ.pop("LLM_CACHE_DB", None)
+
+from benchmarks import stub_llm
+from core import llm_runner
+from services.exercise_service import ExerciseService
+
+DIFFICULTY = {"fill_in_the_blank": "media", "multiple_choice": "media", "ordering": "media"}
+
+
+def run(memories: int, copies: int):
+    stub_llm.reset_calls()
+    service = ExerciseService()
+    service.orchestrator.get_difficulties = lambda user_id: dict(DIFFICULTY)
+
+    def request(i):
+        service.generate("bench-user", f"Recuerdo {i}", f"Fui a la playa con mi nieto número {i}.", "")
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=request, args=(i,)) for i in range(memories) for _ in range(copies)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(stub_llm.CALLS) / memories, time.perf_counter() - start, service.coalescing_stats()["sync"]
+
+
+if __name__ == "__main__":
+    memories = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    copies = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+
+    stub_llm.install(stub_llm.StubResponder(latency=0.05, seed=42))
+
+    single = run(memories, 1)
+    duplicated = run(memories, copies)
+
+    print(f"memories: {memories} | concurrent copies per memory: {copies}")
+    print(f"LLM calls/memory, one request each:        {single[0]:.2f}")
+    print(f"LLM calls/memory, {copies} concurrent requests:  {duplicated[0]:.2f} (without coalescing ~{single[0] * copies:.2f})")
+    print(f"pipeline coalescing: {duplicated[2]}")
+    print(f"llm coalescing: {llm_runner.stats()['sync']}")
@@ -0,0 +1,142 @@
+"""
+Benchmark: per-operation latency and throughput of the storage backends.
+
+Seeds `users` generated users (database/seed.py) into each backend and times
+every storage operation db.py uses, then runs `threads` workers doing the
+per-answer mix (one increment, one projected stats read) for a few seconds:
+
+- sqlite:   SQLiteStorage on a temporary WAL file
+- supabase: SupabaseStorage over the in-process stand-in of the Supabase
+            client (benchmarks/stub_supabase.py) with `latency_ms` per round trip
+- --live:   SupabaseStorage on the real project of the .env, read operations
+            only, on the users already there (nothing is written)
+
+Run from Backend/:
+    python -m benchmarks.bench_storage [users] [latency_ms] [threads] [--live]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from database import seed
+from database.models import STAT_TYPES, stat_columns
+
+READS = ("get_user", "get_caretaker_id", "get_user_stats", "get_user_stats (projected)")
+WRITES = ("increment_user_stats", "apply_level_transitions", "update_user_stats")
+
+
+def percentiles(values: list) -> dict:
+    values = sorted(values)
+    return {"p50": round(statistics.median(values), 3), "p95": round(values[max(0, int(len(values) * 0.95) - 1)], 3)}
+
+
+def operation(storage, name: str, user_id: str, rng: random.Random):
+    ex_type = rng.choice(STAT_TYPES)
+    if name == "get_user":
+        return storage.get_user(user_id)
+    if name == "get_caretaker_id":
+        return storage.get_caretaker_id(user_id)
+    if name == "get_user_stats":
+        return storage.get_user_stats(user_id)
+    if name == "get_user_stats (projected)":
+        return storage.get_user_stats(user_id, stat_columns(STAT_TYPES))
+    if name == "increment_user_stats":
+        return storage.increment_user_stats([{"id": user_id, "exercise_type": ex_type, "done": 1, "correct": 1}])
+    if name == "apply_level_transitions":
+        return storage.apply_level_transitions(user_id, {ex_type: {"level": 1, "done": 0, "right": 0}})
+    return storage.update_user_stats(user_id, {f"{ex_type}_current_level": 1})
+
+
+def latencies(storage, user_ids: list, operations: tuple, calls: int) -> dict:
+    rng = random.Random(1)
+    results = {}
+    for name in operations:
+        times = []
+        for _ in range(calls):
+            user_id = rng.choice(user_ids)
+            start = time.perf_counter()
+            operation(storage, name, user_id, rng)
+            times.append((time.perf_counter() - start) * 1000)
+        results[name] = percentiles(times)
+    return results
+
+
+def throughput(storage, user_ids: list, threads: int, seconds: float, writes: bool) -> float:
+    """ Answers per second: each is an increment plus a projected stats read (or two reads with writes off). """
+    stop = time.perf_counter() + seconds
+    counts = [0] * threads
+
+    def worker(i: int):
+        rng = random.Random(i)
+        while time.perf_counter() < stop:
+            user_id = rng.choice(user_ids)
+            operation(storage, "increment_user_stats" if writes else "get_user", user_id, rng)
+            operation(storage, "get_user_stats (projected)", user_id, rng)
+            counts[i] += 1
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for worker_thread in workers:
+        worker_thread.start()
+    for worker_thread in workers:
+        worker_thread.join()
+    return round(sum(counts) / seconds, 1)
+
+
+def run(storage, user_ids: list, calls: int, threads: int, writes: bool = True) -> dict:
+    # Without writes, only the reads that work for any existing user (not every user has a caretaker)
+    operations = READS + WRITES if writes else ("get_user", "get_user_stats", "get_user_stats (projected)")
+    return {
+        "latency": latencies(storage, user_ids, operations, calls),
+        "throughput": {n: throughput(storage, user_ids, n, 2.0, writes) for n in sorted({1, threads})},
+    }
+
+
+def report(name: str, result: dict):
+    print(f"\n{name}")
+    print(f"  {'operation':<30}{'p50 ms':>10}{'p95 ms':>10}")
+    for operation_name, values in result["latency"].items():
+        print(f"  {operation_name:<30}{values['p50']:>10}{values['p95']:>10}")
+    for threads, rate in result["throughput"].items():
+        print(f"  answers/s with {threads:>2} threads: {rate}")
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    users = int(args[0]) if len(args) > 0 else 1000
+    latency_ms = float(args[1]) if len(args) > 1 else 20
+    threads = int(args[2]) if len(args) > 2 else 8
+    calls = 200
+
+    from benchmarks.stub_supabase import StubSupabase
+    from database.sqlite_storage import SQLiteStorage
+    from database.supabase_storage import SupabaseStorage
+
+    data = seed.generate(users)
+    user_ids = [user["id"] for user in data["users"]]
+    print(f"users: {users} | supabase stub RTT: {latency_ms} ms | threads: {threads} | {calls} calls per operation")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sqlite = SQLiteStorage(os.path.join(tmp, "bench.db"))
+        start = time.perf_counter()
+        seed.seed(sqlite, users)
+        print(f"sqlite seed: {round(time.perf_counter() - start, 2)} s")
+        report("sqlite (WAL)", run(sqlite, user_ids, calls, threads))
+
+    stub = SupabaseStorage(StubSupabase(latency_ms / 1000))
+    seed.seed(stub, users)
+    report(f"supabase (stub, {latency_ms} ms RTT)", run(stub, user_ids, calls // 4, threads))
+
+    if "--live" in sys.argv:
+        live = SupabaseStorage()
+        live_ids = [user["id"] for user in live.get_users() if live.get_user_stats(user["id"], ["id"])]
+        if live_ids:
+            report("supabase (live, reads only)", run(live, live_ids, calls // 4, threads, writes=False))
+        else:
+            print("\nsupabase (live): no users with a stats row")
@@ -0,0 +1,134 @@
+"""
+Offline evaluation of the agent model profiles (agents.yaml `profile:`).
+
+Replays recorded calls (benchmarks/fixtures/profile_eval.jsonl, one
+{"agent_name", "task_name", "inputs", "expected"?} per line) through several
+profiles and reports, per agent and profile:
+
+- agreement with the reference profile (same "status" for the validator and the
+  corrector; word overlap >= 0.5 of the extracted fragments for the selector)
+- accuracy against the recorded "expected" verdict, when the case has one
+- p50/p95 latency and failed calls
+
+Profiles:
+- reference:  the large model on the provider (LLM_MODEL on "openai")
+- configured: each agent's own profile from agents.yaml (LLM_BACKENDS for those without `backend`)
+- local:      the small local model alone ("ollama", no fallback)
+
+Run from Backend/ (LLM_API_BASE / OLLAMA_URL as in .env):
+    python -m benchmarks.eval_profiles [--cases file.jsonl] [--stub]
+
+With --stub both backends are two local benchmarks/stub_llm_server.py
+instances (provider 0.6s, local 0.15s); only latencies are meaningful then.
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+os.environ["LLM_CACHE_SIZE"] = "0"
+os.environ.pop("LLM_CACHE_DB", None)
+
+CONFIG_PATH = os.path.join(BACKEND_DIR, "config")
+CASES_FILE = os.path.join(BACKEND_DIR, "benchmarks", "fixtures", "profile_eval.jsonl")
+
+PROFILES = {
+    "reference": {"model": os.getenv("LLM_MODEL", "gpt-4o-mini"), "backend": "openai", "temperature": 0},
+    "configured": None,
+    "local": {"backend": "ollama"},
+}
+
+
+def load_cases(path: str) -> list:
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def words(value) -> set:
+    return set(json.dumps(value, ensure_ascii=False).lower().replace('"', " ").split())
+
+
+def agree(agent_name: str, answer, reference) -> bool:
+    if answer is None or reference is None:
+        return False
+    if agent_name == "selector_agent":
+        a, b = words(answer), words(reference)
+        return len(a & b) / max(1, len(a | b)) >= 0.5
+    return answer.get("status") == reference.get("status")
+
+
+def replay(cases: list, profile: dict) -> list:
+    """ [(answer or None, seconds)] of every case through one profile. """
+    from core.llm_runner import kickoff
+    from utils.json_utils import parse_llm_json
+
+    results = []
+    for case in cases:
+        parse = json.loads if case["agent_name"] == "selector_agent" else parse_llm_json
+        start = time.perf_counter()
+        try:
+            answer = kickoff(CONFIG_PATH, case["agent_name"], case["task_name"], case["inputs"], parse=parse, profile=profile)
+        except Exception as e:
+            print(f"\033[91m[eval_profiles]\033[0m {case['agent_name']}/{case['task_name']} failed: {e}")
+            answer = None
+        results.append((answer, time.perf_counter() - start))
+    return results
+
+
+def percentile(values: list, q: float) -> int:
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * q))] * 1000) if values else 0
+
+
+def report(cases: list, runs: dict):
+    print(f"{'agent':<18}{'profile':<12}{'agree':>8}{'accuracy':>10}{'p50 ms':>9}{'p95 ms':>9}{'failed':>8}")
+    for agent_name in dict.fromkeys(case["agent_name"] for case in cases):
+        indexes = [i for i, case in enumerate(cases) if case["agent_name"] == agent_name]
+        labelled = [i for i in indexes if "expected" in cases[i]]
+        for name, results in runs.items():
+            answers = [results[i][0] for i in indexes]
+            agreed = sum(agree(agent_name, results[i][0], runs["reference"][i][0]) for i in indexes)
+            correct = sum(isinstance(results[i][0], dict) and results[i][0].get("status") == cases[i]["expected"] for i in labelled)
+            latencies = [results[i][1] for i in indexes if results[i][0] is not None]
+            accuracy = f"{correct}/{len(labelled)}" if labelled else "-"
+            print(f"{agent_name:<18}{name:<12}{agreed:>5}/{len(indexes):<2}{accuracy:>10}{percentile(latencies, 0.5):>9}{percentile(latencies, 0.95):>9}{answers.count(None):>8}")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_stubs() -> list:
+    """ Starts the provider and local stub servers and points the backends at them. """
+    servers = []
+    for env_name, latency in (("LLM_API_BASE", "0.6"), ("OLLAMA_URL", "0.15")):
+        port = free_port()
+        server = subprocess.Popen([sys.executable, "-m", "benchmarks.stub_llm_server", str(port), latency], cwd=BACKEND_DIR, stdout=subprocess.PIPE, text=True)
+        server.stdout.readline()
+        os.environ[env_name] = f"http://127.0.0.1:{port}/v1"
+        servers.append(server)
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    return servers
+
+
+if __name__ == "__main__":
+    cases_file = sys.argv[sys.argv.index("--cases") + 1] if "--cases" in sys.argv else CASES_FILE
+    servers = start_stubs() if "--stub" in sys.argv else []
+
+    try:
+        cases = load_cases(cases_file)
+        print(f"{len(cases)} recorded calls from {os.path.relpath(cases_file, BACKEND_DIR)}")
+        # crewai's first call pays its lazy initialisation; keep it out of the latencies
+        replay(cases[:1], PROFILES["reference"])
+        runs = {name: replay(cases, profile) for name, profile in PROFILES.items()}
+        report(cases, runs)
+    finally:
+        for server in servers:
+            server.terminate()
@@ -0,0 +1,157 @@
+"""
+Offline evaluation of the local extractive selector (core/local_selector.py)
+against recorded LLM selections.
+
+Each line of benchmarks/fixtures/selector_eval.jsonl is one memory
+{"title", "description", "analysis", "exercise_types", "llm_selection"} where
+`llm_selection` is the select_task answer for it. For the local selector and
+the recorded one it reports:
+
+- recall / precision of the reference terms, per exercise type (content terms
+  of the slot, stemmed as the local selector does)
+- coverage: share of the memory's content terms reached by all the slots
+- distinct: mean Jaccard of the terms of two slots of the same type (lower is better)
+- rules: slots that follow select_task (fill_in_the_blank >= 100 words, or the
+  whole memory when it is shorter; 4-6 statements / events otherwise)
+- p50/p95 latency of the local selector
+
+Run from Backend/:
+    python -m benchmarks.eval_selector [--cases file.jsonl] [--record]
+
+--record replaces `llm_selection` (and `llm_ms`) of every case with a fresh
+select_task call through core/llm_runner (LLM_API_BASE / LLM_MODEL as in .env).
+"""
+import json
+import os
+import re
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from core import local_selector
+
+CONFIG_PATH = os.path.join(BACKEND_DIR, "config")
+CASES_FILE = os.path.join(BACKEND_DIR, "benchmarks", "fixtures", "selector_eval.jsonl")
+TYPES = ("fill_in_the_blank", "multiple_choice", "ordering")
+
+_NUMBERED = re.compile(r"(?:^|\s)\d+[.)]\s+")
+
+
+def load_cases(path: str) -> list:
+    with open(path, "r") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def content_terms(text: str) -> set:
+    return set(local_selector.terms(text))
+
+
+def items(ex_type: str, content: str) -> int:
+    """ Statements (multiple_choice) or events (ordering) of a slot. """
+    if ex_type == "ordering" and _NUMBERED.search(content):
+        return len(_NUMBERED.findall(content))
+    return len([line for line in re.split(r"\n+|(?<=[.!?])\s+", content) if line.strip()])
+
+
+def follows_rules(ex_type: str, content: str, memory_words: int) -> bool:
+    if ex_type == "fill_in_the_blank":
+        return len(content.split()) >= min(local_selector.FITB_MIN_WORDS, int(memory_words * 0.9))
+    low, high = local_selector.FACTS if ex_type == "multiple_choice" else local_selector.EVENTS
+    return low <= items(ex_type, content) <= high
+
+
+def jaccard(a: set, b: set) -> float:
+    return len(a & b) / max(1, len(a | b))
+
+
+def score(cases: list, selections: list) -> dict:
+    """ Aggregated metrics of one selection per case, against the recorded LLM selections. """
+    per_type = {ex_type: {"recall": [], "precision": []} for ex_type in TYPES}
+    coverage, distinct, followed, slots = [], [], 0, 0
+    for case, selection in zip(cases, selections):
+        memory = content_terms(case["description"])
+        slot_terms = [content_terms(str(content)) for content in selection]
+        for ex_type, content, got, reference in zip(case["exercise_types"], selection, slot_terms, case["llm_selection"]):
+            expected = content_terms(reference)
+            per_type[ex_type]["recall"].append(len(got & expected) / max(1, len(expected)))
+            per_type[ex_type]["precision"].append(len(got & expected) / max(1, len(got)))
+            followed += follows_rules(ex_type, str(content), len(case["description"].split()))
+            slots += 1
+        coverage.append(len(memory & set().union(*slot_terms)) / max(1, len(memory)))
+        types = case["exercise_types"]
+        for i in range(len(types)):
+            for j in range(i + 1, len(types)):
+                if types[i] == types[j]:
+                    distinct.append(jaccard(slot_terms[i], slot_terms[j]))
+    return {
+        "per_type": {ex_type: {k: round(statistics.mean(v), 2) for k, v in values.items()} for ex_type, values in per_type.items() if values["recall"]},
+        "coverage": round(statistics.mean(coverage), 2),
+        "distinct": round(statistics.mean(distinct), 2) if distinct else None,
+        "rules": f"{followed}/{slots}",
+    }
+
+
+def run_local(cases: list, repeat: int = 20) -> tuple:
+    """ (selection per case, latencies in ms of every call). """
+    selections, times = [], []
+    for case in cases:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            selection = local_selector.select(case["title"], case["description"], case.get("analysis", ""), case["exercise_types"])
+            times.append((time.perf_counter() - start) * 1000)
+        selections.append(selection)
+    return selections, times
+
+
+def record(cases: list, path: str):
+    """ Refreshes llm_selection / llm_ms of every case with the live select_task. """
+    from core.llm_runner import kickoff
+
+    for case in cases:
+        start = time.perf_counter()
+        case["llm_selection"] = kickoff(CONFIG_PATH, "selector_agent", "select_task", {
+            "title": case["title"],
+            "description": case["description"],
+            "analysis": case.get("analysis", ""),
+            "exercise_types": case["exercise_types"],
+        }, parse=json.loads)
+        case["llm_ms"] = round((time.perf_counter() - start) * 1000)
+        print(f"\033[92m[eval_selector]\033[0m recorded '{case['title']}' in {case['llm_ms']} ms")
+    with open(path, "w") as f:
+        for case in cases:
+            f.write(json.dumps(case, ensure_ascii=False) + "\n")
+
+
+def report(name: str, result: dict):
+    print(f"\n{name}")
+    print(f"  {'type':<20}{'recall':>8}{'precision':>11}")
+    for ex_type, values in result["per_type"].items():
+        print(f"  {ex_type:<20}{values['recall']:>8}{values['precision']:>11}")
+    print(f"  coverage: {result['coverage']} | same-type overlap: {result['distinct']} | rules: {result['rules']}")
+
+
+if __name__ == "__main__":
+    cases_file = sys.argv[sys.argv.index("--cases") + 1] if "--cases" in sys.argv else CASES_FILE
+    cases = load_cases(cases_file)
+    if "--record" in sys.argv:
+        os.environ["LLM_CACHE_SIZE"] = "0"
+        os.environ.pop("LLM_CACHE_DB", None)
+        record(cases, cases_file)
+
+    words = [len(case["description"].split()) for case in cases]
+    print(f"{len(cases)} memories from {os.path.relpath(cases_file, BACKEND_DIR)} ({min(words)}-{max(words)} words)")
+
+    # The first call pays numpy's import; keep it out of the latencies
+    run_local(cases[:1], repeat=1)
+    selections, times = run_local(cases)
+    report("llm (recorded)", score(cases, [case["llm_selection"] for case in cases]))
+    report("local", score(cases, selections))
+
+    times.sort()
+    recorded = [case["llm_ms"] for case in cases if "llm_ms" in case]
+    print(f"\nlocal latency: p50 {statistics.median(times):.2f} ms, p95 {times[int(len(times) * 0.95) - 1]:.2f} ms")
+    if recorded:
+        print(f"llm latency (recorded): p50 {statistics.median(recorded):.0f} ms")
@@ -0,0 +1,107 @@
+"""
+Regression check: full generator prompts vs the difficulty-sliced variants.
+
+Runs the same fixtures (memories x exercise types x difficulties) through both
+prompts of each generator task. By default it only renders them and compares
+the prompt tokens. With --live it also sends both through kickoff() (the LLM
+configured in .env, or the in-process stub with --stub) and compares how many
+answers parse and pass the deterministic rules (agents/validation/rules.py).
+
+Run from Backend/:
+    python -m benchmarks.prompt_regression [--live] [--stub]
+"""
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+os.environ["LLM_CACHE_SIZE"] = "0"
+os.environ.pop("LLM_CACHE_DB", None)
+
+from agents.exercise.fill_in_the_blank import FillInTheBlankAgent
+from agents.exercise.multiple_choice import MultipleChoiceAgent
+from agents.exercise.ordering import OrderingAgent
+from agents.validation.rules import RuleEngine
+from core import prompt_compiler
+from core.config_registry import ConfigRegistry
+from core.llm_runner import kickoff
+
+CONFIG_PATH = os.path.join(BACKEND_DIR, "config")
+
+LEVELS = ["fácil", "media", "difícil"]
+
+FIXTURES = [
+    "El verano de 1975 fuimos en el Seat 600 a Benidorm. Mi hermano Paco conducía y mi madre llevaba tortilla de patatas. "
+    "Al llegar nos bañamos en la playa de Levante y por la noche cenamos en un chiringuito.",
+    "Me casé con Carmen en la iglesia de San Miguel en 1962. Después del banquete bailamos un pasodoble y "
+    "nos fuimos de luna de miel a Sevilla en tren.",
+    "Cada domingo iba con mi padre al mercado de Ruzafa a comprar naranjas. Luego tomábamos un café con leche "
+    "en el bar de Vicente y volvíamos andando a casa.",
+]
+
+GENERATORS = {
+    "fill_in_the_blank": FillInTheBlankAgent,
+    "multiple_choice": MultipleChoiceAgent,
+    "ordering": OrderingAgent,
+}
+
+
+def cases():
+    for exercise_type, generator_class in GENERATORS.items():
+        generator = generator_class(CONFIG_PATH)
+        for data in FIXTURES:
+            for level in LEVELS:
+                yield exercise_type, generator, data, level
+
+
+def compare_tokens() -> dict:
+    """ {task: {"full": tokens, level: tokens}} of the rendered prompts, averaged over the fixtures. """
+    registry = ConfigRegistry.get(CONFIG_PATH)
+    totals = {}
+    for exercise_type, generator, data, level in cases():
+        request = generator._request(data, "", level, "")
+        for variant in (None, level):
+            messages = registry.render(request["agent_name"], request["task_name"], request["inputs"], variant)
+            tokens = prompt_compiler.prompt_tokens(messages)
+            entry = totals.setdefault(request["task_name"], {}).setdefault(variant or "full", [])
+            entry.append(tokens)
+    return {task: {variant: round(sum(t) / len(t)) for variant, t in variants.items()} for task, variants in totals.items()}
+
+
+def compare_live() -> dict:
+    """ {mode: {"parsed": n, "rules_ok": n, "total": n}} for the full and sliced prompts. """
+    results = {}
+    for mode in ("full", "sliced"):
+        engine = RuleEngine()
+        parsed = total = 0
+        for exercise_type, generator, data, level in cases():
+            request = generator._request(data, "", level, "")
+            request["variant"] = None if mode == "full" else level
+            total += 1
+            try:
+                exercise = generator._finish(kickoff(**request))
+            except Exception as e:
+                print(f"\033[91m[prompt_regression]\033[0m {mode} {exercise_type}/{level} failed: {e}")
+                continue
+            parsed += 1
+            engine.check(exercise, data)
+        results[mode] = {"parsed": parsed, "rules_ok": engine.stats()["passed"], "total": total}
+    return results
+
+
+if __name__ == "__main__":
+    if "--stub" in sys.argv:
+        from benchmarks import stub_llm
+        stub_llm.install(stub_llm.StubResponder(seed=42))
+
+    print(f"tokenizer: {prompt_compiler.tokenizer_name()}")
+    print(f"{'task':<26}{'full':>8}" + "".join(f"{level:>10}" for level in LEVELS) + f"{'saved':>9}")
+    for task, tokens in compare_tokens().items():
+        sliced = sum(tokens[level] for level in LEVELS) / len(LEVELS)
+        saved = 1 - sliced / tokens["full"]
+        print(f"{task:<26}{tokens['full']:>8}" + "".join(f"{tokens[level]:>10}" for level in LEVELS) + f"{saved:>9.0%}")
+
+    if "--live" in sys.argv:
+        for mode, r in compare_live().items():
+            print(f"{mode:<8} parsed {r['parsed']}/{r['total']} | rules ok {r['rules_ok']}/{r['total']}")
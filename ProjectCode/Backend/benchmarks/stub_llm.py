@@ -0,0 +1,119 @@
+"""
+In-process stub LLM for the benchmarks.
+
+install() swaps the crewai classes used by core.config_registry and
+core.llm_runner for lightweight stand-ins whose kickoff() answers with
+plausible JSON for each task, after an optional artificial latency. Every call
+is recorded in CALLS so benchmarks can count LLM round trips.
+"""
+import json
+import random
+import threading
+import time
+
+import core.config_registry as config_registry
+import core.llm_runner as llm_runner
+import core.llm_scheduler as llm_scheduler
+
+CALLS = []
+_calls_lock = threading.Lock()
+
+
+class StubLLM:
+    def __init__(self, model=None, temperature=None, **kwargs):
+        self.model = model
+        self.temperature = temperature
+
+
+class StubAgent:
+    def __init__(self, **config):
+        self.__dict__.update(config)
+
+
+class StubTask:
+    def __init__(self, **config):
+        self.__dict__.update(config)
+
+
+class StubOutput:
+    def __init__(self, raw):
+        self.raw = raw
+
+
+class StubResponder:
+    """ Produces an answer per task; `error_rate` is the share of LLM verdicts that come back as "error". """
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def verdict(self):
+        with self.lock:
+            failed = self.random.random() < self.error_rate
+        if failed:
+            return {"status": "error", "Analysis": "La respuesta no aparece en el texto."}
+        return {"status": "ok", "Analysis": "Ejercicio correcto"}
+
+    def __call__(self, agent, task, inputs: dict) -> str:
+        if self.latency:
+            time.sleep(self.latency)
+
+        if "exercise_types" in inputs:
+            distribution = inputs["exercise_types"]
+            return json.dumps([f"Fragmento {idx} de {inputs.get('title', '')}: fui a la playa con mi nieto Leo" for idx, _ in enumerate(distribution)], ensure_ascii=False)
+
+        if "ejercicios" in inputs:
+            batch = json.loads(inputs["ejercicios"])
+            return json.dumps([dict(self.verdict(), index=item["index"]) for item in batch])
+
+        if "ejercicio" in inputs or "user_answer" in inputs:
+            return json.dumps(self.verdict())
+
+        return json.dumps(self.exercise(agent, inputs.get("dificultad", "media")), ensure_ascii=False)
+
+    def exercise(self, agent, difficulty):
+        events = ["Llegué a la playa", "Leo se bañó", "Comimos paella", "Volvimos a casa", "Cenamos", "Dormimos"]
+        size = {"fácil": 3, "media": 4}.get(difficulty, 5)
+        role = getattr(agent, "role", "")
+
+        if "Secuenciación" in role:
+            return {"type": "ordering", "question": "Ordena los eventos", "options": list(reversed(events[:size])),
+                    "correct_answer": events[:size], "hint": "Empieza por la llegada", "difficulty": difficulty}
+        if "Lingüística" in role:
+            return {"type": "fill_in_the_blank", "question": "Fui a la playa con mi nieto Leo",
+                    "correct_answer": "Leo", "hint": "Tu nieto", "difficulty": difficulty}
+        return {"type": "multiple_choice", "question": "¿A dónde fuimos?", "options": ["A la playa", "Al cine", "Al campo"],
+                "correct_answer": 0, "hint": "Había agua", "difficulty": difficulty}
+
+
+class StubCrew:
+    responder = StubResponder()
+
+    def __init__(self, agents, tasks, **kwargs):
+        self.agent = agents[0]
+        self.task = tasks[0]
+
+    def kickoff(self, inputs=None):
+        inputs = inputs or {}
+        with _calls_lock:
+            CALLS.append({"role": getattr(self.agent, "role", ""), "inputs": inputs})
+        return StubOutput(StubCrew.responder(self.agent, self.task, inputs))
+
+
+def install(responder: StubResponder = None):
+    """ Routes every kickoff of the agents to the stub. """
+    if responder is not None:
+        StubCrew.responder = responder
+    config_registry.Agent = StubAgent
+    config_registry.Task = StubTask
+    config_registry.LLM = StubLLM
+    llm_runner.Crew = StubCrew
+    # The stub has no provider quota: keep the scheduler's priorities but drop the rate limits
+    llm_scheduler._scheduler = llm_scheduler.LLMScheduler(rpm=0, tpm=0)
+
+
+def reset_calls():
+    with _calls_lock:
+        CALLS.clear()
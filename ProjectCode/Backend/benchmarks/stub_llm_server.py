@@ -0,0 +1,113 @@
+"""
+Local OpenAI-compatible stub server for the benchmarks.
+
+Answers every POST .../chat/completions after an artificial latency with a fixed
+verdict ({"status": "ok", ...}), wrapped in "Final Answer:" when the prompt comes
+from a crewai agent. Keep-alive HTTP/1.1 on asyncio, so it can hold thousands of
+concurrent requests; it counts requests and TCP connections so the benchmarks
+can tell whether clients reuse connections.
+
+With `max_rps` > 0 it behaves like a rate-limited provider: requests beyond
+that many per second get a 429 with Retry-After. With `slow_share` > 0 that
+share of the requests takes `slow_latency_s` instead (a provider's long tail).
+
+Run from Backend/:
+    python -m benchmarks.stub_llm_server [port] [latency_s] [max_rps] [slow_share] [slow_latency_s]
+"""
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import deque
+
+COUNTERS = {"connections": 0, "requests": 0, "rate_limited": 0}
+_recent = deque()
+
+ANSWER = json.dumps({"status": "ok", "Analysis": "stub", "analysis": "stub"})
+
+
+def completion(request: dict) -> bytes:
+    prompt = " ".join(str(message.get("content", "")) for message in request.get("messages", []))
+    content = f"Thought: I now know the final answer\nFinal Answer: {ANSWER}" if "Final Answer" in prompt else ANSWER
+    return json.dumps({
+        "id": f"stub-{COUNTERS['requests']}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", "stub"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4, "total_tokens": (len(prompt) + len(content)) // 4}
+    }).encode("utf-8")
+
+
+def over_limit(max_rps: float) -> bool:
+    """ Sliding one-second window of accepted requests. """
+    if max_rps <= 0:
+        return False
+    now = time.monotonic()
+    while _recent and now - _recent[0] > 1.0:
+        _recent.popleft()
+    if len(_recent) >= max_rps:
+        return True
+    _recent.append(now)
+    return False
+
+
+async def handle(reader, writer, latency, max_rps: float):
+    COUNTERS["connections"] += 1
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            request_line, *header_lines = head.decode("latin-1").split("\r\n")
+            headers = {}
+            for line in header_lines:
+                if ":" in line:
+                    name, value = line.split(":", 1)
+                    headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", "0")))
+
+            method, path = request_line.split(" ")[:2]
+            extra = ""
+            if method == "POST" and path.rstrip("/").endswith("chat/completions"):
+                COUNTERS["requests"] += 1
+                if over_limit(max_rps):
+                    COUNTERS["rate_limited"] += 1
+                    extra = "Retry-After: 1\r\n"
+                    status, payload = "429 Too Many Requests", b'{"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}}'
+                else:
+                    await asyncio.sleep(latency())
+                    status, payload = "200 OK", completion(json.loads(body or b"{}"))
+            elif path.startswith("/stats"):
+                status, payload = "200 OK", json.dumps(COUNTERS).encode("utf-8")
+            else:
+                status, payload = "404 Not Found", b'{"error": "not found"}'
+
+            writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\nContent-Length: {len(payload)}\r\n{extra}\r\n".encode("latin-1") + payload)
+            await writer.drain()
+            if headers.get("connection", "").lower() == "close":
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(port: int, latency: float, max_rps: float = 0, slow_share: float = 0, slow_latency: float = 0):
+    rng = random.Random(port)
+
+    def pick_latency() -> float:
+        return slow_latency if rng.random() < slow_share else latency
+
+    server = await asyncio.start_server(lambda r, w: handle(r, w, pick_latency, max_rps), "127.0.0.1", port, backlog=4096)
+    print(f"stub LLM listening on http://127.0.0.1:{port}/v1 (latency {latency}s)", flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8099
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    max_rps = float(sys.argv[3]) if len(sys.argv) > 3 else 0
+    slow_share = float(sys.argv[4]) if len(sys.argv) > 4 else 0
+    slow_latency = float(sys.argv[5]) if len(sys.argv) > 5 else 0
+    asyncio.run(serve(port, latency, max_rps, slow_share, slow_latency))
@@ -0,0 +1,155 @@
+"""
+In-process stand-in for the Supabase client used by database/db.py, on SQLite.
+
+Implements the part of the PostgREST query builder db.py uses
+(table().select/insert/upsert/update/delete().eq().execute()) and the SQL
+functions of database/sql/ as rpc() calls. Every execute() is one round trip:
+it is counted in `round_trips` and waits `latency_s` (the network RTT to
+Supabase) before touching the database.
+
+    client = StubSupabase(latency_s=0.02)
+    set_storage(SupabaseStorage(client))
+"""
+import sqlite3
+import threading
+import time
+
+from database.sqlite_storage import SCHEMA
+
+
+class _Response:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Query:
+    def __init__(self, client, table: str):
+        self.client = client
+        self.table = table
+        self.action = "select"
+        self.columns = "*"
+        self.values = None
+        self.filters = []
+
+    def select(self, columns: str = "*"):
+        self.action, self.columns = "select", columns
+        return self
+
+    def insert(self, values):
+        self.action, self.values = "insert", values
+        return self
+
+    def upsert(self, values):
+        self.action, self.values = "upsert", values
+        return self
+
+    def update(self, values: dict):
+        self.action, self.values = "update", values
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    def eq(self, column: str, value):
+        self.filters.append((column, value))
+        return self
+
+    def execute(self) -> _Response:
+        where = " and ".join(f"{column} = ?" for column, _ in self.filters) or "1 = 1"
+        params = [value for _, value in self.filters]
+
+        if self.action == "select":
+            return self.client._execute(f"select {self.columns} from {self.table} where {where}", params)
+        if self.action in ("insert", "upsert"):
+            rows = self.values if isinstance(self.values, list) else [self.values]
+            columns = list(rows[0])
+            verb = "insert or replace" if self.action == "upsert" else "insert"
+            sql = f"{verb} into {self.table} ({', '.join(columns)}) values ({', '.join('?' for _ in columns)})"
+            self.client._execute_many([(sql, [row[c] for c in columns]) for row in rows])
+            return _Response([dict(row) for row in rows])
+        if self.action == "update":
+            sets = ", ".join(f"{column} = ?" for column in self.values)
+            self.client._execute(f"update {self.table} set {sets} where {where}", list(self.values.values()) + params)
+            return self.client._select_after(self.table, where, params)
+        self.client._execute(f"delete from {self.table} where {where}", params)
+        return _Response([])
+
+
+class _Rpc:
+    def __init__(self, client, name: str, params: dict):
+        self.client = client
+        self.name = name
+        self.params = params
+
+    def execute(self) -> _Response:
+        if self.name == "increment_user_stats":
+            statements = []
+            for row in self.params["p_increments"]:
+                t = row["exercise_type"]
+                statements.append((f"update user_stats set {t}_done = {t}_done + ?, {t}_right = {t}_right + ? where id = ?",
+                                   [row["done"], row["correct"], row["id"]]))
+            return self.client._execute_many(statements)
+        if self.name == "apply_level_transitions":
+            statements = []
+            for t, transition in self.params["p_transitions"].items():
+                statements.append((f"update user_stats set {t}_current_level = ?, {t}_done = {t}_done - ?, {t}_right = {t}_right - ? where id = ?",
+                                   [transition["level"], transition["done"], transition["right"], self.params["p_id"]]))
+            return self.client._execute_many(statements)
+        raise ValueError(f"Unknown function {self.name}")
+
+
+class StubSupabase:
+    def __init__(self, latency_s: float = 0.0):
+        self.latency_s = latency_s
+        self.round_trips = 0
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(":memory:", check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(SCHEMA)
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
+
+    def rpc(self, name: str, params: dict) -> _Rpc:
+        return _Rpc(self, name, params)
+
+    def _round_trip(self):
+        with self._lock:
+            self.round_trips += 1
+        if self.latency_s:
+            time.sleep(self.latency_s)
+
+    def _execute(self, sql: str, params: list) -> _Response:
+        self._round_trip()
+        with self._lock:
+            rows = self.connection.execute(sql, params).fetchall()
+            self.connection.commit()
+        return _Response([dict(row) for row in rows])
+
+    def _execute_many(self, statements: list) -> _Response:
+        """ One round trip running several statements in a transaction (a SQL function). """
+        self._round_trip()
+        with self._lock:
+            with self.connection:
+                for sql, params in statements:
+                    self.connection.execute(sql, params)
+        return _Response(None)
+
+    def _select_after(self, table: str, where: str, params: list) -> _Response:
+        # PostgREST returns the updated rows in the same response: no extra round trip
+        with self._lock:
+            rows = self.connection.execute(f"select * from {table} where {where}", params).fetchall()
+        return _Response([dict(row) for row in rows])
+
+    def seed_user(self, user_id: str, **columns):
+        """ Creates a user and their stats row directly (not counted as a round trip). """
+        with self._lock, self.connection:
+            self.connection.execute("insert or replace into users (id, full_name) values (?, ?)", [user_id, user_id])
+            values = dict({"id": user_id, "full_name": user_id}, **columns)
+            self.connection.execute(f"insert or replace into user_stats ({', '.join(values)}) values ({', '.join('?' for _ in values)})", list(values.values()))
+
+    def row(self, user_id: str) -> dict:
+        with self._lock:
+            row = self.connection.execute("select * from user_stats where id = ?", [user_id]).fetchone()
+        return dict(row) if row else None
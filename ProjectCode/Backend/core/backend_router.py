@@ -0,0 +1,310 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Hedging: if the first backend has not answered after the LLM_HEDGE_PERCENTILE of its
+# recent latencies, a duplicate goes to the next backend and the first answer wins.
+HEDGING_ENABLED = os.getenv("LLM_HEDGING", "1") == "1"
+# The sync path (kickoff, Flask) cannot cancel the loser: every hedge is a second full
+# provider call. Off until benchmarks/bench_backend_router.py shows it pays off.
+HEDGING_SYNC = os.getenv("LLM_HEDGING_SYNC", "0") == "1"
+HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+# Delay used until a backend has HEDGE_MIN_SAMPLES latencies for a task
+HEDGE_DEFAULT_MS = float(os.getenv("LLM_HEDGE_DEFAULT_MS", "10000"))
+HEDGE_MIN_MS = float(os.getenv("LLM_HEDGE_MIN_MS", "200"))
+
+# Circuit breaker: after BREAKER_FAILURES consecutive errors a backend is skipped
+# for BREAKER_COOLDOWN_S, then a single probe call decides whether it is back.
+BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN_S = float(os.getenv("LLM_BREAKER_COOLDOWN_S", "30"))
+# A probe that has not reported after this long no longer blocks the next one
+BREAKER_PROBE_TIMEOUT_S = float(os.getenv("LLM_BREAKER_PROBE_TIMEOUT_S", "60"))
+
+LATENCY_WINDOW = 200
+
+
+class NoBackendAvailable(Exception):
+    """ Raised when every backend of an agent has its circuit open. """
+
+
+class CircuitBreaker:
+    """
+    closed -> (failures) -> open -> (cooldown) -> half_open -> (probe result) -> closed / open
+
+    A probe without a result (cancelled, or silent for probe_timeout_s) lets the next call probe.
+    """
+
+    def __init__(self, failures: int = BREAKER_FAILURES, cooldown_s: float = BREAKER_COOLDOWN_S, probe_timeout_s: float = BREAKER_PROBE_TIMEOUT_S):
+        self.failures = failures
+        self.cooldown_s = cooldown_s
+        self.probe_timeout_s = probe_timeout_s
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.probe_started = 0.0
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        if self.state == "open" and now - self.opened_at >= self.cooldown_s:
+            self.state = "half_open"
+            self.probing = False
+        if self.state == "half_open":
+            if self.probing and now - self.probe_started < self.probe_timeout_s:
+                return False
+            self.probing = True
+            self.probe_started = now
+            return True
+        return self.state == "closed"
+
+    def cancelled(self):
+        """ The attempt was cancelled (lost a hedge, or its caller gave up): no verdict on the backend. """
+        self.probing = False
+
+    def success(self):
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.probing = False
+
+    def failure(self):
+        self.consecutive_failures += 1
+        if self.state == "half_open" or self.consecutive_failures >= self.failures:
+            if self.state != "open":
+                print(f"\033[93m[backend_router]\033[0m Circuit opened after {self.consecutive_failures} failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self.probing = False
+
+
+class BackendRouter:
+    """
+    Sends each LLM call to the ordered backends of its agent's profile (ConfigRegistry.profile).
+
+    - Backends with an open circuit are skipped.
+    - A failed attempt falls over to the next backend.
+    - A slow attempt (past the hedge delay) gets a duplicate on the next backend;
+      the first answer wins and the loser is cancelled (async) or abandoned
+      (sync: a crewai call cannot be interrupted, its late answer is dropped;
+      only with LLM_HEDGING_SYNC=1).
+
+    `run(backend)` / `arun(backend)` perform one attempt against one backend.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._breakers = {}
+        self._latencies = {}
+        self._executor = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_CALL_THREADS", "32")) * 2, thread_name_prefix="llm-backend")
+        self.counters = {"calls": 0, "hedged": 0, "hedge_wins": 0, "failovers": 0, "losers_cancelled": 0, "rejected_open": 0}
+        self.by_backend = {}
+
+    # --- Bookkeeping ---
+    def _breaker(self, backend) -> CircuitBreaker:
+        breaker = self._breakers.get(backend)
+        if breaker is None:
+            breaker = self._breakers.setdefault(backend, CircuitBreaker())
+        return breaker
+
+    def _count(self, backend, key: str):
+        entry = self.by_backend.setdefault(str(backend), {"attempts": 0, "ok": 0, "errors": 0, "wins": 0})
+        entry[key] += 1
+
+    def _next(self, candidates: list):
+        """ Pops the next backend whose circuit lets a call through (None if there is none left). """
+        with self._lock:
+            while candidates:
+                backend = candidates.pop(0)
+                if self._breaker(backend).allow():
+                    return backend
+        return None
+
+    def _first(self, backends: list) -> tuple:
+        """ (first usable backend, remaining candidates). Raises NoBackendAvailable. """
+        candidates = list(backends)
+        backend = self._next(candidates)
+        with self._lock:
+            self.counters["calls"] += 1
+            if backend is None:
+                self.counters["rejected_open"] += 1
+        if backend is None:
+            raise NoBackendAvailable(f"Every backend has its circuit open: {backends}")
+        return backend, candidates
+
+    def _record(self, backend, kind: str, started: float, error: Exception = None, cancelled: bool = False):
+        with self._lock:
+            if cancelled:
+                # A cancelled probe says nothing about the backend: the next call probes again
+                self._breaker(backend).cancelled()
+                # A cancelled loser took at least this long; dropping it would pull the percentile down
+                self._latencies.setdefault((backend, kind), deque(maxlen=LATENCY_WINDOW)).append(time.monotonic() - started)
+            elif error is None:
+                self._breaker(backend).success()
+                self._latencies.setdefault((backend, kind), deque(maxlen=LATENCY_WINDOW)).append(time.monotonic() - started)
+                self._count(backend, "ok")
+            else:
+                self._breaker(backend).failure()
+                self._count(backend, "errors")
+
+    def hedge_delay(self, backend, kind: str) -> float:
+        """ Seconds to wait for `backend` before hedging: its latency percentile for this kind of call. """
+        with self._lock:
+            samples = sorted(self._latencies.get((backend, kind), ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_MS / 1000
+        index = min(len(samples) - 1, int(len(samples) * HEDGE_PERCENTILE / 100))
+        return max(HEDGE_MIN_MS / 1000, samples[index])
+
+    def _attempt(self, backend, kind: str, run):
+        started = time.monotonic()
+        with self._lock:
+            self._count(backend, "attempts")
+        try:
+            result = run(backend)
+        except Exception as e:
+            self._record(backend, kind, started, e)
+            raise
+        self._record(backend, kind, started)
+        return result
+
+    def _won(self, backend, hedged_backends: set, losers: int):
+        with self._lock:
+            self._count(backend, "wins")
+            if backend in hedged_backends:
+                self.counters["hedge_wins"] += 1
+            self.counters["losers_cancelled"] += losers
+
+    # --- Sync (crewai on threads) ---
+    def call(self, backends: list, kind: str, run):
+        primary, candidates = self._first(backends)
+        pending = {}
+        hedged = set()
+        last_error = None
+
+        def launch(backend):
+            pending[self._executor.submit(self._attempt, backend, kind, run)] = backend
+            return backend
+
+        launch(primary)
+        while pending:
+            can_hedge = HEDGING_ENABLED and HEDGING_SYNC and candidates and not hedged
+            done, _ = wait(pending, timeout=self.hedge_delay(primary, kind) if can_hedge else None, return_when=FIRST_COMPLETED)
+            if not done:
+                backend = self._next(candidates)
+                if backend is not None:
+                    hedged.add(launch(backend))
+                    with self._lock:
+                        self.counters["hedged"] += 1
+                continue
+
+            for future in done:
+                backend = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    last_error = e
+                    continue
+                self._won(backend, hedged, len(pending))
+                return result
+
+            if not pending:
+                backend = self._next(candidates)
+                if backend is not None:
+                    with self._lock:
+                        self.counters["failovers"] += 1
+                    primary = launch(backend)
+
+        raise last_error
+
+    # --- Async (direct client calls on the event loop) ---
+    async def acall(self, backends: list, kind: str, arun):
+        primary, candidates = self._first(backends)
+        pending = {}
+        hedged = set()
+        last_error = None
+
+        async def attempt(backend):
+            started = time.monotonic()
+            with self._lock:
+                self._count(backend, "attempts")
+            try:
+                result = await arun(backend)
+            except asyncio.CancelledError:
+                self._record(backend, kind, started, cancelled=True)
+                raise
+            except Exception as e:
+                self._record(backend, kind, started, e)
+                raise
+            self._record(backend, kind, started)
+            return result
+
+        def launch(backend):
+            pending[asyncio.ensure_future(attempt(backend))] = backend
+            return backend
+
+        launch(primary)
+        try:
+            while pending:
+                can_hedge = HEDGING_ENABLED and candidates and not hedged
+                done, _ = await asyncio.wait(pending, timeout=self.hedge_delay(primary, kind) if can_hedge else None, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    backend = self._next(candidates)
+                    if backend is not None:
+                        hedged.add(launch(backend))
+                        with self._lock:
+                            self.counters["hedged"] += 1
+                    continue
+
+                for task in done:
+                    backend = pending.pop(task)
+                    if task.exception() is not None:
+                        last_error = task.exception()
+                        continue
+                    self._won(backend, hedged, len(pending))
+                    return task.result()
+
+                if not pending:
+                    backend = self._next(candidates)
+                    if backend is not None:
+                        with self._lock:
+                            self.counters["failovers"] += 1
+                        primary = launch(backend)
+        finally:
+            # The loser (or every attempt, if the caller was cancelled) stops here
+            for task in pending:
+                task.cancel()
+
+        raise last_error
+
+    # --- Metrics ---
+    def stats(self) -> dict:
+        with self._lock:
+            data = dict(self.counters)
+            data["backends"] = {
+                str(backend): dict(self.by_backend.get(str(backend), {}), circuit=breaker.state)
+                for backend, breaker in self._breakers.items()
+            }
+            latencies = {key: sorted(values) for key, values in self._latencies.items()}
+
+        for (backend, kind), samples in latencies.items():
+            entry = data["backends"].setdefault(str(backend), {}).setdefault("latency_ms", {})
+            entry[kind] = {
+                "p50": round(samples[len(samples) // 2] * 1000, 1),
+                "p95": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 1)
+            }
+        return data
+
+
+_router = BackendRouter()
+
+
+def get_router() -> BackendRouter:
+    """ Returns the process-wide router (its counters feed /api/metrics). """
+    return _router
@@ -0,0 +1,154 @@
+"""
+Chunking of long memories for the selector, and the cap on what each
+downstream agent receives.
+
+A description longer than SELECTOR_CHUNK_WORDS words (transcribed audio) is cut
+into chunks of at most that many words at sentence boundaries; every chunk keeps
+the (start, end) offsets of its sentences in the memory. Each slot of the
+distribution is given the chunk that best fits its exercise type (scored with
+core/local_selector.py, repeated types on different chunks), and the selector
+runs once per chosen chunk with the slots of that chunk. The selector prompt is
+then bounded by the chunk size, and at most one call per slot is made whatever
+the length of the memory.
+
+cap() cuts the content of a slot to SLOT_MAX_TOKENS tokens (at a sentence
+boundary, or dropping the last items of a list of facts or events) before it
+reaches the generator and the verificador.
+"""
+import json
+import os
+
+from dotenv import load_dotenv
+
+from core.prompt_compiler import count_tokens
+
+load_dotenv()
+
+# Longest description the selector gets in one call (0 = never chunk)
+CHUNK_WORDS = int(os.getenv("SELECTOR_CHUNK_WORDS", "1500"))
+# Longest slot content sent to a generator / the verificador (0 = no cap)
+SLOT_MAX_TOKENS = int(os.getenv("SLOT_MAX_TOKENS", "800"))
+
+
+class Chunk:
+    """ A run of whole sentences of a memory: its offsets and the offsets of each sentence. """
+
+    __slots__ = ("index", "start", "end", "sentences", "words")
+
+    def __init__(self, index: int, sentences: list, words: int):
+        self.index = index
+        self.sentences = sentences
+        self.start = sentences[0][0]
+        self.end = sentences[-1][1]
+        self.words = words
+
+    def text(self, memory: str) -> str:
+        return memory[self.start:self.end]
+
+
+def is_long(description: str, max_words: int = None) -> bool:
+    max_words = CHUNK_WORDS if max_words is None else max_words
+    return max_words > 0 and len((description or "").split()) > max_words
+
+
+def split(text: str, max_words: int = None, spans: list = None) -> list:
+    """ Chunks of at most `max_words` words and about the same size, cut between sentences (local_selector.split_sentences). """
+    from core import local_selector
+
+    max_words = CHUNK_WORDS if max_words is None else max_words
+    spans = spans if spans is not None else local_selector.split_sentences(text)
+    sizes = [len(text[s:e].split()) for s, e in spans]
+    # As many chunks as needed, evenly filled: no short tail chunk
+    target = sum(sizes) / max(1, -(-sum(sizes) // max(1, max_words)))
+    chunks, current, words = [], [], 0
+    for (s, e), n in zip(spans, sizes):
+        if current and (words + n > max_words or words >= target):
+            chunks.append(Chunk(len(chunks), current, words))
+            current, words = [], 0
+        current.append((s, e))
+        words += n
+    if current:
+        chunks.append(Chunk(len(chunks), current, words))
+    return chunks
+
+
+def plan(title: str, description: str, analysis, distribution: list, max_words: int = None) -> list:
+    """
+    [(chunk text, [slot indexes])] in text order: the chunk of every slot of the
+    distribution. A slot takes the unused chunk whose sentences score best for its
+    type; chunks are shared only when there are more slots than chunks.
+    """
+    import numpy as np
+    from core import local_selector
+
+    document = local_selector.Document(description, f"{title} {local_selector.analysis_text(analysis)}")
+    chunks = split(description, max_words, document.spans)
+    scores = {
+        "fill_in_the_blank": document.passage_score,
+        "multiple_choice": document.fact_score,
+        "ordering": document.event_score,
+    }
+
+    # Sentence -> chunk, to average the sentence scores per chunk
+    owner = np.repeat(np.arange(len(chunks)), [len(chunk.sentences) for chunk in chunks])
+    sizes = np.bincount(owner, minlength=len(chunks))
+    means = {ex_type: np.bincount(owner, weights=values, minlength=len(chunks)) / np.maximum(sizes, 1) for ex_type, values in scores.items()}
+
+    uses = np.zeros(len(chunks), dtype=np.int64)
+    assigned = {}
+    for idx, ex_type in enumerate(distribution):
+        score = means.get(ex_type, means["fill_in_the_blank"])
+        # Least used chunks first (fresh ones while there are any), best score among them
+        candidates = np.flatnonzero(uses == uses.min())
+        best = int(candidates[np.argmax(score[candidates])])
+        uses[best] += 1
+        assigned.setdefault(best, []).append(idx)
+
+    return [(chunks[i].text(description), assigned[i]) for i in sorted(assigned)]
+
+
+def cap(content, max_tokens: int = None):
+    """
+    The slot content cut to `max_tokens` tokens at the last sentence that fits.
+    A list (facts or events of a slot) keeps its first items that fit together,
+    and at least the first one, itself capped.
+    """
+    max_tokens = SLOT_MAX_TOKENS if max_tokens is None else max_tokens
+    if max_tokens <= 0:
+        return content
+    if isinstance(content, list):
+        return _cap_items(content, max_tokens)
+    if not isinstance(content, str):
+        return content
+    total = count_tokens(content)
+    if total <= max_tokens:
+        return content
+
+    from core import local_selector
+
+    ends = [e for _, e in local_selector.split_sentences(content)]
+    # Start from the proportional cut and step back until it fits
+    guess = len(content) * max_tokens / total
+    candidates = [e for e in ends if e <= guess] or ends[:1]
+    for end in reversed(candidates):
+        if count_tokens(content[:end]) <= max_tokens:
+            return content[:end].rstrip()
+
+    # Not even the first sentence fits: cut by words
+    words = content[:int(guess)].split()
+    while words and count_tokens(" ".join(words)) > max_tokens:
+        words = words[:int(len(words) * 0.9)]
+    return " ".join(words)
+
+
+def _cap_items(items: list, max_tokens: int) -> list:
+    kept, used = [], 0
+    for item in items:
+        tokens = count_tokens(item if isinstance(item, str) else json.dumps(item, ensure_ascii=False))
+        if used + tokens > max_tokens:
+            if not kept:
+                kept.append(cap(item, max_tokens) if isinstance(item, str) else item)
+            break
+        kept.append(item)
+        used += tokens
+    return kept
@@ -0,0 +1,289 @@
+import hashlib
+import os
+import threading
+from types import MappingProxyType
+
+import yaml
+
+from core.prompt_compiler import slice_by_difficulty
+from utils.http_pool import attach_llm
+
+# crewai classes, imported by _load_crewai() the first time an LLM or crew object is built
+Agent = Task = LLM = None
+
+
+def _load_crewai():
+    """
+    Imports crewai on first use instead of at module level: with litellm and openai
+    behind it, it takes seconds, and routes that never call an LLM should not pay it.
+    """
+    global Agent, Task, LLM
+    if LLM is None:
+        import crewai
+        Agent, Task, LLM = crewai.Agent, crewai.Task, crewai.LLM
+
+
+# Keys of agents.yaml read by our own runtime and never passed to crewai's Agent
+RUNTIME_KEYS = {"cache", "priority", "profile"}
+
+# Model profile of the agents that do not declare one (or leave some of its keys out)
+DEFAULT_PROFILE = {
+    "model": os.getenv("LLM_MODEL", "gpt-4o-mini"),
+    "temperature": 0,
+    "max_tokens": None,
+    "stop": None,
+    # Ordered backends of config/backends.yaml
+    "backend": [name.strip() for name in os.getenv("LLM_BACKENDS", "openai").split(",") if name.strip()],
+}
+
+
+def _freeze(value):
+    """ Returns a read-only copy of a parsed YAML value (dicts -> mappingproxy, lists -> tuples). """
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _interpolate(text: str, inputs: dict) -> str:
+    """ Fills the {placeholders} of a template; other braces (JSON examples) are left alone. """
+    for key, value in inputs.items():
+        text = text.replace("{" + key + "}", str(value))
+    return text
+
+
+def _thaw(value):
+    """ Inverse of _freeze, used to hand crewai a plain (mutable) copy of a template. """
+    if isinstance(value, MappingProxyType):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+class ConfigRegistry:
+    """
+    Process-wide cache of config/agents.yaml, config/tasks.yaml and (optional)
+    config/backends.yaml.
+
+    The files are parsed once into immutable templates and only re-parsed when
+    their mtime changes. Agents ask the registry for fresh Agent/Task instances
+    on every call instead of re-reading the YAML themselves.
+
+    Tasks with difficulty sections also get one compiled variant per level
+    (core.prompt_compiler), selected with the `variant` argument.
+    """
+
+    _instances = {}
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def get(cls, config_path: str) -> "ConfigRegistry":
+        """ Returns the shared registry for a config directory. """
+        config_path = os.path.abspath(config_path)
+        with cls._instances_lock:
+            registry = cls._instances.get(config_path)
+            if registry is None:
+                registry = cls(config_path)
+                cls._instances[config_path] = registry
+            return registry
+
+    def __init__(self, config_path: str):
+        print("\033[96m[config_registry]\033[0m initialized")
+        self.config_path = config_path
+        self.agents_file = os.path.join(config_path, "agents.yaml")
+        self.tasks_file = os.path.join(config_path, "tasks.yaml")
+        self.backends_file = os.path.join(config_path, "backends.yaml")
+
+        self._lock = threading.Lock()
+        self._mtimes = None
+        self._agents = MappingProxyType({})
+        self._tasks = MappingProxyType({})
+        self._variants = MappingProxyType({})
+        self._backends = MappingProxyType({})
+        self._llms = {}
+        self._versions = {}
+
+        self._reload_if_changed()
+
+    # --- Loading ---
+    def _current_mtimes(self):
+        backends_mtime = os.stat(self.backends_file).st_mtime_ns if os.path.exists(self.backends_file) else None
+        return (os.stat(self.agents_file).st_mtime_ns, os.stat(self.tasks_file).st_mtime_ns, backends_mtime)
+
+    def _reload_if_changed(self):
+        """ Re-parses the YAML files only if one of them changed on disk. """
+        mtimes = self._current_mtimes()
+        if mtimes == self._mtimes:
+            return
+
+        with self._lock:
+            if mtimes == self._mtimes:
+                return
+
+            with open(self.agents_file, "r") as f:
+                agents_config = yaml.safe_load(f) or {}
+            with open(self.tasks_file, "r") as f:
+                tasks_config = yaml.safe_load(f) or {}
+            backends_config = {}
+            if mtimes[2] is not None:
+                with open(self.backends_file, "r") as f:
+                    backends_config = yaml.safe_load(f) or {}
+
+            variants = {}
+            for task_name, task in tasks_config.items():
+                sliced = slice_by_difficulty(task.get("description") or "")
+                if sliced:
+                    variants[task_name] = {level: dict(task, description=text) for level, text in sliced.items()}
+
+            # Swap the whole mapping at once so readers never see a half-loaded config
+            self._agents = _freeze(agents_config)
+            self._tasks = _freeze(tasks_config)
+            self._variants = _freeze(variants)
+            self._backends = _freeze(backends_config)
+            self._versions = {}
+            # LLM objects are bound to a backend's endpoint, which may have changed
+            self._llms = {}
+            self._mtimes = mtimes
+            print("\033[96m[config_registry]\033[0m Loaded agents.yaml, tasks.yaml and backends.yaml")
+
+    # --- Templates ---
+    def agent_template(self, agent_name: str) -> MappingProxyType:
+        """ Returns the read-only template of an agent from agents.yaml. """
+        self._reload_if_changed()
+        return self._agents[agent_name]
+
+    def task_template(self, task_name: str, variant: str = None) -> MappingProxyType:
+        """ Returns the read-only template of a task from tasks.yaml (its compiled variant if it has one). """
+        self._reload_if_changed()
+        return self._task(task_name, variant)
+
+    def _task(self, task_name: str, variant: str = None) -> MappingProxyType:
+        if variant is not None and variant in self._variants.get(task_name, ()):
+            return self._variants[task_name][variant]
+        return self._tasks[task_name]
+
+    def task_variants(self, task_name: str) -> tuple:
+        """ Levels with a compiled variant of the task (empty for tasks without difficulty sections). """
+        self._reload_if_changed()
+        return tuple(self._variants.get(task_name, ()))
+
+    def has_task(self, task_name: str) -> bool:
+        self._reload_if_changed()
+        return task_name in self._tasks
+
+    def task_names(self) -> list:
+        self._reload_if_changed()
+        return list(self._tasks)
+
+    def agent_names(self) -> list:
+        self._reload_if_changed()
+        return list(self._agents)
+
+    def profile(self, agent_name: str, overrides: dict = None) -> dict:
+        """
+        Model profile of an agent: its `profile:` in agents.yaml over DEFAULT_PROFILE,
+        then `overrides` (e.g. the evaluation harness). Returns {"model", "temperature",
+        "max_tokens", "stop", "backends"}; backends are the known names of
+        backends.yaml in order, or [None] (the plain provider client) if there is none.
+        """
+        profile = dict(DEFAULT_PROFILE)
+        profile.update({k: v for k, v in _thaw(self.agent_option(agent_name, "profile", None) or {}).items() if v is not None})
+        profile.update({k: v for k, v in (overrides or {}).items() if v is not None})
+
+        names = profile.pop("backend")
+        names = [names] if isinstance(names, str) else list(names)
+        profile["backends"] = [name for name in names if name in self._backends] or [None]
+        profile["stop"] = tuple(profile["stop"]) if profile["stop"] else None
+        return profile
+
+    def backend(self, name: str) -> dict:
+        """ Resolved endpoint of a backend: {"base_url", "api_key", "model"} (values may be None). """
+        self._reload_if_changed()
+        spec = self._backends.get(name) or {}
+        return {
+            "base_url": os.getenv(spec.get("base_url_env") or "", "") or spec.get("base_url") or None,
+            "api_key": os.getenv(spec.get("api_key_env") or "", "") or spec.get("api_key") or None,
+            "model": spec.get("model") or None,
+        }
+
+    def agent_option(self, agent_name: str, key: str, default=None):
+        """ Returns a runtime option of an agent (see RUNTIME_KEYS), e.g. cache: false. """
+        return self.agent_template(agent_name).get(key, default)
+
+    def version(self, agent_name: str, task_name: str, variant: str = None) -> str:
+        """ Short hash of the agent + task templates; changes whenever either is edited. """
+        self._reload_if_changed()
+        key = (agent_name, task_name, variant)
+        version = self._versions.get(key)
+        if version is None:
+            payload = repr((_thaw(self._agents[agent_name]), _thaw(self._task(task_name, variant))))
+            version = hashlib.sha1(payload.encode("utf-8")).hexdigest()[:12]
+            self._versions[key] = version
+        return version
+
+    def render(self, agent_name: str, task_name: str, inputs: dict, variant: str = None) -> list:
+        """
+        Chat messages of an agent + task with the inputs filled in, laid out like
+        crewai's own prompt. Used by the async path, which calls the LLM directly.
+        """
+        agent = self.agent_template(agent_name)
+        task = self.task_template(task_name, variant)
+
+        system = f"You are {agent['role']}. {agent['backstory']}\nYour personal goal is: {agent['goal']}"
+        user = (f"\nCurrent Task: {task['description']}\n\n"
+                f"This is the expected criteria for your final answer: {task['expected_output']}\n"
+                "you MUST return the actual complete content as the final answer, not a summary.")
+
+        return [
+            {"role": "system", "content": _interpolate(system, inputs)},
+            {"role": "user", "content": _interpolate(user, inputs)},
+        ]
+
+    # --- Instances ---
+    def llm(self, model: str, temperature: float, backend: str = None, max_tokens: int = None, stop: tuple = None):
+        """ Returns a shared crewai LLM object for a (model, temperature, backend, max_tokens, stop) combination. """
+        self._reload_if_changed()
+        key = (model, temperature, backend, max_tokens, stop)
+        llm = self._llms.get(key)
+        if llm is None:
+            endpoint = self.backend(backend) if backend is not None else None
+            with self._lock:
+                llm = self._llms.get(key)
+                if llm is None:
+                    _load_crewai()
+                    # No SDK retries: core.llm_scheduler queues failed calls again with backoff
+                    if backend is None:
+                        # LLM_API_BASE points every call to another OpenAI-compatible server (e.g. a local stub)
+                        llm = LLM(model=model, temperature=temperature, base_url=os.getenv("LLM_API_BASE") or None,
+                                  max_tokens=max_tokens, stop=list(stop or ()), max_retries=0)
+                    else:
+                        # Every backend speaks the OpenAI API (hosted, Ollama, local stubs...)
+                        llm = LLM(model=endpoint["model"] or model, provider="openai", temperature=temperature,
+                                  base_url=endpoint["base_url"], api_key=endpoint["api_key"],
+                                  max_tokens=max_tokens, stop=list(stop or ()), max_retries=0)
+                    llm = attach_llm(llm)
+                    self._llms[key] = llm
+        return llm
+
+    def llm_for(self, profile: dict, backend: str = None):
+        """ Shared LLM object of a profile (see profile()) on one of its backends. """
+        return self.llm(profile["model"], profile["temperature"], backend, profile["max_tokens"], profile["stop"])
+
+    def build(self, agent_name: str, task_name: str, llm, variant: str = None):
+        """ Builds a fresh Agent and Task for a single call from the cached templates. """
+        _load_crewai()
+        agent_config = _thaw(self.agent_template(agent_name))
+        for key in RUNTIME_KEYS:
+            agent_config.pop(key, None)
+        agent_config["llm"] = llm
+        # crewai re-runs a failed task up to max_retry_limit times; the scheduler already retries
+        agent_config.setdefault("max_retry_limit", 0)
+        agent = Agent(**agent_config)
+
+        task_config = _thaw(self.task_template(task_name, variant))
+        task_config["agent"] = agent
+        task = Task(**task_config)
+
+        return agent, task
@@ -0,0 +1,70 @@
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Default latency budget per endpoint (ms), overridable per request with "latency_budget_ms"
+ENDPOINT_BUDGETS_MS = {
+    "generate_exercise": int(os.getenv("GENERATE_EXERCISE_BUDGET_MS", "60000")),
+    "fill_in_the_blank_correction": int(os.getenv("CORRECTION_BUDGET_MS", "15000")),
+}
+
+# Requests may ask for a shorter or longer budget, but never outside these bounds
+MIN_BUDGET_MS = 500
+MAX_BUDGET_MS = 300000
+
+
+class DeadlineExceeded(Exception):
+    """ Raised by an LLM call that cannot start or finish before the request deadline. """
+
+
+class Deadline:
+    """ Latency budget of one request, measured from its creation. """
+
+    def __init__(self, budget_ms: int):
+        self.budget_ms = budget_ms
+        self.started = time.monotonic()
+        self.expires = self.started + budget_ms / 1000
+
+    def remaining(self) -> float:
+        """ Seconds left (never negative). """
+        return max(0.0, self.expires - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires
+
+    def elapsed_ms(self) -> int:
+        return int((time.monotonic() - self.started) * 1000)
+
+
+def budget_for(endpoint: str, requested_ms=None) -> int:
+    """ Budget (ms) of an endpoint, using the per-request override when it is valid. """
+    budget = ENDPOINT_BUDGETS_MS[endpoint]
+    if requested_ms is not None:
+        try:
+            budget = int(requested_ms)
+        except (TypeError, ValueError):
+            print(f"\033[93m[deadline]\033[0m Ignoring invalid latency_budget_ms: {requested_ms}")
+    return min(max(budget, MIN_BUDGET_MS), MAX_BUDGET_MS)
+
+
+_current = contextvars.ContextVar("deadline", default=None)
+
+
+def current_deadline() -> Deadline:
+    """ Deadline of the request being served in this context (None if there is none). """
+    return _current.get()
+
+
+@contextmanager
+def use_deadline(deadline: Deadline):
+    """ Makes `deadline` visible to every agent call made inside the block. """
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
@@ -0,0 +1,120 @@
+import random
+import re
+
+# Fallback exercises built locally from the memory text, used when the AI fails or runs out of time
+
+
+def _words(text: str) -> list:
+    return re.findall(r'\b[a-zA-ZáéíóúÁÉÍÓÚñÑüÜ]+\b', text)
+
+
+def fallback_multiple_choice(title: str, description: str) -> dict:
+    """ Multiple choice exercise asking for a key word of the description. """
+    long_words = [w for w in _words(description) if len(w) > 4]
+
+    if len(long_words) > 0:
+        correct_word = random.choice(long_words)
+        generic_options = ["familia", "amigos", "viaje", "comida", "casa", "fiesta", "trabajo", "regalo"]
+        options = random.sample([opt for opt in generic_options if opt.lower() != correct_word.lower()], 3) + [correct_word]
+        random.shuffle(options)
+        correct_idx = options.index(correct_word)
+        return {
+            "type": "multiple_choice",
+            "question": f"Sobre el recuerdo '{title}', ¿cuál de estas palabras es clave en tu historia?",
+            "options": options,
+            "correct_answer": correct_idx,
+            "hint": f"Empieza por la letra '{correct_word[0].upper()}'.",
+            "difficulty": "media"
+        }
+
+    # Static fallback if description is too short
+    return {
+        "type": "multiple_choice",
+        "question": f"Sobre el recuerdo '{title}', ¿cómo te sentiste principalmente?",
+        "options": ["Feliz", "Nostálgico", "Tranquilo", "Emocionado"],
+        "correct_answer": 0,
+        "hint": "Casi todos los buenos recuerdos traen emociones positivas.",
+        "difficulty": "fácil"
+    }
+
+
+def fallback_fill_in_the_blank(title: str, description: str) -> dict:
+    """ Takes a sentence of the description and blanks one of its long words. """
+    long_words = [w for w in _words(description) if len(w) > 4]
+
+    if len(long_words) > 1:
+        # Take a sentence and blank a word
+        sentences = re.split(r'[.!?]+', description)
+        valid_sentences = [s.strip() for s in sentences if len(s.split()) > 3]
+
+        if valid_sentences:
+            chosen_sentence = random.choice(valid_sentences)
+            blanks = [w for w in _words(chosen_sentence) if len(w) > 4]
+            if blanks:
+                blank_word = random.choice(blanks)
+                # Replace the exact word in the sentence keeping punctuation
+                question = re.sub(rf'\b{blank_word}\b', "______", chosen_sentence, count=1) + "."
+                return {
+                    "type": "fill_in_the_blank",
+                    "question": question,
+                    "correct_answer": blank_word,
+                    "hint": f"La palabra tiene {len(blank_word)} letras y empieza por '{blank_word[:2]}'.",
+                    "difficulty": "difícil"
+                }
+
+    # Static fallback
+    return {
+        "type": "fill_in_the_blank",
+        "question": f"¿Cómo de importante dirías que es este recuerdo '{title}'? (Muy importante / Algo importante)",
+        "correct_answer": "Muy importante",
+        "hint": "Probablemente tiene mucho valor para ti.",
+        "difficulty": "media"
+    }
+
+
+def fallback_ordering(title: str, description: str) -> dict:
+    """ Asks to order the first sentences of the description. """
+    sentences = re.split(r'[.!?]+', description)
+    valid_sentences = [s.strip() for s in sentences if len(s.split()) > 2]
+
+    if len(valid_sentences) >= 3:
+        # Extract first 3 valid sentences
+        correct_order = list(valid_sentences[:3])
+        # We need options shuffled
+        shuffled = list(correct_order)
+        # Ensure it's not accidentally in the right order if possible
+        attempts = 0
+        while shuffled == correct_order and attempts < 10:
+            random.shuffle(shuffled)
+            attempts += 1
+
+        return {
+            "type": "ordering",
+            "question": f"Ordena cronológicamente estas partes de tu historia:",
+            "options": shuffled,
+            "correct_answer": correct_order,
+            "hint": "Intenta recordar cómo empezó todo.",
+            "difficulty": "difícil"
+        }
+
+    return {
+        "type": "ordering",
+        "question": f"Normalmente, ¿cómo sucedió el evento de '{title}'?",
+        "options": ["Los preparativos", "El evento principal", "El momento posterior"],
+        "correct_answer": ["Los preparativos", "El evento principal", "El momento posterior"],
+        "hint": "Todo evento suele contar con un antes, un durante y un después.",
+        "difficulty": "media"
+    }
+
+
+FALLBACKS = {
+    "multiple_choice": fallback_multiple_choice,
+    "fill_in_the_blank": fallback_fill_in_the_blank,
+    "ordering": fallback_ordering,
+}
+
+
+def fallback_exercise(ex_type: str, title: str, description: str) -> dict:
+    """ Local exercise of the requested type. """
+    print(f"\033[93m[fallback]\033[0m Building fallback {ex_type} exercise")
+    return FALLBACKS[ex_type](title or 'este recuerdo', description or '')
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def make_key(model: str, temperature, template_version: str, inputs: dict) -> str:
+    """ Content-addressed key of an LLM call: same model, temperature, template and inputs -> same key. """
+    payload = json.dumps(
+        [model, temperature, template_version, inputs],
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Cache of raw LLM responses.
+
+    Two tiers: an in-memory LRU with TTL (per process) and an optional SQLite
+    file shared by every worker process (LLM_CACHE_DB). Values are the raw
+    strings returned by crew.kickoff, so callers always parse a fresh object.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl: float = 3600, db_path: str = None):
+        print("\033[96m[llm_cache]\033[0m initialized")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (stored_at, value)
+        self._db = None
+
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+        if db_path:
+            self._open_db(db_path)
+
+    # --- SQLite tier ---
+    def _open_db(self, db_path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._db = sqlite3.connect(db_path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+
+    def _db_get(self, key: str):
+        row = self._db.execute("SELECT value, stored_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, stored_at = row
+        if time.time() - stored_at > self.ttl:
+            self._db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            return None
+        return stored_at, value
+
+    def _db_set(self, key: str, value: str, stored_at: float):
+        self._db.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, value, stored_at) VALUES (?, ?, ?)",
+            (key, value, stored_at),
+        )
+
+    # --- Public API ---
+    def get(self, key: str):
+        """ Returns the cached raw response or None. """
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if now - stored_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return value
+                del self._entries[key]
+
+            if self._db is not None:
+                entry = self._db_get(key)
+                if entry is not None:
+                    self._remember(key, entry)
+                    self.counters["disk_hits"] += 1
+                    return entry[1]
+
+            self.counters["misses"] += 1
+            return None
+
+    def set(self, key: str, value: str):
+        """ Stores a raw response in every tier. """
+        stored_at = time.time()
+        with self._lock:
+            self._remember(key, (stored_at, value))
+            if self._db is not None:
+                self._db_set(key, value, stored_at)
+            self.counters["stores"] += 1
+
+    def _remember(self, key: str, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.counters["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM llm_cache")
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+            stats["entries"] = len(self._entries)
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 3) if lookups else 0.0
+        stats["persistent"] = self._db is not None
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> LLMCache:
+    """ Returns the process-wide cache configured from .env (LLM_CACHE_SIZE, LLM_CACHE_TTL, LLM_CACHE_DB). """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMCache(
+                    max_entries=int(os.getenv("LLM_CACHE_SIZE", "512")),
+                    ttl=float(os.getenv("LLM_CACHE_TTL", "3600")),
+                    db_path=os.getenv("LLM_CACHE_DB") or None,
+                )
+    return _cache
@@ -0,0 +1,311 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from core.backend_router import get_router
+from core.config_registry import ConfigRegistry
+from core.deadline import DeadlineExceeded, current_deadline
+from core.llm_cache import get_cache, make_key
+from core.llm_scheduler import LLM_EXPECTED_COMPLETION_TOKENS, SchedulerFull, get_scheduler
+from core.prompt_compiler import SLICING_ENABLED, get_prompt_stats, prompt_tokens
+from core.singleflight import SingleFlight
+from utils.http_pool import get_async_http_client
+
+# Loaded with the first crew (see _load_crewai): importing crewai takes seconds
+Crew = None
+_active_llm_rate_limit_retry = None
+
+
+def _load_crewai():
+    global Crew, _active_llm_rate_limit_retry
+    if Crew is None:
+        try:
+            # crewai retries 429s on its own by sleeping in the calling thread. Marking that retry
+            # as already active makes it raise instead, so the scheduler backs off for every call.
+            from crewai.llms.retry import _active_llm_rate_limit_retry
+        except ImportError:
+            pass
+        from crewai import Crew
+
+# Threads that run crew.kickoff, so callers can stop waiting when their deadline expires
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_CALL_THREADS", "32")), thread_name_prefix="llm")
+
+# Identical prompts in flight at the same time share one provider call
+_flights = SingleFlight("llm")
+_aflights = SingleFlight("llm-async")
+
+
+def _run_crew(agent, task, inputs: dict) -> str:
+    _load_crewai()
+    if _active_llm_rate_limit_retry is not None:
+        _active_llm_rate_limit_retry.set(True)
+    crew = Crew(
+        agents=[agent],
+        tasks=[task],
+        verbose=False,
+        memory=False
+    )
+    return crew.kickoff(inputs=inputs).raw.strip()
+
+
+def _build_and_run(registry: ConfigRegistry, agent_name: str, task_name: str, inputs: dict, profile: dict, variant: str = None) -> str:
+    """ Runs the crew on the profile's backends (core.backend_router: failover, hedging, circuit breakers). """
+    def run(backend):
+        agent, task = registry.build(agent_name, task_name, registry.llm_for(profile, backend), variant)
+        return _run_crew(agent, task, inputs)
+
+    return get_router().call(profile["backends"], task_name, run)
+
+
+def _queue_timeout(deadline):
+    return deadline.remaining() if deadline is not None else None
+
+
+def _schedule(future: Future, priority: str, tokens: int, deadline, call, attempt: int = 0):
+    """
+    Queues `call` in the LLM scheduler and runs it on the executor when its turn
+    comes; the outcome ends up in `future`. Rate-limited and transient failures
+    are queued again with retry priority.
+    """
+    def run():
+        try:
+            raw = call()
+        except Exception as e:
+            get_scheduler().release()
+            if get_scheduler().on_error(e, attempt):
+                _schedule(future, priority, tokens, deadline, call, attempt + 1)
+            else:
+                future.set_exception(e)
+            return
+        get_scheduler().release()
+        get_scheduler().on_success()
+        future.set_result(raw)
+
+    try:
+        get_scheduler().enqueue(priority if attempt == 0 else "retry", tokens,
+                                lambda: _executor.submit(run),
+                                future.set_exception,
+                                _queue_timeout(deadline))
+    except SchedulerFull as e:
+        future.set_exception(e)
+
+
+def _variant(variant: str):
+    """ Compiled prompt variant to use, or None when slicing is turned off (PROMPT_SLICING=0). """
+    return variant if SLICING_ENABLED else None
+
+
+def _profile(registry: ConfigRegistry, agent_name: str, model: str, temperature: float, profile: dict) -> tuple:
+    """
+    (profile, overrides) of a call: the agent's profile from agents.yaml with the
+    caller's model / temperature / profile overrides on top (None = the agent's own).
+    """
+    overrides = dict(profile or {})
+    if model is not None:
+        overrides["model"] = model
+    if temperature is not None:
+        overrides["temperature"] = temperature
+    return registry.profile(agent_name, overrides), overrides
+
+
+def _completion_tokens(profile: dict) -> int:
+    # Providers count max_tokens against the token quota, so the scheduler does too
+    return profile["max_tokens"] or LLM_EXPECTED_COMPLETION_TOKENS
+
+
+def _cached(registry: ConfigRegistry, agent_name: str, task_name: str, inputs: dict, profile: dict, overrides: dict, variant: str = None):
+    """
+    Returns (key, cacheable, raw): key identifies the prompt, raw is the cached
+    answer or None (always None for agents with `cache: false`).
+    """
+    version = registry.version(agent_name, task_name, variant)
+    if set(overrides) - {"model", "temperature"}:
+        # The profile in agents.yaml is already part of the version; other backends/limits are not
+        version += "+" + make_key(None, None, "", overrides)[:8]
+    key = make_key(profile["model"], profile["temperature"], version, inputs)
+    if not registry.agent_option(agent_name, "cache", True):
+        return key, False, None
+
+    raw = get_cache().get(key)
+    if raw is not None:
+        print(f"\033[96m[llm_runner]\033[0m Cache hit for {agent_name}/{task_name}")
+    return key, True, raw
+
+
+def _deadline_for(agent_name: str, task_name: str):
+    """ Deadline of the current request; raises DeadlineExceeded if it has already expired. """
+    deadline = current_deadline()
+    if deadline is not None and deadline.expired():
+        raise DeadlineExceeded(f"No time left for {agent_name}/{task_name}")
+    return deadline
+
+
+def kickoff(config_path: str, agent_name: str, task_name: str, inputs: dict, model: str = None, temperature: float = None, parse=None, variant: str = None, priority: str = None, profile: dict = None):
+    """
+    Single entry point for every crew.kickoff of the agents.
+
+    Builds a fresh Agent/Task from the ConfigRegistry and runs them. Responses
+    are cached by (model, temperature, template version, inputs) unless the
+    agent opts out with `cache: false` in agents.yaml.
+
+    If `parse` is given it is applied to the raw text and its result returned;
+    only responses that parse are stored, so a broken answer is never replayed.
+
+    Concurrent calls with the same key (e.g. a retried request) share a single
+    provider call, whether or not the agent is cached.
+
+    If the current request has a deadline (core.deadline), the call is refused
+    once it has expired and abandoned with DeadlineExceeded when it runs past it.
+
+    `variant` picks a compiled version of the task (the generators pass their
+    difficulty, see core.prompt_compiler); tasks without variants ignore it.
+
+    Provider calls go through the LLM scheduler (core.llm_scheduler) with the
+    agent's `priority` from agents.yaml unless the caller passes one (e.g. "retry").
+
+    Model, temperature, max_tokens, stop and backends come from the agent's
+    `profile:` in agents.yaml; `model`, `temperature` and `profile` override it.
+    """
+    registry = ConfigRegistry.get(config_path)
+    variant = _variant(variant)
+    priority = priority or registry.agent_option(agent_name, "priority", "generation")
+    profile, overrides = _profile(registry, agent_name, model, temperature, profile)
+
+    key, cacheable, raw = _cached(registry, agent_name, task_name, inputs, profile, overrides, variant)
+    if raw is not None:
+        return parse(raw) if parse else raw
+
+    deadline = _deadline_for(agent_name, task_name)
+
+    # Concurrent identical prompts (same key) wait on the call already in flight
+    future, coalesced = _flights.submit(key, Future)
+    if coalesced:
+        print(f"\033[96m[llm_runner]\033[0m Coalesced with the in-flight call of {agent_name}/{task_name}")
+    else:
+        tokens = prompt_tokens(registry.render(agent_name, task_name, inputs, variant))
+        get_prompt_stats().record(task_name, variant, tokens)
+        _schedule(future, priority, tokens + _completion_tokens(profile), deadline,
+                  lambda: _build_and_run(registry, agent_name, task_name, inputs, profile, variant))
+
+    try:
+        raw = future.result(timeout=deadline.remaining() if deadline is not None else None)
+    except FutureTimeoutError:
+        # The provider call cannot be interrupted; its late answer is simply dropped
+        raise DeadlineExceeded(f"{agent_name}/{task_name} did not answer before the deadline")
+
+    # Every caller parses its own copy, so post-processing never leaks between them
+    result = parse(raw) if parse else raw
+    if cacheable:
+        get_cache().set(key, raw)
+
+    return result
+
+
+# ______________________________________ Async path ______________________________________
+
+_async_clients = {}
+_async_client_lock = threading.Lock()
+
+
+def get_async_client(base_url: str = None, api_key: str = None):
+    """
+    Process-wide async client per endpoint, on the shared connection pool
+    (utils.http_pool), so hundreds of calls can be in flight without a thread
+    each. Without arguments it is the provider's (LLM_API_BASE / OPENAI_API_KEY).
+    Clients belong to the event loop that first uses them (the ASGI server's).
+    """
+    base_url = base_url or os.getenv("LLM_API_BASE") or None
+    api_key = api_key or os.getenv("OPENAI_API_KEY")
+    key = (base_url, api_key)
+    client = _async_clients.get(key)
+    if client is None:
+        with _async_client_lock:
+            client = _async_clients.get(key)
+            if client is None:
+                from openai import AsyncOpenAI
+                client = AsyncOpenAI(
+                    api_key=api_key,
+                    base_url=base_url,
+                    http_client=get_async_http_client(),
+                    # Retries are the scheduler's job (core.llm_scheduler), with 429 backoff
+                    max_retries=0
+                )
+                _async_clients[key] = client
+    return client
+
+
+async def _acomplete(registry: ConfigRegistry, backend, profile: dict, messages: list) -> str:
+    endpoint = registry.backend(backend) if backend is not None else {"base_url": None, "api_key": None, "model": None}
+    client = get_async_client(endpoint["base_url"], endpoint["api_key"])
+    options = {}
+    if profile["max_tokens"]:
+        options["max_tokens"] = profile["max_tokens"]
+    if profile["stop"]:
+        options["stop"] = list(profile["stop"])
+    response = await client.chat.completions.create(model=endpoint["model"] or profile["model"], temperature=profile["temperature"], messages=messages, **options)
+    return (response.choices[0].message.content or "").strip()
+
+
+async def _ascheduled(registry: ConfigRegistry, task_name: str, priority: str, tokens: int, deadline, profile: dict, messages: list) -> str:
+    """ Async twin of _schedule(): waits for the scheduler's go before each attempt. """
+    attempt = 0
+    while True:
+        await get_scheduler().wait_turn(priority if attempt == 0 else "retry", tokens, _queue_timeout(deadline))
+        try:
+            raw = await get_router().acall(profile["backends"], task_name, lambda backend: _acomplete(registry, backend, profile, messages))
+        except Exception as e:
+            if not get_scheduler().on_error(e, attempt):
+                raise
+            attempt += 1
+            continue
+        finally:
+            get_scheduler().release()
+        get_scheduler().on_success()
+        return raw
+
+
+async def akickoff(config_path: str, agent_name: str, task_name: str, inputs: dict, model: str = None, temperature: float = None, parse=None, variant: str = None, priority: str = None, profile: dict = None):
+    """
+    Async twin of kickoff(): same cache, coalescing, parse and deadline rules, but the prompt
+    is rendered from the templates and sent straight to the shared async client
+    instead of going through a crewai Crew on a thread.
+    """
+    registry = ConfigRegistry.get(config_path)
+    variant = _variant(variant)
+    priority = priority or registry.agent_option(agent_name, "priority", "generation")
+    profile, overrides = _profile(registry, agent_name, model, temperature, profile)
+
+    key, cacheable, raw = _cached(registry, agent_name, task_name, inputs, profile, overrides, variant)
+    if raw is not None:
+        return parse(raw) if parse else raw
+
+    deadline = _deadline_for(agent_name, task_name)
+
+    messages = registry.render(agent_name, task_name, inputs, variant)
+
+    def start():
+        tokens = prompt_tokens(messages)
+        get_prompt_stats().record(task_name, variant, tokens)
+        return asyncio.ensure_future(_ascheduled(registry, task_name, priority, tokens + _completion_tokens(profile), deadline, profile, messages))
+
+    task, coalesced = _aflights.submit(key, start)
+    if coalesced:
+        print(f"\033[96m[llm_runner]\033[0m Coalesced with the in-flight call of {agent_name}/{task_name}")
+
+    # shield: a caller giving up must not cancel the call the others are waiting on
+    try:
+        raw = await asyncio.wait_for(asyncio.shield(task), timeout=deadline.remaining() if deadline is not None else None)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(f"{agent_name}/{task_name} did not answer before the deadline")
+
+    result = parse(raw) if parse else raw
+    if cacheable:
+        get_cache().set(key, raw)
+
+    return result
+
+
+def stats() -> dict:
+    """ Coalescing counters of the sync and async paths. """
+    return {"sync": _flights.stats(), "async": _aflights.stats()}
@@ -0,0 +1,345 @@
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from collections import deque
+
+from dotenv import load_dotenv
+
+from core.deadline import DeadlineExceeded
+
+load_dotenv()
+
+# Lower value = served first. Corrections are interactive; retries can wait for first attempts;
+# background work (memory preprocessing) only runs when nobody is waiting.
+PRIORITIES = {"correction": 0, "generation": 1, "retry": 2, "background": 3}
+
+# Provider limits (0 = no limit). Defaults match gpt-4o-mini on the lowest paid tier.
+LLM_RPM = float(os.getenv("LLM_RPM", "500"))
+LLM_TPM = float(os.getenv("LLM_TPM", "200000"))
+# Seconds of quota that can be spent in one burst
+LLM_BURST_S = float(os.getenv("LLM_BURST_S", "5"))
+# Completion tokens reserved per call on top of the prompt (the answer size is unknown upfront)
+LLM_EXPECTED_COMPLETION_TOKENS = int(os.getenv("LLM_EXPECTED_COMPLETION_TOKENS", "400"))
+
+# Calls running at once. Matches the threads of core.llm_runner, so a granted call starts
+# right away instead of waiting (in FIFO order) for a free thread.
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", os.getenv("LLM_CALL_THREADS", "32")))
+
+# Waiting calls per priority class, and how long a call may wait for its turn
+LLM_QUEUE_MAX = int(os.getenv("LLM_QUEUE_MAX", "200"))
+LLM_QUEUE_TIMEOUT_S = float(os.getenv("LLM_QUEUE_TIMEOUT_S", "30"))
+
+# 429 handling: calls are queued again (as retries) and the whole scheduler slows down
+LLM_RATE_LIMIT_RETRIES = int(os.getenv("LLM_RATE_LIMIT_RETRIES", "3"))
+BACKOFF_BASE_S = 1.0
+BACKOFF_MAX_S = 60.0
+MIN_RATE_SCALE = 0.1
+RATE_RECOVERY_STEP = 0.05
+
+
+class SchedulerFull(Exception):
+    """ Raised when the queue of a priority class is full. """
+
+
+class QueueTimeout(DeadlineExceeded):
+    """ Raised when a call waited longer than its timeout for its turn. """
+
+
+def status_code(error) -> int:
+    """ HTTP status of a provider error (openai, litellm or crewai wrapping them), or None. """
+    while error is not None:
+        code = getattr(error, "status_code", None)
+        if isinstance(code, int):
+            return code
+        error = error.__cause__ or error.__context__
+    return None
+
+
+def retry_after(error) -> float:
+    """ Seconds asked by the provider's Retry-After header, or None. """
+    while error is not None:
+        headers = getattr(getattr(error, "response", None), "headers", None)
+        if headers is not None and headers.get("retry-after"):
+            try:
+                return float(headers.get("retry-after"))
+            except ValueError:
+                return None
+        error = error.__cause__ or error.__context__
+    return None
+
+
+def _transient(error, code) -> bool:
+    """ Server errors, timeouts and dropped connections are worth another attempt. """
+    if code is not None:
+        return code >= 500 or code == 408
+    return isinstance(error, (ConnectionError, TimeoutError)) or type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+class TokenBucket:
+    """ Refills `per_minute` units per minute up to LLM_BURST_S seconds of quota. 0 = unlimited. """
+
+    def __init__(self, per_minute: float):
+        self.per_minute = per_minute
+        self.capacity = max(1.0, per_minute / 60 * LLM_BURST_S)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def wait_time(self, cost: float, now: float, scale: float) -> float:
+        """ Seconds until `cost` units are available at the current (scaled) refill rate. """
+        if self.per_minute <= 0:
+            return 0.0
+        rate = self.per_minute / 60 * scale
+        self.level = min(self.capacity, self.level + (now - self.updated) * rate)
+        self.updated = now
+        missing = min(cost, self.capacity) - self.level
+        return max(0.0, missing / rate)
+
+    def take(self, cost: float):
+        if self.per_minute > 0:
+            self.level -= min(cost, self.capacity)
+
+
+class _Waiter:
+    __slots__ = ("priority", "tokens", "grant", "fail", "enqueued", "expires", "done")
+
+    def __init__(self, priority, tokens, grant, fail, timeout):
+        self.priority = priority
+        self.tokens = tokens
+        self.grant = grant
+        self.fail = fail
+        self.enqueued = time.monotonic()
+        self.expires = self.enqueued + timeout
+        self.done = False
+
+
+class LLMScheduler:
+    """
+    Single gate of every provider call (core.llm_runner).
+
+    Calls wait in a priority queue and are let through by a dispatcher thread
+    when the requests/min and tokens/min buckets allow it and fewer than
+    LLM_MAX_IN_FLIGHT calls are running (each granted call must release()). A 429 from the
+    provider pauses dispatching (Retry-After or exponential backoff) and halves
+    the refill rate, which then recovers a little with every successful call.
+
+    Waiters are callbacks, so a thread-pool call and an asyncio call can sit in
+    the same queue without blocking a thread while they wait.
+    """
+
+    def __init__(self, rpm: float = LLM_RPM, tpm: float = LLM_TPM, max_in_flight: int = LLM_MAX_IN_FLIGHT):
+        self._cond = threading.Condition()
+        self._queue = []
+        self._seq = itertools.count()
+        self._requests = TokenBucket(rpm)
+        self._tokens = TokenBucket(tpm)
+        self._scale = 1.0
+        self._paused_until = 0.0
+        self._consecutive_429 = 0
+        self._max_in_flight = max_in_flight
+        self._in_flight = 0
+        self._dispatcher = None
+
+        self.depth = {name: 0 for name in PRIORITIES}
+        self.waits = {name: deque(maxlen=500) for name in PRIORITIES}
+        self.counters = {"granted": 0, "rejected": 0, "timed_out": 0, "rate_limited": 0, "retried": 0}
+
+    # --- Queue ---
+    def enqueue(self, priority: str, tokens: int, grant, fail, timeout: float = None):
+        """
+        Queues a call: grant() runs when it may start, fail(error) if it times out.
+        Both are called from the dispatcher thread and must not block.
+        Raises SchedulerFull if the class already has LLM_QUEUE_MAX calls waiting.
+        """
+        if priority not in PRIORITIES:
+            priority = "generation"
+        timeout = LLM_QUEUE_TIMEOUT_S if timeout is None else min(timeout, LLM_QUEUE_TIMEOUT_S)
+
+        with self._cond:
+            if self.depth[priority] >= LLM_QUEUE_MAX:
+                self.counters["rejected"] += 1
+                raise SchedulerFull(f"{self.depth[priority]} {priority} LLM calls already waiting")
+
+            waiter = _Waiter(priority, tokens, grant, fail, timeout)
+            heapq.heappush(self._queue, (PRIORITIES[priority], next(self._seq), waiter))
+            self.depth[priority] += 1
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch, name="llm-scheduler", daemon=True)
+                self._dispatcher.start()
+            self._cond.notify()
+        return waiter
+
+    def cancel(self, waiter) -> bool:
+        """ Takes a call that gave up out of the queue. False if it was already granted or expired. """
+        with self._cond:
+            if waiter.done:
+                return False
+            waiter.done = True
+            self.depth[waiter.priority] -= 1
+            self._queue = [entry for entry in self._queue if entry[2] is not waiter]
+            heapq.heapify(self._queue)
+            self._cond.notify()
+            return True
+
+    async def wait_turn(self, priority: str, tokens: int, timeout: float = None):
+        """
+        Async version of enqueue(): returns when the call may start, raises QueueTimeout/SchedulerFull.
+        A caller cancelled while it waits never holds a slot: it leaves the queue, or gives
+        back the slot it was granted (the caller only releases after wait_turn returns).
+        """
+        loop = asyncio.get_running_loop()
+        turn = loop.create_future()
+
+        def resolve(error):
+            if turn.done():
+                # Granted after the caller was cancelled: nobody will use the slot
+                if error is None:
+                    self.release()
+                return
+            if error is not None:
+                turn.set_exception(error)
+            else:
+                turn.set_result(None)
+
+        def notify(error=None):
+            try:
+                loop.call_soon_threadsafe(resolve, error)
+            except RuntimeError:
+                # The loop is closed
+                if error is None:
+                    self.release()
+
+        waiter = self.enqueue(priority, tokens, notify, notify, timeout)
+        try:
+            await turn
+        except asyncio.CancelledError:
+            if not self.cancel(waiter) and turn.done() and not turn.cancelled() and turn.exception() is None:
+                # Granted, but cancelled before the caller could take the slot
+                self.release()
+            raise
+
+    def _dispatch(self):
+        while True:
+            with self._cond:
+                granted, expired, sleep = self._next_batch(time.monotonic())
+                if not granted and not expired:
+                    self._cond.wait(timeout=sleep)
+
+            # Outside the lock: callbacks may start calls or wake other threads
+            for waiter in granted:
+                waiter.grant()
+            for waiter in expired:
+                waiter.fail(QueueTimeout(f"LLM call waited more than {round(time.monotonic() - waiter.enqueued, 1)}s for its turn ({waiter.priority})"))
+
+    def _next_batch(self, now: float):
+        """ Pops the calls that may start now and the ones that expired. Returns (granted, expired, seconds to sleep). """
+        granted, expired = [], []
+        sleep = None
+
+        for _, _, waiter in self._queue:
+            if waiter.expires <= now:
+                expired.append(waiter)
+        if expired:
+            for waiter in expired:
+                waiter.done = True
+                self.depth[waiter.priority] -= 1
+            self.counters["timed_out"] += len(expired)
+            self._queue = [entry for entry in self._queue if not entry[2].done]
+            heapq.heapify(self._queue)
+
+        while self._queue:
+            waiter = self._queue[0][2]
+            if self._in_flight >= self._max_in_flight:
+                break
+            if now < self._paused_until:
+                sleep = self._paused_until - now
+                break
+            # Strict priority: the head waits for quota instead of being overtaken by cheaper calls
+            wait = max(self._requests.wait_time(1, now, self._scale), self._tokens.wait_time(waiter.tokens, now, self._scale))
+            if wait > 0:
+                sleep = wait
+                break
+
+            heapq.heappop(self._queue)
+            self._requests.take(1)
+            self._tokens.take(waiter.tokens)
+            waiter.done = True
+            self._in_flight += 1
+            self.depth[waiter.priority] -= 1
+            self.waits[waiter.priority].append(now - waiter.enqueued)
+            self.counters["granted"] += 1
+            granted.append(waiter)
+
+        if self._queue:
+            next_expiry = min(entry[2].expires for entry in self._queue) - now
+            sleep = next_expiry if sleep is None else min(sleep, next_expiry)
+        return granted, expired, sleep
+
+    # --- Feedback from the calls ---
+    def release(self):
+        """ A granted call finished (whatever the outcome). """
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify()
+
+    def on_success(self):
+        with self._cond:
+            self._consecutive_429 = 0
+            if self._scale < 1.0:
+                self._scale = min(1.0, self._scale + RATE_RECOVERY_STEP)
+
+    def on_error(self, error, attempt: int) -> bool:
+        """ Records a failed call. Returns True if it should be queued again as a retry. """
+        code = status_code(error)
+        if code == 429:
+            with self._cond:
+                self.counters["rate_limited"] += 1
+                now = time.monotonic()
+                # A burst of calls rejected together is one signal: only escalate once per pause
+                if now >= self._paused_until:
+                    self._consecutive_429 += 1
+                    self._scale = max(MIN_RATE_SCALE, self._scale / 2)
+                    backoff = min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2 ** (self._consecutive_429 - 1)) * random.uniform(0.5, 1.0)
+                    pause = max(retry_after(error) or 0.0, backoff)
+                    self._paused_until = now + pause
+                    print(f"\033[93m[llm_scheduler]\033[0m Rate limited by the provider, pausing {pause:.1f}s (rate x{self._scale:.2f})")
+        elif not _transient(error, code):
+            # Bad request, auth, unparseable output...: retrying would fail again
+            return False
+
+        if attempt >= LLM_RATE_LIMIT_RETRIES:
+            return False
+        with self._cond:
+            self.counters["retried"] += 1
+        return True
+
+    # --- Metrics ---
+    def stats(self) -> dict:
+        with self._cond:
+            waits = {name: sorted(values) for name, values in self.waits.items()}
+            data = dict(self.counters)
+            data["queued"] = dict(self.depth)
+            data["in_flight"] = self._in_flight
+            data["rate_scale"] = round(self._scale, 2)
+            data["paused_s"] = round(max(0.0, self._paused_until - time.monotonic()), 2)
+
+        data["limits"] = {"rpm": self._requests.per_minute, "tpm": self._tokens.per_minute, "in_flight": self._max_in_flight}
+        data["wait_ms"] = {
+            name: {
+                "p50": round(values[len(values) // 2] * 1000, 1),
+                "p95": round(values[int(len(values) * 0.95) - 1 if len(values) > 1 else 0] * 1000, 1)
+            } if values else {"p50": 0.0, "p95": 0.0}
+            for name, values in waits.items()
+        }
+        return data
+
+
+_scheduler = LLMScheduler()
+
+
+def get_scheduler() -> LLMScheduler:
+    """ Returns the process-wide scheduler (its counters feed /api/metrics). """
+    return _scheduler
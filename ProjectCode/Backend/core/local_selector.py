@@ -0,0 +1,300 @@
+"""
+Local extractive selector: cuts a memory into per-slot content without an LLM,
+following the rules of select_task (config/tasks.yaml):
+
+- fill_in_the_blank: a long contiguous passage (FITB_MIN_WORDS words or more);
+  repeated slots take passages from different sections of the text
+- multiple_choice: 4-6 short statements of concrete facts; repeated slots get
+  different facts
+- ordering: 4-6 events in chronological order; repeated slots take events of
+  different stages of the text
+
+The text is split into Spanish sentences (clauses for short memories) and every
+unit is scored, as NumPy vectors, by TF-IDF centrality, keywords of the title
+and analysis, named entities and numbers, and temporal markers. A unit used by a
+slot is never given to another slot of the same type and is penalised for the
+other types.
+"""
+import json
+import re
+import unicodedata
+
+import numpy as np
+
+# Part of the selection cache keys (core/selection_cache.py): bump it when the output of select() changes
+VERSION = "1"
+
+FITB_MIN_WORDS = 100
+FACTS = (4, 6)
+EVENTS = (4, 6)
+# Statements longer than this make poor multiple choice facts
+FACT_MAX_WORDS = 30
+# Longer "sentences" (transcribed audio has little punctuation) are cut at commas, or every CLAUSE_WORDS words
+LONG_SENTENCE_WORDS = 45
+CLAUSE_WORDS = 25
+# Penalty of a unit another slot type already took
+REUSE_PENALTY = 0.5
+
+STOPWORDS = frozenset("""
+a al algo algun alguna algunas alguno algunos ante antes aquel aquella aquellas aquello aquellos aqui asi aun aunque
+bajo bien cada casi como con contra cual cuales cuando cuanto de del desde donde dos el ella ellas ello ellos en entre
+era eramos eran eras eres es esa esas ese eso esos esta estaba estabamos estaban estado estamos estan estar estas este
+esto estos estuve estuvo fue fuera fueron fui fuimos ha habia habiamos habian haber habia han has hasta hay he hemos
+hizo hubo la las le les lo los mas me mi mis mucha muchas mucho muchos muy nada ni no nos nosotras nosotros nuestra
+nuestras nuestro nuestros nunca o os otra otras otro otros para pero poco por porque que quien quienes se sea ser
+si siempre sin sobre solo son su sus tambien tan tanto te tenia teniamos tenian tengo ti tiene tienen todo todos tu
+tus un una unas uno unos usted ustedes va vamos van y ya yo
+""".split())
+
+# "Sr. García" or "D. Manuel" do not end a sentence
+ABBREVIATIONS = frozenset("sr sra srta sres dr dra d dna da sto sta etc ej pag av avda c num n aprox ud uds vd vds prof gral".split())
+
+MONTHS = "enero febrero marzo abril mayo junio julio agosto septiembre setiembre octubre noviembre diciembre"
+WEEKDAYS = "lunes martes miercoles jueves viernes sabado domingo"
+
+# Matched on accent-free, lower-case text
+TEMPORAL = re.compile(r"\b(?:" + "|".join([
+    r"(?:1[89]|20)\d\d", r"anos? (?:\d+|veinte|treinta|cuarenta|cincuenta|sesenta|setenta|ochenta|noventa)",
+    r"a los \w+ anos", r"(?:\w+ )?(?:anos|meses|dias|semanas|tiempo) (?:despues|mas tarde|antes)",
+    r"cuando", r"despues", r"luego", r"mas tarde", r"antes de", r"primero", r"la primera vez", r"al principio",
+    r"al final", r"finalmente", r"por fin", r"entonces", r"desde (?:entonces|que)", r"durante", r"mientras",
+    r"al dia siguiente", r"al (?:llegar|volver|salir|terminar|acabar|despertar)", r"(?:esa|aquella) (?:noche|tarde|manana)",
+    r"por la (?:manana|tarde|noche)", r"(?:aquel|ese|este) (?:dia|verano|invierno|otono|ano|mes)",
+    r"(?:" + "|".join(MONTHS.split()) + r")", r"(?:" + "|".join(WEEKDAYS.split()) + r")",
+    r"(?:el|en|aquel|ese) (?:verano|invierno|otono)", r"la primavera", r"navidad(?:es)?", r"semana santa",
+    r"de (?:nino|nina|joven|pequeno|pequena|mayor|soltero|soltera|recien casados?)", r"un dia", r"una vez",
+]) + r")\b")
+
+_BOUNDARY = re.compile(r"[.!?…]+[\"'»”)\]]*\s+|\s*\n\s*")
+_LAST_WORD = re.compile(r"(\w+)\W*$")
+_CLAUSE = re.compile(r"[,;:]\s+|\s+(?=(?:y|pero|aunque|luego|despues|entonces|cuando|mientras) )")
+_WORD = re.compile(r"\w+")
+_LEADING_LINK = re.compile(r"^(?:y|e|pero|aunque|luego|entonces|que)\s+", re.IGNORECASE)
+
+
+def fold(text: str) -> str:
+    """ Accent-free lower-case text, same length as the input (offsets stay valid). """
+    return "".join(unicodedata.normalize("NFKD", c.lower())[0] for c in text)
+
+
+def _stem(term: str) -> str:
+    """ Plural -> singular approximation ("casas" -> "casa", "flores" -> "flor"). """
+    if len(term) > 4 and term.endswith("es"):
+        return term[:-2]
+    if len(term) > 3 and term.endswith("s"):
+        return term[:-1]
+    return term
+
+
+def terms(text: str) -> list:
+    """ Content words of a text, accent-free and stemmed. """
+    return [_stem(word) for word in _WORD.findall(fold(text)) if word not in STOPWORDS and len(word) > 2 and not word.isdigit()]
+
+
+def split_sentences(text: str) -> list:
+    """ (start, end) character offsets of the sentences of a Spanish text; long ones are cut into clauses. """
+    spans, start = [], 0
+    for match in _BOUNDARY.finditer(text):
+        if "\n" not in match.group() and match.group().startswith("."):
+            # Abbreviations, initials and a lower-case next word are not the end of a sentence
+            previous = _LAST_WORD.search(text, max(start, match.start() - 20), match.start() + 1)
+            following = text[match.end():match.end() + 1]
+            if (previous and fold(previous.group(1)) in ABBREVIATIONS) or following.islower():
+                continue
+        spans.append((start, match.start() + len(match.group().rstrip())))
+        start = match.end()
+    spans.append((start, len(text)))
+
+    result = []
+    for s, e in spans:
+        while s < e and text[s].isspace():
+            s += 1
+        if s < e:
+            result.extend(_cut_long(text, s, e) if len(text[s:e].split()) > LONG_SENTENCE_WORDS else [(s, e)])
+    return result
+
+
+def split_clauses(text: str, spans: list, max_words: int = CLAUSE_WORDS) -> list:
+    """ The spans cut at commas and linking words, into pieces of 3 words or more. """
+    result = []
+    for s, e in spans:
+        cuts = [s] + [s + m.end() for m in _CLAUSE.finditer(fold(text[s:e]))] + [e]
+        pieces = [(a, b) for a, b in zip(cuts, cuts[1:]) if b > a]
+        merged = []
+        for a, b in pieces:
+            # Pieces too short to stand alone stay with the previous one
+            if merged and (len(text[a:b].split()) < 3 or len(text[merged[-1][0]:merged[-1][1]].split()) < 3):
+                merged[-1] = (merged[-1][0], b)
+            else:
+                merged.append((a, b))
+        for a, b in merged:
+            result.extend(_by_words(text, a, b, max_words) if len(text[a:b].split()) > max_words * 2 else [(a, b)])
+    return [(a, b) for a, b in ((a, _rstrip(text, a, b)) for a, b in result) if b > a]
+
+
+def _cut_long(text: str, s: int, e: int) -> list:
+    return split_clauses(text, [(s, e)], LONG_SENTENCE_WORDS)
+
+
+def _by_words(text: str, s: int, e: int, size: int) -> list:
+    """ Cuts a span without punctuation every `size` words. """
+    starts = [s + m.start() for m in _WORD.finditer(text[s:e])][::size]
+    return [(a, b) for a, b in zip(starts, starts[1:] + [e])]
+
+
+def _rstrip(text: str, s: int, e: int) -> int:
+    while e > s and (text[e - 1].isspace() or text[e - 1] in ",;:"):
+        e -= 1
+    return e
+
+
+def _entities(unit: str) -> float:
+    """ Capitalised words inside the unit (names, places), numbers and years. """
+    words = _WORD.findall(unit)
+    names = sum(1 for word in words[1:] if word[:1].isupper() and fold(word) not in STOPWORDS)
+    numbers = sum(2 if re.fullmatch(r"(?:1[89]|20)\d\d", word) else 1 for word in words if word.isdigit())
+    return names + numbers
+
+
+def _unit(max_value):
+    return max_value if max_value > 0 else 1.0
+
+
+class Document:
+    """ A memory split into units (sentences, or clauses for short texts) with their scores. """
+
+    def __init__(self, text: str, keywords: str = "", spans: list = None):
+        self.text = text
+        spans = spans if spans is not None else split_sentences(text)
+        if len(spans) < max(FACTS[0], EVENTS[0]):
+            spans = split_clauses(text, spans)
+        self.spans = spans
+        self.units = [text[s:e] for s, e in spans]
+        n = len(self.units)
+        self.words = np.array([len(unit.split()) for unit in self.units], dtype=np.int64)
+
+        # TF-IDF as (unit, term) pairs: memories of thousands of words would make a dense matrix huge
+        vocabulary = {}
+        rows, cols = [], []
+        for i, unit in enumerate(self.units):
+            for term in terms(unit):
+                rows.append(i)
+                cols.append(vocabulary.setdefault(term, len(vocabulary)))
+        pairs, counts = np.unique(np.array(rows, dtype=np.int64) * max(1, len(vocabulary)) + np.array(cols, dtype=np.int64), return_counts=True)
+        rows, cols = pairs // max(1, len(vocabulary)), pairs % max(1, len(vocabulary))
+        df = np.bincount(cols, minlength=len(vocabulary))
+        idf = np.log((1 + n) / (1 + df)) + 1
+        weights = counts * idf[cols]
+        norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=n))
+        unit_weights = weights / np.where(norms > 0, norms, 1)[rows]
+        centroid = np.bincount(cols, weights=unit_weights, minlength=len(vocabulary))
+        centroid = centroid / _unit(np.linalg.norm(centroid))
+        centrality = np.bincount(rows, weights=unit_weights * centroid[cols], minlength=n)
+
+        keyword_terms = np.zeros(len(vocabulary))
+        for term in terms(keywords):
+            if term in vocabulary:
+                keyword_terms[vocabulary[term]] = 1.0
+        keyword = np.bincount(rows, weights=idf[cols] * keyword_terms[cols], minlength=n)
+        entities = np.array([_entities(unit) for unit in self.units], dtype=float)
+        temporal = np.array([len(TEMPORAL.findall(fold(unit))) for unit in self.units], dtype=float)
+
+        # Every component in [0, 1]
+        self.centrality = centrality / _unit(centrality.max(initial=0))
+        self.keyword = keyword / _unit(keyword.max(initial=0))
+        self.entities = entities / _unit(entities.max(initial=0))
+        self.temporal = np.minimum(temporal, 2) / 2
+        self.years = [next((int(year) for year in re.findall(r"\b(?:1[89]|20)\d\d\b", unit)), None) for unit in self.units]
+
+        length = np.where(self.words > FACT_MAX_WORDS, FACT_MAX_WORDS / np.maximum(self.words, 1), 1.0)
+        length = np.where(self.words < 4, 0.5, length)
+        self.fact_score = (0.45 * self.centrality + 0.25 * self.keyword + 0.3 * self.entities) * length
+        self.event_score = 0.45 * self.temporal + 0.3 * self.centrality + 0.25 * self.entities
+        self.passage_score = 0.6 * self.centrality + 0.2 * self.keyword + 0.2 * self.entities
+
+    def section(self, i: int, k: int) -> tuple:
+        """ Unit range [lo, hi) of the i-th of k contiguous sections with about the same number of words. """
+        if k <= 1:
+            return 0, len(self.units)
+        cumulative = np.cumsum(self.words)
+        bounds = np.searchsorted(cumulative, cumulative[-1] * np.arange(k + 1) / k, side="left")
+        lo, hi = int(bounds[i]) + (1 if i > 0 else 0), int(bounds[i + 1]) + 1
+        return min(lo, len(self.units) - 1), max(min(hi, len(self.units)), min(lo, len(self.units) - 1) + 1)
+
+    def passage(self, lo: int, hi: int, used: np.ndarray) -> list:
+        """ Best contiguous window of FITB_MIN_WORDS words or more inside [lo, hi). """
+        words = self.words[lo:hi]
+        cumulative = np.concatenate([[0], np.cumsum(words)])
+        if cumulative[-1] <= FITB_MIN_WORDS:
+            return list(range(lo, hi))
+        score = self.passage_score[lo:hi] * np.where(used[lo:hi] > 0, REUSE_PENALTY, 1.0)
+        score_sums = np.concatenate([[0], np.cumsum(score)])
+        ends = np.searchsorted(cumulative, cumulative[:-1] + FITB_MIN_WORDS, side="left")
+        starts = np.flatnonzero(ends <= len(words))
+        means = (score_sums[ends[starts]] - score_sums[starts]) / (ends[starts] - starts)
+        start = int(starts[np.argmax(means)])
+        return list(range(lo + start, lo + int(ends[start])))
+
+    def best(self, scores: np.ndarray, lo: int, hi: int, taken: set, used: np.ndarray, bounds: tuple) -> list:
+        """ Top units of [lo, hi) not in `taken`, between bounds[0] and bounds[1] of them. """
+        candidates = [i for i in range(lo, hi) if i not in taken] or list(range(lo, hi))
+        adjusted = scores[candidates] * np.where(used[candidates] > 0, REUSE_PENALTY, 1.0)
+        order = np.argsort(-adjusted, kind="stable")
+        best = adjusted[order[0]] if len(order) else 0
+        # Between the bounds, keep only units scoring at least half of the best one
+        count = max(bounds[0], min(bounds[1], int(np.sum(adjusted >= best * 0.5))))
+        return sorted(candidates[i] for i in order[:count])
+
+    def render(self, ex_type: str, indexes: list) -> str:
+        if ex_type == "fill_in_the_blank":
+            return self.text[self.spans[indexes[0]][0]:self.spans[indexes[-1]][1]].strip()
+        units = [_clean(self.units[i]) for i in indexes]
+        if ex_type == "ordering":
+            # Chronological: by year when every event has one, else in the order they are told
+            if all(self.years[i] is not None for i in indexes):
+                units = [_clean(self.units[i]) for i in sorted(indexes, key=lambda i: (self.years[i], i))]
+            return "\n".join(f"{n}. {unit}" for n, unit in enumerate(units, 1))
+        return "\n".join(units)
+
+
+def _clean(unit: str) -> str:
+    unit = _LEADING_LINK.sub("", unit.strip()).rstrip(",;: ")
+    unit = unit[:1].upper() + unit[1:]
+    return unit if unit.endswith((".", "!", "?", "…")) else unit + "."
+
+
+def analysis_text(analysis) -> str:
+    if isinstance(analysis, (dict, list)):
+        return json.dumps(analysis, ensure_ascii=False)
+    return str(analysis or "")
+
+
+def select(title: str, description: str, analysis, distribution: list, document: Document = None) -> list:
+    """ One content string per slot of `distribution`, like the selector LLM answers. """
+    description = description or ""
+    document = document or Document(description, f"{title} {analysis_text(analysis)}")
+    if not document.units:
+        return [f"{title}: {description}" for _ in distribution]
+
+    totals = {ex_type: distribution.count(ex_type) for ex_type in distribution}
+    seen = {ex_type: 0 for ex_type in distribution}
+    taken = {ex_type: set() for ex_type in distribution}
+    used = np.zeros(len(document.units))
+    n = len(document.units)
+
+    selected = []
+    for ex_type in distribution:
+        i, k = seen[ex_type], totals[ex_type]
+        seen[ex_type] += 1
+        if ex_type == "fill_in_the_blank":
+            indexes = document.passage(*document.section(i, k), used)
+        elif ex_type == "ordering":
+            indexes = document.best(document.event_score, *document.section(i, k), taken[ex_type], used, EVENTS)
+        elif ex_type == "multiple_choice":
+            indexes = document.best(document.fact_score, 0, n, taken[ex_type], used, FACTS)
+        else:
+            indexes = document.passage(0, n, used)
+        taken[ex_type].update(indexes)
+        used[indexes] += 1
+        selected.append(document.render(ex_type, indexes))
+    return selected
@@ -0,0 +1,305 @@
+"""
+Per-user history of served exercises, to avoid repeating them without an LLM.
+
+Every exercise served to a user is reduced to the facts it asks about (question
+and answer, or the events of an ordering exercise) and to its shingles: the
+stemmed content words of that text (local_selector.terms) plus its numbers, as
+stable 32-bit hashes. Single words rather than word pairs, so the same question
+asked with other words still shares most of its shingles. A MinHash signature of
+NUM_PERM values estimates the Jaccard similarity of two shingle sets, and LSH
+banding (BANDS bands of ROWS values) puts every signature in BANDS buckets of
+its memory: a lookup only compares the entries of the same memory sharing a
+bucket with the candidate, so its cost does not grow with the rest of the
+history, and neither do its false positives (two memories may well share a
+person, a place and a year).
+
+- near_duplicate(): a generated exercise of a memory that repeats a served one
+  of that memory (memory_key: its id, or its title): too similar
+  (NOVELTY_THRESHOLD) and with the same answer, or near-identical
+  (NOVELTY_IDENTICAL) whatever its answer. The orchestrator rejects it
+  locally, with feedback for the retry
+- to_avoid(): the prior questions of the same memory that are most relevant to
+  the content of a slot, for the generator's `content_to_avoid`
+- record(): what was finally served
+
+The history is a SQLite file shared by every worker (NOVELTY_DB); each process
+keeps the index of its NOVELTY_USERS most recent users in memory and reads only
+the rows added since its last look (by another worker) on every new session.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+from dotenv import load_dotenv
+
+from core import local_selector
+
+load_dotenv()
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+# Estimated Jaccard similarity from which two exercises are the same one
+NOVELTY_THRESHOLD = float(os.getenv("NOVELTY_THRESHOLD", "0.5"))
+# From here the answer does not matter: the same question with a corrected answer is still a repeat
+NOVELTY_IDENTICAL = float(os.getenv("NOVELTY_IDENTICAL", "0.8"))
+# Prior questions given to a generator as content_to_avoid
+NOVELTY_AVOID_MAX = int(os.getenv("NOVELTY_AVOID_MAX", "5"))
+# Users whose index is kept in memory per process
+NOVELTY_USERS = int(os.getenv("NOVELTY_USERS", "256"))
+
+_PRIME = 4294967311  # First prime above 2**32: (a * x + b) % p stays inside uint64
+_rng = np.random.default_rng(20240611)  # Fixed: signatures are stored and compared across processes
+_A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.uint64)
+_NUMBER = re.compile(r"\d+")
+
+AVOID_HEADER = "PREGUNTAS QUE YA SE HAN HECHO SOBRE ESTE RECUERDO (NO las repitas ni preguntes lo mismo con otras palabras; elige otros detalles):"
+
+
+def _parts(exercise: dict) -> tuple:
+    """ (question, answer) of an exercise; the events for an ordering one. """
+    if exercise.get("type") == "ordering":
+        events = exercise.get("correct_answer") or exercise.get("options") or []
+        return "", " / ".join(str(event) for event in events)
+    answer = exercise.get("correct_answer")
+    options = exercise.get("options")
+    if exercise.get("type") == "multiple_choice" and isinstance(options, list) and isinstance(answer, int) and 0 <= answer < len(options):
+        answer = options[answer]
+    return str(exercise.get("question", "")), str(answer)
+
+
+def describe(exercise: dict) -> str:
+    """ An exercise as it is listed in content_to_avoid and in the feedback of a repeat. """
+    question, answer = _parts(exercise)
+    if exercise.get("type") == "ordering":
+        return f"Ordenar: {answer}"
+    return f"{question} (respuesta: {answer})"
+
+
+def exercise_shingles(exercise: dict) -> np.ndarray:
+    """ Shingles of what an exercise asks about: its question and its answer. """
+    return shingles(" ".join(_parts(exercise)))
+
+
+def answer_key(exercise: dict) -> str:
+    """ The answer of an exercise as its sorted content words ("" for ordering: its events are already the whole exercise). """
+    if exercise.get("type") == "ordering":
+        return ""
+    answer = _parts(exercise)[1]
+    return " ".join(sorted(set(local_selector.terms(answer)) | set(_NUMBER.findall(answer)))) or local_selector.fold(answer).lower().strip()
+
+
+def shingles(text: str) -> np.ndarray:
+    """ Stable 32-bit hashes of the content words and numbers of a text. """
+    words = set(local_selector.terms(text)) | set(_NUMBER.findall(text))
+    return np.array(sorted(zlib.crc32(word.encode("utf-8")) for word in words), dtype=np.uint64)
+
+
+def signature(hashes: np.ndarray) -> np.ndarray:
+    """ MinHash signature (NUM_PERM values) of a set of shingle hashes. """
+    if len(hashes) == 0:
+        return np.full(NUM_PERM, _PRIME, dtype=np.uint64)
+    return ((_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME).min(axis=1)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """ Estimated Jaccard similarity of the shingle sets of two signatures. """
+    return float(np.mean(a == b))
+
+
+def memory_key(title: str, memory_id=None) -> str:
+    """
+    A memory in the history: its id (two memories may share a title), or its title when
+    the caller has no id. Neither changes when the description is corrected, so the
+    memory keeps its prior questions.
+    """
+    if memory_id is not None and str(memory_id):
+        return hashlib.sha1(f"id:{memory_id}".encode("utf-8")).hexdigest()[:16]
+    return hashlib.sha1(" ".join(local_selector.fold(title or "").lower().split()).encode("utf-8")).hexdigest()[:16]
+
+
+def _bands(memory: str, sig: np.ndarray) -> list:
+    return [(memory, band, sig[band * ROWS:(band + 1) * ROWS].tobytes()) for band in range(BANDS)]
+
+
+class UserHistory:
+    """ One user's served exercises with their per-memory LSH buckets and lists. """
+
+    def __init__(self):
+        self.last_id = 0
+        self.entries = []     # (memory, type, text, shingles, signature, answer)
+        self.buckets = {}     # (memory, band, band values) -> entry positions
+        self.by_memory = {}   # memory key -> entry positions
+
+    def add(self, row_id: int, memory: str, ex_type: str, text: str, hashes: np.ndarray, sig: np.ndarray, answer: str):
+        position = len(self.entries)
+        self.entries.append((memory, ex_type, text, hashes, sig, answer))
+        for key in _bands(memory, sig):
+            self.buckets.setdefault(key, []).append(position)
+        self.by_memory.setdefault(memory, []).append(position)
+        self.last_id = max(self.last_id, row_id)
+
+    def candidates(self, memory: str, sig: np.ndarray) -> set:
+        found = set()
+        for key in _bands(memory, sig):
+            found.update(self.buckets.get(key, ()))
+        return found
+
+
+class NoveltyIndex:
+    """ Served exercises of every user (see the module docstring). """
+
+    def __init__(self, db_path: str, threshold: float = NOVELTY_THRESHOLD, identical: float = NOVELTY_IDENTICAL,
+                 avoid_max: int = NOVELTY_AVOID_MAX, max_users: int = NOVELTY_USERS):
+        print("\033[96m[novelty]\033[0m initialized")
+        self.threshold = threshold
+        self.identical = identical
+        self.avoid_max = avoid_max
+        self.max_users = max_users
+
+        self._lock = threading.Lock()
+        self._users = OrderedDict()   # user_id -> UserHistory
+        self.counters = {"checked": 0, "rejected": 0, "avoid_lists": 0, "recorded": 0, "loaded_rows": 0}
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._db = sqlite3.connect(db_path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS served_exercises (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id TEXT NOT NULL, memory TEXT NOT NULL, "
+            "type TEXT NOT NULL, text TEXT NOT NULL, answer TEXT NOT NULL, shingles BLOB NOT NULL, signature BLOB NOT NULL, served_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS served_exercises_user ON served_exercises (user_id, id)")
+
+    # --- History of a user ---
+    def _history(self, user_id: str, sync: bool = True) -> UserHistory:
+        """ The in-memory index of a user, with the rows other workers added since the last sync. Call with the lock held. """
+        history = self._users.get(user_id)
+        if history is None:
+            history = self._users[user_id] = UserHistory()
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+            sync = True
+        self._users.move_to_end(user_id)
+
+        if sync:
+            rows = self._db.execute(
+                "SELECT id, memory, type, text, shingles, signature, answer FROM served_exercises WHERE user_id = ? AND id > ? ORDER BY id",
+                (str(user_id), history.last_id),
+            ).fetchall()
+            for row_id, memory, ex_type, text, hashes, sig, answer in rows:
+                history.add(row_id, memory, ex_type, text, np.frombuffer(hashes, dtype=np.uint64), np.frombuffer(sig, dtype=np.uint64), answer)
+            self.counters["loaded_rows"] += len(rows)
+        return history
+
+    # --- Public API ---
+    def to_avoid(self, user_id: str, title: str, ex_type: str, content: str, memory_id=None) -> list:
+        """ Up to avoid_max prior questions of this memory, the most relevant to the slot content first. """
+        hashes = set(shingles(content).tolist())
+        with self._lock:
+            history = self._history(user_id)
+            positions = history.by_memory.get(memory_key(title, memory_id), [])
+            scored = []
+            for position in positions:
+                _, entry_type, text, entry_hashes, _, _ = history.entries[position]
+                # Share of the question that is about this slot's content, plus the same exercise type
+                overlap = len(hashes.intersection(entry_hashes.tolist())) / max(1, len(entry_hashes))
+                scored.append((overlap + (0.25 if entry_type == ex_type else 0), position, text))
+            if scored:
+                self.counters["avoid_lists"] += 1
+        scored.sort(reverse=True)
+        # An exercise served again (last attempt still a repeat) is listed once
+        return list(dict.fromkeys(text for _, _, text in scored))[:self.avoid_max]
+
+    def _repeats(self, score: float, answer: str, other_answer: str) -> bool:
+        return score >= self.identical or (score >= self.threshold and answer == other_answer)
+
+    def near_duplicate(self, user_id: str, title: str, exercise: dict, others: list = (), memory_id=None) -> tuple:
+        """
+        (text, similarity) of the served exercise of this memory (or of one of
+        `others`, the exercises of the same set) the candidate repeats, or None.
+        """
+        sig = signature(exercise_shingles(exercise))
+        answer = answer_key(exercise)
+        memory = memory_key(title, memory_id)
+        best = None
+        with self._lock:
+            self.counters["checked"] += 1
+            history = self._history(user_id, sync=False)
+            for position in history.candidates(memory, sig):
+                _, _, text, _, entry_sig, entry_answer = history.entries[position]
+                score = similarity(sig, entry_sig)
+                if self._repeats(score, answer, entry_answer) and (best is None or score > best[1]):
+                    best = (text, score)
+        for other in others:
+            score = similarity(sig, signature(exercise_shingles(other)))
+            if self._repeats(score, answer, answer_key(other)) and (best is None or score > best[1]):
+                best = (describe(other), score)
+        if best is not None:
+            with self._lock:
+                self.counters["rejected"] += 1
+        return best
+
+    def record(self, user_id: str, title: str, exercises: list, memory_id=None):
+        """ Adds the exercises served in a session to the user's history. """
+        memory = memory_key(title, memory_id)
+        rows = []
+        for exercise in exercises:
+            hashes = exercise_shingles(exercise)
+            rows.append((memory, exercise.get("type", ""), describe(exercise), hashes, signature(hashes), answer_key(exercise)))
+        if not rows:
+            return
+        with self._lock:
+            history = self._history(user_id)
+            now = time.time()
+            for memory, ex_type, text, hashes, sig, answer in rows:
+                row_id = self._db.execute(
+                    "INSERT INTO served_exercises (user_id, memory, type, text, answer, shingles, signature, served_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (str(user_id), memory, ex_type, text, answer, hashes.tobytes(), sig.tobytes(), now),
+                ).lastrowid
+                history.add(row_id, memory, ex_type, text, hashes, sig, answer)
+            self.counters["recorded"] += len(rows)
+
+    def forget(self, user_id: str) -> int:
+        """ Deletes the history of a user. Returns how many exercises. """
+        with self._lock:
+            self._users.pop(user_id, None)
+            return self._db.execute("DELETE FROM served_exercises WHERE user_id = ?", (str(user_id),)).rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+            stats["users_in_memory"] = len(self._users)
+        return stats
+
+
+def avoid_text(questions: list) -> str:
+    """ content_to_avoid of a generator prompt ("" when there is nothing to avoid). """
+    if not questions:
+        return ""
+    return AVOID_HEADER + "\n" + "\n".join(f"- {question}" for question in questions)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_novelty_index():
+    """
+    Returns the process-wide novelty index configured from .env, or None when it
+    is off (NOVELTY=0). NOVELTY_DB is the shared file (database/novelty.db by default).
+    """
+    global _index
+    if _index is None and os.getenv("NOVELTY", "1") == "1":
+        with _index_lock:
+            if _index is None:
+                backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+                _index = NoveltyIndex(os.getenv("NOVELTY_DB", os.path.join(backend_dir, "database", "novelty.db")))
+    return _index
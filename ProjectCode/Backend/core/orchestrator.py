@@ -1,12 +1,22 @@
 from shutil import ExecError
 from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
+import contextvars
 
 from core.selector import selector
+from core import chunker
+from core.config_registry import ConfigRegistry
+from core.llm_cache import get_cache
+from core.deadline import Deadline, budget_for, use_deadline
+from core.fallback import fallback_exercise
+from core.novelty import get_novelty_index, avoid_text
 from agents.exercise.multiple_choice import MultipleChoiceAgent
 from agents.exercise.fill_in_the_blank import FillInTheBlankAgent
 from agents.exercise.ordering import OrderingAgent
 from agents.validation.verificador import VerificadorAgent
 from agents.validation.corrector import CorrectorAgent
+from agents.validation.rules import get_rule_engine
 
 from utils.email_sender import send_alert_email
 
@@ -15,10 +25,10 @@ import os
 import yaml
 import random
 import math
-
+import time
 
 class Orchestrator:
-    def __init__(self):
+    def __init__(self, max_concurrency: int = None):
         """ Initializes the orchestrator, loading agents and configurations. """
         print("\033[93m[orchestrator]\033[0m orquestrator initialized")
         # 1.1) Path to config file with agents info
@@ -49,6 +59,18 @@ class Orchestrator:
         }
 
 
+        # 1.5) Max number of slots generated at the same time (SLOT_MAX_CONCURRENCY in .env)
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv("SLOT_MAX_CONCURRENCY", "3"))
+        self.max_concurrency = max_concurrency
+
+        # 1.6) Validate all the slots of a round with one verificador call (BATCH_VALIDATION in .env)
+        self.batch_validation = os.getenv("BATCH_VALIDATION", "1") == "1"
+        self.max_attempts = 3
+
+        # 1.7) Per-user history of served exercises (core/novelty.py, NOVELTY in .env)
+        self.novelty = get_novelty_index()
+
         # 2.1) Difficulty levels:
         self.difficulty_levels = ["fácil", "media", "difícil"]
 
@@ -62,10 +84,87 @@ class Orchestrator:
             "ordering": {"type", "question", "options", "correct_answer", "hint", "difficulty"}
         }
 
+    # --- Warm-up ---
+    def warm_up(self, ping: bool = False, llm: bool = True) -> Dict[str, Any]:
+        """
+        Does the one-time work of the first request at boot: parses the YAML
+        configs, builds every task once (so a broken config fails here and not
+        on a user request), creates the LLM clients and the shared caches.
+        With `ping`, also sends one tiny request to the LLM provider.
+
+        With `llm=False` only the configs and caches are loaded: crewai and the
+        LLM clients are left for the first LLM call (a worker that mostly serves
+        non-LLM routes never imports them).
+        """
+        print("\033[93m[orchestrator]\033[0m Warming up")
+        registry = ConfigRegistry.get(self.config_path)
+
+        if not llm and not ping:
+            task_names = registry.task_names()
+            for task_name in task_names:
+                registry.profile(registry.task_template(task_name)["agent"])
+            get_cache()
+            get_rule_engine()
+            return {"tasks": len(task_names), "llms": 0}
+
+        # One LLM client per agent profile and backend (agents.yaml `profile:`)
+        llms = {}
+        for agent_name in registry.agent_names():
+            profile = registry.profile(agent_name)
+            llms[agent_name] = [registry.llm_for(profile, backend) for backend in profile["backends"]]
+
+        task_names = registry.task_names()
+        for task_name in task_names:
+            agent_name = registry.task_template(task_name)["agent"]
+            registry.build(agent_name, task_name, llms[agent_name][0])
+
+        get_cache()
+        get_rule_engine()
+
+        report = {"tasks": len(task_names), "llms": len({id(llm) for agent_llms in llms.values() for llm in agent_llms})}
+        if ping:
+            start = time.perf_counter()
+            next(iter(llms.values()))[0].call([{"role": "user", "content": "ping"}])
+            report["ping_ms"] = int((time.perf_counter() - start) * 1000)
+        return report
+
     # --- Main pipeline ---
-    def run_pipeline(self, title: str, description: str, analysis: str, user_id: str) -> Dict[str, Any]:
-        """ Main pipeline to orchestrate the selection, generation, and validation of exercises. """
+    def run_pipeline(self, title: str, description: str, analysis: str, user_id: str, deadline: Deadline = None, on_event=None, selector: str = None, memory_id=None) -> Dict[str, Any]:
+        """
+        Main pipeline to orchestrate the selection, generation, and validation of exercises.
+
+        Returns {"exercises": [...], "slots": [...], "timing": {...}} where every slot
+        reports its provenance (llm-validated, llm-unvalidated or fallback) and timing.
+        If `deadline` expires, the unfinished slots are filled with fallback exercises.
+
+        `on_event(dict)` is called with progress events (selector_done, slot_generating,
+        slot_retry, exercise, summary); each exercise is emitted as soon as it is final.
+
+        `selector` picks the content selector of this request ("llm" / "local", see core.selector).
+        `memory_id` tags the selection it stores, so editing or deleting the memory drops it,
+        and keys the memory in the user's novelty history (the title when it is None).
+        """
         print("\033[93m[orchestrator]\033[0m Running generation pipeline")
+        if deadline is None:
+            deadline = Deadline(budget_for("generate_exercise"))
+
+        with use_deadline(deadline):
+            result = self._run_pipeline(title, description, analysis, user_id, deadline, on_event, selector, memory_id)
+
+        self.emit(on_event, "summary", slots=result["slots"], timing=result["timing"])
+        return result
+
+    def emit(self, on_event, event: str, **data):
+        """ Sends a progress event to the caller; a failing listener never breaks the pipeline. """
+        if on_event is None:
+            return
+        try:
+            on_event(dict(data, event=event))
+        except Exception as e:
+            print(f"\033[93m[orchestrator]\033[0m Event listener failed on {event}: {e}")
+
+    def _run_pipeline(self, title: str, description: str, analysis: str, user_id: str, deadline: Deadline, on_event=None, selector: str = None, memory_id=None) -> Dict[str, Any]:
+        timing = {"budget_ms": deadline.budget_ms}
 
         # A) Get distribution first (needed to select different content per slot)
         difficulty = self.get_difficulties(user_id)
@@ -73,65 +172,377 @@ class Orchestrator:
 
         
         if distribution is None:
-            # All exercises difficulty under the treshold - contact with caretaker
-            return []
+            # All exercises difficulty under the treshold - contact with caretaker
+            timing["elapsed_ms"] = deadline.elapsed_ms()
+            return {"exercises": [], "slots": [], "timing": timing}
 
 
         print("\033[93m[orchestrator]\033[0m Difficulty: ", difficulty)
 
-        # B) Select different content for each slot in the distribution
-        selected = self.selector.select(title, description, analysis, distribution)
+        # B) Select different content for each slot in the distribution (or reuse the one of a previous session)
+        timing["selector"] = self.selector.mode(selector)
+        selected = self.selector.cached(title, description, analysis, distribution, timing["selector"])
+        timing["selector_cached"] = selected is not None
+        if selected is None:
+            selected = self.selector.select(title, description, analysis, distribution, mode=timing["selector"], memory_id=memory_id)
+        timing["selector_ms"] = deadline.elapsed_ms()
+        self.emit(on_event, "selector_done", distribution=distribution, elapsed_ms=timing["selector_ms"])
+
+        # C) Generate + validate in rounds: each round only regenerates the slots that failed
+        slots = self.new_slots(distribution, selected, title, description)
+        self.avoid_repeats(slots, user_id, title, memory_id)
+
+        for attempt in range(self.max_attempts):
+            pending = self.pending_slots(slots, deadline)
+            if not pending:
+                break
+
+            self.generate_slots(pending, difficulty, on_event)
+
+            # D) Validate exercises (repeats of what the user already did are rejected locally)
+            verdicts = self.validate_slots(pending, user_id, title, slots, memory_id)
+            self.apply_verdicts(pending, verdicts, attempt, deadline, on_event)
+
+        # E) Provenance + fallbacks
+        result = self.finish_slots(slots, title, description, deadline, timing, on_event)
+        self.record_served(slots, user_id, title, memory_id)
+        return result
 
-        exercises = []
+    def new_slots(self, distribution: list, selected, title: str, description: str) -> list:
+        """
+        One slot per exercise of the distribution, with the content the selector chose for it,
+        cut to SLOT_MAX_TOKENS (core/chunker.py): the generator and the verificador prompts carry it.
+        """
+        return [{
+            "index": idx,
+            "type": ex_type,
+            "data": chunker.cap(selected[idx] if isinstance(selected, list) and idx < len(selected) and selected[idx] else f'{title}: {description}'),
+            "exercise": {},
+            "status": "error",
+            "feedback": "",
+            "avoid": "",
+            "attempts": 0,
+            "elapsed_ms": None
+        } for idx, ex_type in enumerate(distribution) if ex_type in self.generators]
+
+    def pending_slots(self, slots: list, deadline: Deadline) -> list:
+        """ Slots that still need a round (none once the latency budget is spent). """
+        pending = [slot for slot in slots if slot["status"] == "error"]
+        if pending and deadline.expired():
+            print("\033[93m[orchestrator]\033[0m Latency budget spent, stopping generation")
+            return []
+        return pending
+
+    def apply_verdicts(self, pending: list, verdicts: list, attempt: int, deadline: Deadline, on_event=None):
+        """ Marks the validated slots and keeps the feedback of the others for the next round. """
+        for slot, validation in zip(pending, verdicts):
+            slot["attempts"] += 1
+            slot["elapsed_ms"] = deadline.elapsed_ms()
+            if validation.get('status') == 'ok':
+                slot["status"] = 'ok'
+                slot["provenance"] = "llm-validated"
+                self.emit_exercise(on_event, slot)
+            elif attempt == self.max_attempts - 1 and validation.get("repeat"):
+                # A repeat never went through the rules nor the verificador: it gets the fallback
+                slot["status"] = 'failed - repeated'
+                slot["exercise"] = {}
+            elif attempt == self.max_attempts - 1:
+                slot["status"] = 'failed - last one chosen'
+            else:
+                print(f"\033[93m[orquestrator]\033[0m Error detected in slot {slot['index']}, feedback received: {validation.get('Analysis','')}")
+                slot["feedback"] = validation.get("Analysis", "")
+                self.emit(on_event, "slot_retry", index=slot["index"], type=slot["type"], attempt=slot["attempts"], feedback=slot["feedback"])
+
+    def finish_slots(self, slots: list, title: str, description: str, deadline: Deadline, timing: dict, on_event=None) -> Dict[str, Any]:
+        """ Fallback for every slot left without a validated exercise once the budget is spent, and the final result. """
+        budget_spent = deadline.expired()
+        for slot in slots:
+            if slot["status"] == "ok":
+                pass
+            elif budget_spent or not slot["exercise"]:
+                slot["exercise"] = fallback_exercise(slot["type"], title, description)
+                slot["provenance"] = "fallback"
+                slot["elapsed_ms"] = deadline.elapsed_ms()
+                self.emit_exercise(on_event, slot)
+            else:
+                slot["provenance"] = "llm-unvalidated"
+                self.emit_exercise(on_event, slot)
+            print(f"\033[93m[orchestrator]\033[0m Generation status of {slot['type']} (slot {slot['index']}): ", slot["status"], "|", slot["provenance"])
+
+        timing["elapsed_ms"] = deadline.elapsed_ms()
+        timing["deadline_hit"] = budget_spent
+
+        return {
+            "exercises": [slot["exercise"] for slot in slots],
+            "slots": [{
+                "index": slot["index"],
+                "type": slot["type"],
+                "provenance": slot["provenance"],
+                "attempts": slot["attempts"],
+                "elapsed_ms": slot["elapsed_ms"]
+            } for slot in slots],
+            "timing": timing
+        }
 
-        for idx, ex_type in enumerate(distribution):
-            gen = self.generators.get(ex_type)
-            if not gen:
+    def emit_exercise(self, on_event, slot: dict):
+        self.emit(on_event, "exercise", index=slot["index"], type=slot["type"], provenance=slot["provenance"],
+                  elapsed_ms=slot["elapsed_ms"], exercise=slot["exercise"])
+
+    def generate_slots(self, slots: list, difficulty: dict, on_event=None):
+        """ Generates (or regenerates) the exercise of every given slot concurrently. """
+        def generate(slot):
+            print(f"\033[93m[orchestrator]\033[0m Generating {slot['type']} (slot {slot['index']})")
+            self.emit(on_event, "slot_generating", index=slot["index"], type=slot["type"], attempt=slot["attempts"] + 1)
+            try:
+                gen = self.generators.get(slot["type"])
+                slot["exercise"] = gen.generate(slot["data"], validation=slot["feedback"], difficulty=difficulty.get(slot["type"], "media"), content_to_avoid=slot.get("avoid", ""))
+            except Exception as e:
+                # A failing slot must not take the rest of the set down with it
+                print(f"\033[93m[orchestrator]\033[0m Slot {slot['index']} failed: {e}")
+                slot["exercise"] = {}
+
+        self.run_concurrently(generate, slots)
+
+    def validate_slots(self, slots: list, user_id: str = None, title: str = None, all_slots: list = (), memory_id=None) -> list:
+        """
+        Returns one verdict per slot: repeats are rejected locally (novelty_verdicts), the
+        rest go to a single batched verificador call, or one call per slot.
+        """
+        verdicts = self.novelty_verdicts(slots, user_id, title, all_slots, memory_id)
+        fresh = [idx for idx, verdict in enumerate(verdicts) if verdict is None]
+        if not fresh:
+            return verdicts
+
+        verificador = self.validators.get('verificador')
+        items = [(slots[idx]["exercise"], slots[idx]["data"], self.structures.get(slots[idx]["type"])) for idx in fresh]
+
+        if self.batch_validation:
+            results = verificador.validate_batch(items)
+        else:
+            results = self.run_concurrently(lambda item: verificador.validate(*item), items)
+
+        for idx, verdict in zip(fresh, results):
+            verdicts[idx] = verdict or {"status": "error", "Analysis": "Error en el proceso de validación."}
+        return verdicts
+
+    # --- Novelty (core/novelty.py) ---
+    def avoid_repeats(self, slots: list, user_id: str, title: str, memory_id=None):
+        """ Gives every slot the questions already asked to this user on this memory, for the generator's content_to_avoid. """
+        if self.novelty is None or user_id is None:
+            return
+        try:
+            for slot in slots:
+                slot["avoid"] = avoid_text(self.novelty.to_avoid(user_id, title, slot["type"], str(slot["data"]), memory_id))
+        except Exception as e:
+            # Without the history the set is generated as before
+            print(f"\033[93m[orchestrator]\033[0m Novelty index unavailable: {e}")
+
+    def novelty_verdicts(self, slots: list, user_id: str, title: str, all_slots: list = (), memory_id=None) -> list:
+        """
+        An error verdict (marked "repeat") for every slot whose exercise repeats one served
+        to the user on this memory before, or another exercise of this set; None for the rest.
+        """
+        verdicts = [None] * len(slots)
+        if self.novelty is None or user_id is None:
+            return verdicts
+
+        # The exercises already accepted in this set, then each fresh one of this round
+        others = [slot["exercise"] for slot in all_slots if slot["status"] == "ok" and slot["exercise"]]
+        for idx, slot in enumerate(slots):
+            if not slot["exercise"]:
                 continue
+            try:
+                repeated = self.novelty.near_duplicate(user_id, title, slot["exercise"], others, memory_id)
+            except Exception as e:
+                print(f"\033[93m[orchestrator]\033[0m Novelty check failed: {e}")
+                repeated = None
+            if repeated is None:
+                others.append(slot["exercise"])
+                continue
+            print(f"\033[93m[orchestrator]\033[0m Slot {slot['index']} repeats a previous exercise ({repeated[1]:.2f})")
+            verdicts[idx] = {"status": "error", "repeat": True, "Analysis": f"Ejercicio repetido: ya se hizo \"{repeated[0]}\". Pregunta por otro detalle del recuerdo."}
+        return verdicts
+
+    def record_served(self, slots: list, user_id: str, title: str, memory_id=None):
+        """ Adds the generated exercises of the set (not the fallbacks) to the user's history. """
+        if self.novelty is None or user_id is None:
+            return
+        try:
+            exercises = [slot["exercise"] for slot in slots if slot.get("provenance") != "fallback" and slot["exercise"]]
+            self.novelty.record(user_id, title, exercises, memory_id)
+        except Exception as e:
+            print(f"\033[93m[orchestrator]\033[0m Could not record the served exercises: {e}")
+
+    def run_concurrently(self, fn, items: list) -> list:
+        """ Applies fn to every item on a thread pool (max_concurrency) and returns the results in order. """
+        results = [None] * len(items)
+        workers = max(1, min(self.max_concurrency, len(items)))
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="slot") as executor:
+            # Each task runs in a copy of the caller's context so it sees the request deadline
+            futures = {executor.submit(contextvars.copy_context().run, fn, item): idx for idx, item in enumerate(items)}
+
+            for future in as_completed(futures):
+                idx = futures[future]
+                try:
+                    results[idx] = future.result()
+                except Exception as e:
+                    print(f"\033[93m[orchestrator]\033[0m Slot task {idx} failed: {e}")
+
+        return results
+    
+    def correct_fill_in_the_blank(self, user_answer: str, correct_answer:str, deadline: Deadline = None):
+        """ Corrects a 'fill in the blank' exercise using the assigned agent. """
+        print("\033[93m[orchestrator]\033[0m correct_fill_in_the_blank")
+        if deadline is None:
+            deadline = Deadline(budget_for("fill_in_the_blank_correction"))
 
-            # Variables del bucle
-            status = 'error'
-            validation = {}
-            i = 0
+        with use_deadline(deadline):
+            result = self.validators.get("corrector").correct_exercise(user_answer, correct_answer)
+        return result
 
-            while status == 'error' and i < 3:
-                # C) Generate exercise using the content for this specific slot
-                print(f"\033[93m[orchestrator]\033[0m Generating {ex_type} (slot {idx})")
-                data = selected[idx] if isinstance(selected, list) and idx < len(selected) else f'{title}: {description}'
-                exercise = gen.generate(data, validation=validation.get("Analysis", ""), difficulty=difficulty.get(ex_type, "media"))
+    # --- Async pipeline ---
+    async def arun_pipeline(self, title: str, description: str, analysis: str, user_id: str, deadline: Deadline = None, on_event=None, selector: str = None, memory_id=None) -> Dict[str, Any]:
+        """
+        Async version of run_pipeline (same result and events). LLM calls go through
+        akickoff on the shared async client, so a slot waiting on the provider holds
+        no thread; at most max_concurrency slots of the set run at the same time.
+        """
+        print("\033[93m[orchestrator]\033[0m Running generation pipeline (async)")
+        if deadline is None:
+            deadline = Deadline(budget_for("generate_exercise"))
+
+        with use_deadline(deadline):
+            result = await self._arun_pipeline(title, description, analysis, user_id, deadline, on_event, selector, memory_id)
+
+        self.emit(on_event, "summary", slots=result["slots"], timing=result["timing"])
+        return result
 
-                # D) Validate exercise
-                validation = self.validators.get('verificador').validate(exercise, data, self.structures.get(ex_type))
-        
-                if validation.get('status') == 'ok':
-                    exercises.append(exercise)
-                    status = 'ok'
-                elif i == 2:
-                    exercises.append(exercise)
-                    status = 'failed - last one chosen'
-                else:
-                    print(f"\033[93m[orquestrator]\033[0m Error detected, feedback received: {validation.get('Analysis','')}")
-                    i += 1
+    async def _arun_pipeline(self, title: str, description: str, analysis: str, user_id: str, deadline: Deadline, on_event=None, selector: str = None, memory_id=None) -> Dict[str, Any]:
+        timing = {"budget_ms": deadline.budget_ms}
 
-        print(f"\033[93m[orchestrator]\033[0m Generation status of {ex_type} : ", status)
+        # The database client is synchronous: keep it off the event loop
+        difficulty = await asyncio.to_thread(self.get_difficulties, user_id)
+        distribution = self.get_distribution(difficulty)
 
-        return exercises
-    
-    def correct_fill_in_the_blank(self, user_answer: str, correct_answer:str):
-        """ Corrects a 'fill in the blank' exercise using the assigned agent. """
-        print("\033[93m[orchestrator]\033[0m correct_fill_in_the_blank")
-        result = self.validators.get("corrector").correct_exercise(user_answer, correct_answer)
+        if distribution is None:
+            timing["elapsed_ms"] = deadline.elapsed_ms()
+            return {"exercises": [], "slots": [], "timing": timing}
+
+        timing["selector"] = self.selector.mode(selector)
+        selected = await asyncio.to_thread(self.selector.cached, title, description, analysis, distribution, timing["selector"])
+        timing["selector_cached"] = selected is not None
+        if selected is None:
+            selected = await self.selector.aselect(title, description, analysis, distribution, mode=timing["selector"], memory_id=memory_id)
+        timing["selector_ms"] = deadline.elapsed_ms()
+        self.emit(on_event, "selector_done", distribution=distribution, elapsed_ms=timing["selector_ms"])
+
+        slots = self.new_slots(distribution, selected, title, description)
+        # The history lives in SQLite: loading it stays off the event loop
+        await asyncio.to_thread(self.avoid_repeats, slots, user_id, title, memory_id)
+
+        for attempt in range(self.max_attempts):
+            pending = self.pending_slots(slots, deadline)
+            if not pending:
+                break
+
+            await self.agenerate_slots(pending, difficulty, on_event)
+            verdicts = await self.avalidate_slots(pending, user_id, title, slots, memory_id)
+            self.apply_verdicts(pending, verdicts, attempt, deadline, on_event)
+
+        result = self.finish_slots(slots, title, description, deadline, timing, on_event)
+        await asyncio.to_thread(self.record_served, slots, user_id, title, memory_id)
+        return result
+
+    async def agenerate_slots(self, slots: list, difficulty: dict, on_event=None):
+        """ Async version of generate_slots. """
+        async def generate(slot):
+            print(f"\033[93m[orchestrator]\033[0m Generating {slot['type']} (slot {slot['index']})")
+            self.emit(on_event, "slot_generating", index=slot["index"], type=slot["type"], attempt=slot["attempts"] + 1)
+            try:
+                gen = self.generators.get(slot["type"])
+                slot["exercise"] = await gen.agenerate(slot["data"], validation=slot["feedback"], difficulty=difficulty.get(slot["type"], "media"), content_to_avoid=slot.get("avoid", ""))
+            except Exception as e:
+                print(f"\033[93m[orchestrator]\033[0m Slot {slot['index']} failed: {e}")
+                slot["exercise"] = {}
+
+        await self.gather_bounded(generate, slots)
+
+    async def avalidate_slots(self, slots: list, user_id: str = None, title: str = None, all_slots: list = (), memory_id=None) -> list:
+        """ Async version of validate_slots. """
+        # In-memory lookups (the history was loaded by avoid_repeats)
+        verdicts = self.novelty_verdicts(slots, user_id, title, all_slots, memory_id)
+        fresh = [idx for idx, verdict in enumerate(verdicts) if verdict is None]
+        if not fresh:
+            return verdicts
+
+        verificador = self.validators.get('verificador')
+        items = [(slots[idx]["exercise"], slots[idx]["data"], self.structures.get(slots[idx]["type"])) for idx in fresh]
+
+        if self.batch_validation:
+            results = await verificador.avalidate_batch(items)
+        else:
+            results = await self.gather_bounded(lambda item: verificador.avalidate(*item), items)
+
+        for idx, verdict in zip(fresh, results):
+            verdicts[idx] = verdict or {"status": "error", "Analysis": "Error en el proceso de validación."}
+        return verdicts
+
+    async def gather_bounded(self, fn, items: list) -> list:
+        """ Awaits fn(item) for every item, at most max_concurrency at a time; results in order. """
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+
+        async def run(idx, item):
+            async with semaphore:
+                try:
+                    return await fn(item)
+                except Exception as e:
+                    print(f"\033[93m[orchestrator]\033[0m Slot task {idx} failed: {e}")
+                    return None
+
+        return list(await asyncio.gather(*(run(idx, item) for idx, item in enumerate(items))))
+
+    async def acorrect_fill_in_the_blank(self, user_answer: str, correct_answer:str, deadline: Deadline = None):
+        """ Async version of correct_fill_in_the_blank. """
+        print("\033[93m[orchestrator]\033[0m correct_fill_in_the_blank (async)")
+        if deadline is None:
+            deadline = Deadline(budget_for("fill_in_the_blank_correction"))
+
+        with use_deadline(deadline):
+            result = await self.validators.get("corrector").acorrect_exercise(user_answer, correct_answer)
         return result
 
     # --- Adaptative Difficulty ---
 
     def get_difficulties(self, user_id, min_done:int = 3):
-        """ Calculates the difficulty levels for each exercise type based on user performance. """
+        """
+        Calculates the difficulty levels for each exercise type based on user performance.
+
+        One read of the user's counters; the level transitions of every type are
+        computed in memory and committed with a single db.apply_level_transitions call.
+        """
         print("\033[93m[orchestrator]\033[0m get_difficulties")
-        new_difficulties = {}
 
         #Read current levels from db
         scores = db.get_user_exercises_stats(user_id, self.exercise_types)
+        new_difficulties, transitions = self.plan_difficulties(scores, min_done)
+
+        if transitions:
+            db.apply_level_transitions(user_id, transitions)
+
+            # Removed exercises: alert the caretaker once the change is saved
+            for exercise_type, transition in transitions.items():
+                if transition["level"] == -1:
+                    self.alert_caretaker(user_id, exercise_type)
+
+        print("\033[93m[orchestrator]\033[0m New difficulties: ", new_difficulties)
+
+        return new_difficulties
+
+    def plan_difficulties(self, scores: dict, min_done: int = 3) -> tuple:
+        """ (difficulty per exercise type, level transitions to commit) from the user's counters, without writing anything. """
+        new_difficulties = {}
+        transitions = {}
 
         for exercise_type, data in scores.items():
             done = data["score"]["done"]
@@ -150,18 +561,20 @@ class Orchestrator:
 
             score = right / done if done > 0 else 0
 
-            new_difficulties[exercise_type] = self.adaptative_difficulty(user_id, exercise_type, current_level, score)  
+            new_level = self.adaptative_difficulty(current_level, score)
+            new_difficulties[exercise_type] = self.difficulty_levels[new_level] if new_level >= 0 else None
+            # The answers used for this decision are taken off the counters
+            transitions[exercise_type] = {"level": new_level, "done": done, "right": right}
 
-            db.reset_exercise_stats(user_id, exercise_type)
+        return new_difficulties, transitions
 
-        print("\033[93m[orchestrator]\033[0m New difficulties: ", new_difficulties)
-
-        return new_difficulties
-
-    def adaptative_difficulty(self, user_id, exercise_type:str, current_level:int, score:float, thresholds:tuple= (0.5, 0.8)):        
-        """ Adjusts the difficulty level of a specific exercise type and returns the new difficulty string. """
-        print(f"\033[93m[orchestrator]\033[0m adaptative_difficulty for {user_id} and {exercise_type}")  
+    def preview_distribution(self, user_id, min_done: int = 3):
+        """ Distribution the next session of the user would get, without committing the level transitions. """
+        scores = db.get_user_exercises_stats(user_id, self.exercise_types)
+        return self.get_distribution(self.plan_difficulties(scores, min_done)[0])
 
+    def adaptative_difficulty(self, current_level:int, score:float, thresholds:tuple= (0.5, 0.8)) -> int:
+        """ New difficulty level of an exercise type from its score (-1 = the exercise is removed). """
         # Apply action
         action = self.update_level(score, thresholds) 
         print(f"\033[93m[orchestrator]\033[0m Action: {action}")
@@ -170,20 +583,12 @@ class Orchestrator:
         # Limit level
         if new_level < 0:
             # Remove exercise
-            db.update_current_level(user_id, exercise_type, -1)
-
-            # Alert caretaker
-            self.alert_caretaker(user_id, exercise_type)
-
-            return None
+            return -1
         elif new_level >= len(self.difficulty_levels):
             # Keep the maximum
-            max_level = len(self.difficulty_levels) - 1
-            db.update_current_level(user_id, exercise_type, max_level)
-            return self.difficulty_levels[max_level]
+            return len(self.difficulty_levels) - 1
         else:
-            db.update_current_level(user_id, exercise_type, new_level)
-            return self.difficulty_levels[new_level]
+            return new_level
 
     def update_level(self, score, thresholds):
         """ Determines the direction to change the difficulty level (-1, 0, 1) based on score. """
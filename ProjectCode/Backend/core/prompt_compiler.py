@@ -0,0 +1,104 @@
+import os
+import re
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# The generator tasks explain the rules of the three levels in one prompt, one
+# section per level headed by `# SI TU DIFICULTAD ES "<level>":`. The registry
+# compiles a variant per level at load time that keeps only that section, so a
+# generator call sends the rules of its own difficulty and nothing else.
+
+SLICING_ENABLED = os.getenv("PROMPT_SLICING", "1") == "1"
+
+SECTION_HEADER = re.compile(r'^#+\s*# SI TU DIFICULTAD ES "(?P<level>[^"]+)":')
+
+
+def slice_by_difficulty(description: str) -> dict:
+    """
+    Returns {level: description with only that level's section} for a task
+    description with difficulty sections, or {} if it has none.
+
+    Sections are paragraphs (the YAML `>` scalars fold each one into a single line).
+    """
+    paragraphs = description.split("\n")
+    levels = {}
+    for idx, paragraph in enumerate(paragraphs):
+        match = SECTION_HEADER.match(paragraph.strip())
+        if match:
+            levels[match.group("level")] = idx
+
+    variants = {}
+    for level, keep in levels.items():
+        skipped = set(levels.values()) - {keep}
+        variants[level] = "\n".join(p for idx, p in enumerate(paragraphs) if idx not in skipped)
+    return variants
+
+
+# ______________________________________ Token counts ______________________________________
+
+_encoder = None
+_encoder_loaded = False
+_encoder_lock = threading.Lock()
+
+
+def _get_encoder():
+    """ tiktoken encoder of the models we use, or None (not installed / encoding not downloadable). """
+    global _encoder, _encoder_loaded
+    if not _encoder_loaded:
+        with _encoder_lock:
+            if not _encoder_loaded:
+                try:
+                    import tiktoken
+                    _encoder = tiktoken.get_encoding("o200k_base")
+                except Exception as e:
+                    print(f"\033[96m[prompt_compiler]\033[0m tiktoken unavailable, estimating tokens: {e}")
+                    _encoder = None
+                _encoder_loaded = True
+    return _encoder
+
+
+def count_tokens(text: str) -> int:
+    encoder = _get_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text))
+    # Rough estimate for Spanish text when the real tokenizer is not available
+    return max(1, round(len(text) / 4))
+
+
+def prompt_tokens(messages: list) -> int:
+    """ Tokens of a rendered prompt (see ConfigRegistry.render). """
+    return sum(count_tokens(message["content"]) for message in messages)
+
+
+def tokenizer_name() -> str:
+    return "o200k_base" if _get_encoder() is not None else "estimate"
+
+
+class PromptStats:
+    """ Prompt tokens sent per (task, variant). """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.by_prompt = {}
+
+    def record(self, task_name: str, variant, tokens: int):
+        key = f"{task_name}[{variant}]" if variant else task_name
+        with self._lock:
+            entry = self.by_prompt.setdefault(key, {"calls": 0, "tokens": 0})
+            entry["calls"] += 1
+            entry["tokens"] += tokens
+
+    def stats(self) -> dict:
+        with self._lock:
+            prompts = {key: dict(entry, avg_tokens=round(entry["tokens"] / entry["calls"], 1)) for key, entry in self.by_prompt.items()}
+        return {"slicing": SLICING_ENABLED, "tokenizer": tokenizer_name(), "prompts": prompts}
+
+
+_stats = PromptStats()
+
+
+def get_prompt_stats() -> PromptStats:
+    return _stats
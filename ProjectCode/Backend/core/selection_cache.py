@@ -0,0 +1,131 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Entries kept in the file (0 = no cap): the oldest go first
+SELECTION_CACHE_MAX_ENTRIES = int(os.getenv("SELECTION_CACHE_MAX_ENTRIES", "20000"))
+# Age after which an entry is dropped (0 = never); a memory practised again is selected again
+SELECTION_CACHE_TTL_DAYS = float(os.getenv("SELECTION_CACHE_TTL_DAYS", "30"))
+# The cap and the TTL are enforced once every PRUNE_EVERY stores of a process
+PRUNE_EVERY = 100
+
+
+def make_key(title: str, description: str, analysis, distribution: list, mode: str, version: str) -> str:
+    """ Content-addressed key of a selection: same memory, slots, selector and selector version -> same key. """
+    payload = json.dumps(
+        [title, description, analysis, list(distribution), mode, version],
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SelectionCache:
+    """
+    Persistent cache of selector outputs (one JSON list of slot contents per key).
+
+    A single SQLite file shared by every worker process, with no in-memory tier:
+    an entry invalidated by one worker is gone for all of them. Keys are content
+    hashes, so an edited memory never hits the selection of its old text; the
+    `memory_id` of an entry only lets the edit (or delete) drop what it left behind.
+    Entries older than `ttl_days` and the oldest past `max_entries` are evicted.
+    """
+
+    def __init__(self, db_path: str, max_entries: int = SELECTION_CACHE_MAX_ENTRIES, ttl_days: float = SELECTION_CACHE_TTL_DAYS):
+        print("\033[96m[selection_cache]\033[0m initialized")
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl_s = ttl_days * 86400
+
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "stores": 0, "invalidated": 0, "evicted": 0}
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._db = sqlite3.connect(db_path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS selection_cache (key TEXT PRIMARY KEY, memory_id TEXT, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS selection_cache_memory ON selection_cache (memory_id)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS selection_cache_age ON selection_cache (stored_at)")
+        with self._lock:
+            self._prune()
+
+    def _expired_before(self) -> float:
+        return time.time() - self.ttl_s if self.ttl_s > 0 else 0.0
+
+    def _prune(self):
+        """ Drops the expired entries and the oldest ones past max_entries. Call with the lock held. """
+        evicted = 0
+        if self.ttl_s > 0:
+            evicted += self._db.execute("DELETE FROM selection_cache WHERE stored_at < ?", (self._expired_before(),)).rowcount
+        if self.max_entries > 0:
+            evicted += self._db.execute(
+                "DELETE FROM selection_cache WHERE key IN (SELECT key FROM selection_cache ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+        self.counters["evicted"] += evicted
+
+    def get(self, key: str):
+        """ Returns the cached selection (list) or None; an expired entry is a miss. """
+        with self._lock:
+            row = self._db.execute("SELECT value FROM selection_cache WHERE key = ? AND stored_at >= ?", (key, self._expired_before())).fetchone()
+            self.counters["hits" if row else "misses"] += 1
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, selection: list, memory_id=None):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO selection_cache (key, memory_id, value, stored_at) VALUES (?, ?, ?, ?)",
+                (key, None if memory_id is None else str(memory_id), json.dumps(selection, ensure_ascii=False), time.time()),
+            )
+            self.counters["stores"] += 1
+            if self.counters["stores"] % PRUNE_EVERY == 0:
+                self._prune()
+
+    def invalidate(self, memory_id) -> int:
+        """ Drops every selection stored for a memory. Returns how many. """
+        with self._lock:
+            deleted = self._db.execute("DELETE FROM selection_cache WHERE memory_id = ?", (str(memory_id),)).rowcount
+            self.counters["invalidated"] += deleted
+        return deleted
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM selection_cache")
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+            stats["entries"] = self._db.execute("SELECT COUNT(*) FROM selection_cache").fetchone()[0]
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_selection_cache():
+    """
+    Returns the process-wide selection cache configured from .env, or None when
+    it is off (SELECTION_CACHE=0). SELECTION_CACHE_DB is the shared file
+    (database/selection_cache.db by default).
+    """
+    global _cache
+    if _cache is None and os.getenv("SELECTION_CACHE", "1") == "1":
+        with _cache_lock:
+            if _cache is None:
+                backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+                _cache = SelectionCache(os.getenv("SELECTION_CACHE_DB", os.path.join(backend_dir, "database", "selection_cache.db")))
+    return _cache
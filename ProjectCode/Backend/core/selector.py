@@ -1,11 +1,23 @@
+import asyncio
+import contextvars
 import json
-from crewai import Agent, Task, Crew, LLM
-import yaml
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 import os
+from core import chunker
+from core.llm_runner import kickoff, akickoff
+from core.config_registry import ConfigRegistry
+from core.selection_cache import get_selection_cache, make_key
 
 load_dotenv()
 
+SELECTOR_MODES = ("llm", "local")
+
+# Default selector of a request: "llm" (select_task) or "local" (core/local_selector.py, no LLM call)
+SELECTOR_MODE = os.getenv("SELECTOR_MODE", "llm").lower()
+# What the slots get when the LLM selector fails: "local" selection, or "copy" of the whole memory
+SELECTOR_FALLBACK = os.getenv("SELECTOR_FALLBACK", "local").lower()
+
 class selector:
     def __init__(self):
         print("\033[96m[selector]\033[0m initialized")
@@ -13,54 +25,189 @@ class selector:
         backend_dir = os.path.dirname(current_dir)
         self.config_path = os.path.join(backend_dir, "config")
 
-    def refresh(self):
-        """Recrea Agent y Task frescos para evitar contaminación entre memorias."""
-        with open(os.path.join(self.config_path, "agents.yaml"), "r") as f:
-            agents_config = yaml.safe_load(f)
+    def _request(self, title, description, analysis, distribution, priority: str = None) -> dict:
+        """ Arguments of the kickoff/akickoff call. """
+        return dict(config_path=self.config_path, agent_name="selector_agent", task_name="select_task", inputs={
+            "title": title,
+            "description": description,
+            "analysis": analysis,
+            "exercise_types": distribution
+        }, parse=json.loads, priority=priority)
 
-        llm = LLM(
-            model="gpt-4o-mini",
-            temperature=0
-        )
-        agents_config["selector_agent"]["llm"] = llm
+    @staticmethod
+    def mode(requested: str = None) -> str:
+        """ Selector of a request: `requested` ("llm" / "local") or SELECTOR_MODE. """
+        mode = (requested or SELECTOR_MODE).lower()
+        if mode not in SELECTOR_MODES:
+            print(f"\033[96m[selector]\033[0m Unknown selector '{mode}', using {SELECTOR_MODE}")
+            mode = SELECTOR_MODE if SELECTOR_MODE in SELECTOR_MODES else "llm"
+        return mode
 
-        self.selector_agent = Agent(**agents_config["selector_agent"])
+    def version(self, mode: str) -> str:
+        """ Version of a selector, part of its cache keys: the select_task templates (llm) or local_selector.VERSION. """
+        if mode == "local":
+            from core import local_selector
+            return local_selector.VERSION
+        return ConfigRegistry.get(self.config_path).version("selector_agent", "select_task")
 
-        with open(os.path.join(self.config_path, "tasks.yaml"), "r") as f:
-            tasks_config = yaml.safe_load(f)
+    def cache_key(self, title, description, analysis, distribution, mode: str = None) -> str:
+        mode = self.mode(mode)
+        return make_key(title, description, analysis, distribution, mode, self.version(mode))
 
-        tasks_config["select_task"]["agent"] = self.selector_agent
-        self.selector_task = Task(**tasks_config["select_task"])
+    def cached(self, title, description, analysis, distribution, mode: str = None):
+        """ Selection stored for this memory and distribution (core/selection_cache.py), or None. """
+        cache = get_selection_cache()
+        if cache is None:
+            return None
+        try:
+            selected = cache.get(self.cache_key(title, description, analysis, distribution, mode))
+        except Exception as e:
+            print(f"\033[96m[selector]\033[0m Selection cache unavailable: {e}")
+            return None
+        if selected is not None:
+            print("\033[96m[selector]\033[0m Selection cache hit")
+        return selected
 
-    def select(self, title, description, analysis, distribution):
-        print(f"\033[96m[selector]\033[0m Selecting content for distribution: {distribution}")
-        self.refresh()
+    def store(self, selected, title, description, analysis, distribution, mode: str = None, memory_id=None):
+        """ Saves a selection for the next sessions on the same memory; a cache error never breaks the request. """
+        cache = get_selection_cache()
+        if cache is None:
+            return
+        try:
+            cache.set(self.cache_key(title, description, analysis, distribution, mode), selected, memory_id)
+        except Exception as e:
+            print(f"\033[96m[selector]\033[0m Could not store the selection: {e}")
+
+    def prepare(self, title, description, analysis, distribution, mode: str = None, memory_id=None) -> bool:
+        """ Fills the cache for a memory ahead of its sessions. Returns True if it was already there. """
+        selected = self.cached(title, description, analysis, distribution, mode)
+        if selected is not None:
+            # Same content under another (or no) memory id: tag it with this one
+            self.store(selected, title, description, analysis, distribution, mode, memory_id)
+            return True
+        self.select(title, description, analysis, distribution, mode, memory_id=memory_id, priority="background")
+        return False
+
+    @staticmethod
+    def complete(parsed, distribution) -> bool:
+        """ Whether the LLM answered every slot itself (padded or old-format answers are not cached). """
+        return isinstance(parsed, list) and len(parsed) >= len(distribution)
+
+    def local(self, title, description, analysis, distribution) -> list:
+        """ Extractive selection without an LLM (core/local_selector.py). """
+        # numpy and the scoring code are only loaded by the first local selection
+        from core import local_selector
+        return local_selector.select(title, description, analysis, distribution)
+
+    def _fallback(self, title, description, analysis, distribution) -> list:
+        if SELECTOR_FALLBACK == "local":
+            try:
+                print("\033[96m[selector]\033[0m Falling back to the local selector")
+                return self.local(title, description, analysis, distribution)
+            except Exception as e:
+                print(f"\033[96m[selector]\033[0m Local selector failed: {e}")
+        return [f"{title}: {description}" for _ in distribution]
 
+    def _finish(self, parsed, title, description, analysis, distribution) -> list:
+        print("\033[96m[selector]\033[0m Parsed: " + str(parsed))
+
+        # Expect a JSON array, one item per slot
+        if isinstance(parsed, list):
+            if len(parsed) < len(distribution):
+                # Missing slots get the fallback content of their position
+                parsed = parsed + self._fallback(title, description, analysis, distribution)[len(parsed):]
+            return parsed
+
+        # Fallback: if returned a dict (old format), map distribution to list
+        return [parsed.get(ex_type, f"{title}: {description}") for ex_type in distribution]
+
+    def _llm(self, title, description, analysis, distribution, priority: str = None) -> tuple:
+        """ (selection, complete) of one select_task call; the fallback selection when it fails. """
         try:
-           selector_crew = Crew(
-            agents=[self.selector_agent],
-            tasks=[self.selector_task],
-            verbose=False,
-            memory=False
-           )
-
-           result = selector_crew.kickoff(inputs={
-            "title": title,
-            "description": description,
-            "analysis": analysis,
-            "exercise_types": distribution
-           })
-           print("\033[96m[selector]\033[0m Raw: " + str(result.raw))
-           result = result.raw.strip()
-           parsed = json.loads(result)
+           parsed = kickoff(**self._request(title, description, analysis, distribution, priority))
+           return self._finish(parsed, title, description, analysis, distribution), self.complete(parsed, distribution)
 
-           # Expect a JSON array, one item per slot
-           if isinstance(parsed, list):
-               return parsed
+        except Exception as e:
+            print(f"\033[96m[selector]\033[0m Error: {e}")
+            return self._fallback(title, description, analysis, distribution), False
 
-           # Fallback: if returned a dict (old format), map distribution to list
-           return [parsed.get(ex_type, f"{title}: {description}") for ex_type in distribution]
+    async def _allm(self, title, description, analysis, distribution) -> tuple:
+        try:
+           parsed = await akickoff(**self._request(title, description, analysis, distribution))
+           return self._finish(parsed, title, description, analysis, distribution), self.complete(parsed, distribution)
 
         except Exception as e:
             print(f"\033[96m[selector]\033[0m Error: {e}")
-            return [f"{title}: {description}" for _ in distribution]
+            return await asyncio.to_thread(self._fallback, title, description, analysis, distribution), False
+
+    @staticmethod
+    def _merge(parts: list, results: list, slots: int) -> tuple:
+        """ Puts the selection of every chunk back in the positions of its slots. """
+        selected, complete = [None] * slots, True
+        for (_, indexes), (content, ok) in zip(parts, results):
+            complete = complete and ok
+            for idx, value in zip(indexes, content):
+                selected[idx] = value
+        return selected, complete
+
+    def _select_chunks(self, title, description, analysis, distribution, priority: str = None) -> tuple:
+        """ Long memory: one select_task call per chosen chunk (core/chunker.py), all at the same time. """
+        parts = chunker.plan(title, description, analysis, distribution)
+        print(f"\033[96m[selector]\033[0m Long memory, selecting over {len(parts)} chunks")
+
+        def run(part):
+            text, indexes = part
+            return self._llm(title, text, analysis, [distribution[i] for i in indexes], priority)
+
+        with ThreadPoolExecutor(max_workers=len(parts), thread_name_prefix="selector") as executor:
+            # Each call runs in a copy of the caller's context so it sees the request deadline
+            futures = [executor.submit(contextvars.copy_context().run, run, part) for part in parts]
+            results = [future.result() for future in futures]
+        return self._merge(parts, results, len(distribution))
+
+    async def _aselect_chunks(self, title, description, analysis, distribution) -> tuple:
+        parts = await asyncio.to_thread(chunker.plan, title, description, analysis, distribution)
+        print(f"\033[96m[selector]\033[0m Long memory, selecting over {len(parts)} chunks (async)")
+        results = await asyncio.gather(*(self._allm(title, text, analysis, [distribution[i] for i in indexes]) for text, indexes in parts))
+        return self._merge(parts, results, len(distribution))
+
+    def select(self, title, description, analysis, distribution, mode: str = None, memory_id=None, priority: str = None):
+        """
+        Content of every slot; a clean selection (not a fallback) is stored in the selection cache.
+        Memories longer than SELECTOR_CHUNK_WORDS are selected chunk by chunk.
+        """
+        print(f"\033[96m[selector]\033[0m Selecting content for distribution: {distribution}")
+        mode = self.mode(mode)
+
+        if mode == "local":
+            selected = self.local(title, description, analysis, distribution)
+            self.store(selected, title, description, analysis, distribution, mode, memory_id)
+            return selected
+
+        if chunker.is_long(description):
+            selected, complete = self._select_chunks(title, description, analysis, distribution, priority)
+        else:
+            selected, complete = self._llm(title, description, analysis, distribution, priority)
+
+        if complete:
+            self.store(selected, title, description, analysis, distribution, mode, memory_id)
+        return selected
+
+    async def aselect(self, title, description, analysis, distribution, mode: str = None, memory_id=None):
+        print(f"\033[96m[selector]\033[0m Selecting content for distribution: {distribution} (async)")
+        mode = self.mode(mode)
+
+        # The local selector is CPU work and store() a SQLite write (and a prune now and then): off the event loop
+        if mode == "local":
+            selected = await asyncio.to_thread(self.local, title, description, analysis, distribution)
+            await asyncio.to_thread(self.store, selected, title, description, analysis, distribution, mode, memory_id)
+            return selected
+
+        if chunker.is_long(description):
+            selected, complete = await self._aselect_chunks(title, description, analysis, distribution)
+        else:
+            selected, complete = await self._allm(title, description, analysis, distribution)
+
+        if complete:
+            await asyncio.to_thread(self.store, selected, title, description, analysis, distribution, mode, memory_id)
+        return selected
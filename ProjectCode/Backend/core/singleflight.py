@@ -0,0 +1,58 @@
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent work: while a call for a key is in flight,
+    every other caller with the same key gets that call's future instead of
+    starting a new one. Works with concurrent.futures.Future and asyncio tasks.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.counters = {"leaders": 0, "coalesced": 0}
+
+    def submit(self, key: str, start):
+        """ Returns (future, coalesced): the in-flight future for `key`, or a new one from start(). """
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.counters["coalesced"] += 1
+                return future, True
+            future = start()
+            self._inflight[key] = future
+            self.counters["leaders"] += 1
+
+        future.add_done_callback(lambda done: self._forget(key, done))
+        return future, False
+
+    def do(self, key: str, fn, timeout: float = None):
+        """
+        Runs fn() in the calling thread for the first caller; concurrent callers
+        with the same key wait (at most `timeout` seconds) and get the same result.
+        Returns (result, coalesced).
+        """
+        future, coalesced = self.submit(key, Future)
+        if coalesced:
+            return future.result(timeout=timeout), True
+
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        return future.result(), False
+
+    def _forget(self, key: str, future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+        # Mark the error as retrieved: every waiter may have given up on an asyncio task
+        if not future.cancelled():
+            future.exception()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.counters, in_flight=len(self._inflight))
@@ -1,149 +1,200 @@
+import atexit
 import os
+import signal
+import threading
 from dotenv import load_dotenv
-from supabase import create_client, Client
 
+from database.models import STAT_TYPES, empty_stats, new_user_stats, stat_columns
+# The storage (and its Supabase client) is created by the first query, not on import,
+# so a worker boots without network and routes that never touch the database skip it
+from database.storage import get_storage
 
-# --- Supabase Client Initialization ---
-def init():
-    """ Initializes the Supabase client using environment variables. """
-    load_dotenv()
-    url: str = os.getenv("VITE_SUPABASE_URL")
-    key: str = os.getenv("VITE_SUPABASE_ANON_KEY")
-    client: Client = create_client(url, key)
+load_dotenv()
 
-    if client is None:
-        raise Exception("Error: supabase connect is not initialized")
+# Write-behind stat counters (see StatsBuffer); off by default, every answer is written at once
+STATS_BUFFER_ENABLED = os.getenv("STATS_BUFFER", "0") == "1"
+STATS_FLUSH_INTERVAL_S = float(os.getenv("STATS_FLUSH_INTERVAL_S", "2"))
+STATS_FLUSH_SIZE = int(os.getenv("STATS_FLUSH_SIZE", "100"))
 
-    return client
 
 # _______________ User functions  _______________
 def get_users():
     """ Retrieves all users from the database. """
     print("\033[92m[db]\033[0m get_users")
-    response = client.table("users").select("*").execute()
-    return response.data
+    return get_storage().get_users()
 
 def get_user_info(id:str):
     """ Retrieves information for a specific user by ID. """
     print("\033[92m[db]\033[0m get_user_info")
-    response = client.table("users").select("*").eq("id", id).execute()
-    return response.data
+    return get_storage().get_user(id)
 
 def get_patient_caretaker_id(user_id:str):
     """ Retrieves the caregiver (admin) ID linked to a specific patient (user). """
-    admin_id = client.table("admin_user_links").select("admin_id").eq("user_id", user_id).execute()    
-    return admin_id.data[0]["admin_id"]
+    return get_storage().get_caretaker_id(user_id)
 
 # _______________ Admin functions  _______________
 def get_admin_info(id:str):
     """ Retrieves information for a specific admin by ID. """
     print("\033[92m[db]\033[0m get_admin")
-    response = client.table("admins").select("*").eq("id", id).execute()
-    return response.data
+    return get_storage().get_admin(id)
+
+# _______________ Stats write-behind buffer  _______________
+class StatsBuffer:
+    """
+    Write-behind buffer of the exercise stat increments (STATS_BUFFER=1).
+
+    update_user_stats() only adds to an in-memory (user_id, exercise_type) ->
+    [done, right] map; a background thread sends the whole map in a single
+    increment_user_stats() call every STATS_FLUSH_INTERVAL_S seconds, or as soon
+    as STATS_FLUSH_SIZE keys are pending. The buffer is also flushed at exit and
+    for a user before any read or reset of their stats, so reads never see stale
+    counters. A failed flush puts its increments back for the next one.
+    """
+
+    def __init__(self, write, interval_s: float = STATS_FLUSH_INTERVAL_S, max_pending: int = STATS_FLUSH_SIZE):
+        print("\033[92m[db]\033[0m stats buffer initialized")
+        self._write = write
+        self.interval_s = interval_s
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        # Serializes flushes, so a read waits for the increments another flush is still writing
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self._wake = threading.Event()
+        self.counters = {"added": 0, "flushes": 0, "rows_written": 0, "failures": 0}
+        threading.Thread(target=self._run, name="stats-flush", daemon=True).start()
+
+    def add(self, user_id: str, exercise_type: str, done: int, right: int):
+        with self._lock:
+            entry = self._pending.setdefault((user_id, exercise_type), [0, 0])
+            entry[0] += done
+            entry[1] += right
+            self.counters["added"] += 1
+            full = len(self._pending) >= self.max_pending
+        if full:
+            self._wake.set()
+
+    def _take(self, user_id: str = None) -> dict:
+        with self._lock:
+            if user_id is None:
+                batch, self._pending = self._pending, {}
+                return batch
+            return {key: self._pending.pop(key) for key in [key for key in self._pending if key[0] == user_id]}
+
+    def flush(self, user_id: str = None) -> int:
+        """ Writes the pending increments (only `user_id`'s if given). Returns the rows written. """
+        with self._flush_lock:
+            batch = self._take(user_id)
+            if not batch:
+                return 0
+            try:
+                self._write([{"id": uid, "exercise_type": exercise_type, "done": done, "correct": right}
+                             for (uid, exercise_type), (done, right) in batch.items()])
+            except Exception as e:
+                with self._lock:
+                    for key, (done, right) in batch.items():
+                        entry = self._pending.setdefault(key, [0, 0])
+                        entry[0] += done
+                        entry[1] += right
+                    self.counters["failures"] += 1
+                print(f"\033[91m[db]\033[0m Stats flush failed, {len(batch)} rows kept for the next one: {e}")
+                return 0
+            with self._lock:
+                self.counters["flushes"] += 1
+                self.counters["rows_written"] += len(batch)
+            return len(batch)
+
+    def discard(self, user_id: str):
+        """ Drops the pending increments of a user (their stats row is being deleted). """
+        self._take(user_id)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval_s)
+            self._wake.clear()
+            self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self.counters, pending=len(self._pending))
+
+
+def get_stats_buffer():
+    """ The process-wide StatsBuffer, or None when STATS_BUFFER is off. """
+    return _stats_buffer
+
+
+def _flush_stats(user_id: str = None):
+    """ Makes the buffered increments (of `user_id`, or all) visible before a read or reset. """
+    if _stats_buffer is not None:
+        _stats_buffer.flush(user_id)
 
 # _______________ User stats functions  _______________
 def reset_user_stats_table():
     """ Initializes or resets the stats table for all users. """
     print("\033[92m[db]\033[0m get_user_parsed_info")
+    _flush_stats()
     users = get_users()
 
-    for i, user in enumerate(users):
-        info = {
-          "id" : user["id"], 
-          "full_name" : user["full_name"],
-          "multiple_choice_done" : 0,
-          "multiple_choice_right" : 0,
-          "fill_in_the_blank_done" : 0,
-          "fill_in_the_blank_right" : 0,
-          "ordering_done" : 0,
-          "ordering_right" : 0,
-          "multiple_choice_current_level":1,
-          "ordering_current_level":1,
-          "fill_in_the_blank_current_level":1,
-        }
-        response = client.table("user_stats").upsert(info).execute()
+    for user in users:
+        get_storage().upsert_user_stats(new_user_stats(user["id"], user["full_name"]))
 
     return {"status": "success"}
 
 def reset_user_stats(id:str):
     """ Resets all exercise stats and difficulty levels for a specific user. """
     print("\033[92m[db]\033[0m reset_user_stats")
-    response = client.table("user_stats").update({
-        "multiple_choice_done" : 0,
-        "multiple_choice_right" : 0,
-        "fill_in_the_blank_done" : 0,
-        "fill_in_the_blank_right" : 0,
-        "ordering_done" : 0,
-        "ordering_right" : 0,
-        "multiple_choice_current_level":1,
-        "ordering_current_level":1,
-        "fill_in_the_blank_current_level":1,
-    }).eq("id", id).execute()
-    return response.data
+    _flush_stats(id)
+    return get_storage().update_user_stats(id, empty_stats())
 
 def get_user_stats(id:str):
     """ Retrieves performance stats for a specific user. """
     print("\033[92m[db]\033[0m get_user_stats")
-    response = client.table("user_stats").select("*").eq("id", id).execute()
-    return response.data
+    # Buffered answers of this user must be in the row before it is read
+    _flush_stats(id)
+    return get_storage().get_user_stats(id)
 
 def add_new_user_stats(id:str):
     """ Creates a new initial stats record for a specific user. """
     print("\033[92m[db]\033[0m add_new_user_stats")
     user = get_user_info(id)
-
-    info = {
-        "id" : id,
-        "full_name" : user[0]["full_name"],
-        "multiple_choice_done" : 0,
-        "multiple_choice_right" : 0,
-        "fill_in_the_blank_done" : 0,
-        "fill_in_the_blank_right" : 0,
-        "ordering_done" : 0,
-        "ordering_right" : 0,
-        "multiple_choice_current_level":1,
-        "ordering_current_level":1,
-        "fill_in_the_blank_current_level":1,
-    }
-    response = client.table("user_stats").insert(info).execute()
-    return response.data
+    return get_storage().insert_user_stats(new_user_stats(id, user[0]["full_name"]))
 
 def delete_user_stats(id:str):
     """ Deletes the stats record of a specific user. """
     print("\033[92m[db]\033[0m delete_user_stats")
-    response = client.table("user_stats").delete().eq("id", id).execute()
-    return response.data
+    if _stats_buffer is not None:
+        _stats_buffer.discard(id)
+    return get_storage().delete_user_stats(id)
+
+def increment_user_stats(increments: list):
+    """
+    Adds [{"id", "exercise_type", "done", "correct"}] to the done/right counters in a
+    single atomic call (database/sql/increment_user_stats.sql on Supabase).
+    """
+    print(f"\033[92m[db]\033[0m increment_user_stats ({len(increments)} rows)")
+    return get_storage().increment_user_stats(increments)
 
 def update_user_stats(id:str, exercise_type:str, correct:bool):
-    """ Updates the exercise performance stats (done/right) for a specific user. """
+    """ Counts one answered exercise (done/right) for a specific user. """
     print("\033[92m[db]\033[0m update_user_stats")
-    user_stats = get_user_stats(id)
-    if not user_stats or user_stats == []:
+    if exercise_type not in STAT_TYPES:
         return
-    
-    user_stats = user_stats[0]
-    
-    if exercise_type == "multiple_choice":
-        user_stats["multiple_choice_done"] += 1
-        if correct:
-            user_stats["multiple_choice_right"] += 1
-    elif exercise_type == "fill_in_the_blank":
-        user_stats["fill_in_the_blank_done"] += 1
-        if correct:
-            user_stats["fill_in_the_blank_right"] += 1
-    elif exercise_type == "ordering":
-        user_stats["ordering_done"] += 1
-        if correct:
-            user_stats["ordering_right"] += 1
-    
-    response = client.table("user_stats").update(user_stats).eq("id", id).execute()
-    return response.data
+
+    if _stats_buffer is not None:
+        _stats_buffer.add(id, exercise_type, 1, int(correct))
+        return
+
+    return increment_user_stats([{"id": id, "exercise_type": exercise_type, "done": 1, "correct": int(correct)}])
 
 # _______________ User Exercise stats functions  _______________
 def get_user_exercises_stats(id:str, ex_types:list):
     """ Retrieves exercises stats and current difficulty level per exercise type. """
     print("\033[92m[db]\033[0m get_user_exercises_stats")
-    data = get_user_stats(id)
+    # Buffered answers of this user must be in the row before it is read
+    _flush_stats(id)
+    # Only the columns of the requested types
+    data = get_storage().get_user_stats(id, stat_columns(ex_types))
 
     if not data or data == []:
         return
@@ -169,33 +220,47 @@ def get_user_exercises_stats(id:str, ex_types:list):
 def update_current_level(id:str, ex_type:str, new_level:int) -> dict:
     """ Updates the current difficulty level for a specific exercise type. """
     print("\033[92m[db]\033[0m update_current_level")
-    response = (
-        client.table("user_stats")
-        .update({f"{ex_type}_current_level": new_level})
-        .eq("id", id)
-        .execute()
-    ) 
+    return get_storage().update_user_stats(id, {f"{ex_type}_current_level": new_level})
 
-    return response.data
+def apply_level_transitions(id:str, transitions:dict):
+    """
+    Commits the level changes of several exercise types in one atomic call
+    (database/sql/apply_level_transitions.sql on Supabase). `transitions` is {ex_type: {"level",
+    "done", "right"}}: the new level and the done/right counts it was decided on, which
+    are taken off the counters (answers that arrived since the read keep counting).
+    """
+    print("\033[92m[db]\033[0m apply_level_transitions")
+    return get_storage().apply_level_transitions(id, transitions)
 
 def reset_exercise_stats(id:str, ex_type:str):
     """ Resets the stats (done/right) for a specific exercise type. """
     print("\033[92m[db]\033[0m reset_exercise_stats")
-    response = (
-        client.table("user_stats")
-        .update({
-            f"{ex_type}_done": 0,
-            f"{ex_type}_right": 0
-        })
-        .eq("id", id)
-        .execute()
-    ) 
+    _flush_stats(id)
+    return get_storage().update_user_stats(id, {f"{ex_type}_done": 0, f"{ex_type}_right": 0})
+
+def _exit_on_sigterm():
+    """
+    Python's default SIGTERM kills the process without running atexit. A server's own
+    handler (gunicorn, uvicorn) shuts down through a normal exit and is kept; without
+    one, SIGTERM becomes SystemExit so the flush below runs. Only the main thread can
+    install it: elsewhere the buffer is lost on SIGTERM, up to STATS_FLUSH_INTERVAL_S.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        return
+    previous = signal.getsignal(signal.SIGTERM)
 
-    return response.data
+    def handler(signum, frame):
+        if callable(previous):
+            return previous(signum, frame)
+        raise SystemExit(128 + signum)
 
+    signal.signal(signal.SIGTERM, handler)
 
-# Create supabase client
-client = init()
+_stats_buffer = StatsBuffer(increment_user_stats) if STATS_BUFFER_ENABLED else None
+if _stats_buffer is not None:
+    # Shutdown writes whatever is still buffered (SIGTERM included, see _exit_on_sigterm)
+    atexit.register(_stats_buffer.flush)
+    _exit_on_sigterm()
 
 if __name__ == "__main__":
     print("\033[92m[db]\033[0m Debugging")
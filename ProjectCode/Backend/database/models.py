@@ -0,0 +1,34 @@
+"""
+Tables used by the backend and the shape of their rows.
+
+    users            (id, full_name, email)
+    admins           (id, full_name, email)          caretakers
+    admin_user_links (admin_id, user_id)             caretaker -> patient
+    user_stats       (id, full_name, <type>_done, <type>_right, <type>_current_level) per STAT_TYPES
+"""
+
+# Exercise types with done/right counters in user_stats
+STAT_TYPES = ("multiple_choice", "fill_in_the_blank", "ordering")
+
+# Level of a new user in every exercise type (index of Orchestrator.difficulty_levels; -1 = removed)
+INITIAL_LEVEL = 1
+
+
+def stat_columns(ex_types=STAT_TYPES) -> list:
+    """ user_stats columns of some exercise types. """
+    return [f"{ex_type}_{column}" for ex_type in ex_types for column in ("current_level", "done", "right")]
+
+
+def empty_stats() -> dict:
+    """ Counters and levels of a user that has not answered anything yet. """
+    stats = {}
+    for ex_type in STAT_TYPES:
+        stats[f"{ex_type}_done"] = 0
+        stats[f"{ex_type}_right"] = 0
+        stats[f"{ex_type}_current_level"] = INITIAL_LEVEL
+    return stats
+
+
+def new_user_stats(id: str, full_name: str) -> dict:
+    """ user_stats row of a new user. """
+    return dict({"id": id, "full_name": full_name}, **empty_stats())
@@ -0,0 +1,77 @@
+"""
+Seed data for local development and the storage benchmarks.
+
+generate() builds N patients with their stats rows, the caretakers (one per
+`users_per_admin` patients) and the caretaker -> patient links, deterministic
+for a given seed. Counters and levels are random but consistent (right <= done).
+
+Run from Backend/:
+    python -m database.seed 1000                  # into DB_BACKEND (sqlite)
+    python -m database.seed 1000 --backend supabase --allow-supabase
+"""
+import argparse
+import random
+import sys
+import uuid
+
+from database.models import STAT_TYPES, new_user_stats
+from database.storage import DB_BACKEND, create_storage
+
+FIRST_NAMES = ("María", "José", "Carmen", "Antonio", "Lucía", "Manuel", "Pilar", "Francisco", "Rosa", "Juan", "Elena", "Luis")
+LAST_NAMES = ("García", "Fernández", "López", "Martínez", "Sánchez", "Pérez", "Gómez", "Martín", "Jiménez", "Ruiz")
+
+
+def generate(n_users: int, seed: int = 0, users_per_admin: int = 5) -> dict:
+    """ {"users", "admins", "admin_user_links", "user_stats"}: rows for each table. """
+    rng = random.Random(seed)
+
+    def new_id() -> str:
+        return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+    def person() -> dict:
+        full_name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}"
+        return {"id": new_id(), "full_name": full_name, "email": f"{full_name.lower().replace(' ', '.')}.{rng.randrange(10**6)}@example.com"}
+
+    users = [person() for _ in range(n_users)]
+    admins = [person() for _ in range(max(1, -(-n_users // users_per_admin)))]
+    links = [{"admin_id": admins[i // users_per_admin]["id"], "user_id": user["id"]} for i, user in enumerate(users)]
+
+    stats = []
+    for user in users:
+        row = new_user_stats(user["id"], user["full_name"])
+        for ex_type in STAT_TYPES:
+            done = rng.randrange(0, 6)
+            row[f"{ex_type}_done"] = done
+            row[f"{ex_type}_right"] = rng.randint(0, done)
+            row[f"{ex_type}_current_level"] = rng.randrange(0, 3)
+        stats.append(row)
+
+    return {"users": users, "admins": admins, "admin_user_links": links, "user_stats": stats}
+
+
+def seed(storage, n_users: int, seed: int = 0, batch_size: int = 500) -> dict:
+    """ Writes generate(n_users, seed) into a storage. Returns the rows per table. """
+    data = generate(n_users, seed)
+    # Parents first: on Supabase the links and stats reference users/admins
+    for table in ("users", "admins", "admin_user_links", "user_stats"):
+        rows = data[table]
+        for i in range(0, len(rows), batch_size):
+            storage.insert_rows(table, rows[i:i + batch_size])
+    return {table: len(rows) for table, rows in data.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill a storage with generated users, caretakers and stats")
+    parser.add_argument("users", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backend", default=None, help="supabase or sqlite (DB_BACKEND by default)")
+    parser.add_argument("--allow-supabase", action="store_true", help="really write the fake rows into the Supabase project")
+    args = parser.parse_args()
+
+    if (args.backend or DB_BACKEND).lower() == "supabase" and not args.allow_supabase:
+        sys.exit("Refusing to write seed data into Supabase without --allow-supabase")
+    storage = create_storage(args.backend)
+    if storage.name == "sqlite":
+        storage.create_schema()
+
+    print(f"\033[92m[seed]\033[0m {storage.name}: {seed(storage, args.users, args.seed)}")
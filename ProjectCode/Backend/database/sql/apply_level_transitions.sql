@@ -0,0 +1,29 @@
+-- Cambios de nivel de get_difficulties en una sola llamada (database/db.py: apply_level_transitions).
+--
+-- p_transitions = {"<tipo>": {"level": n, "done": d, "right": r}, ...}, solo con los
+-- tipos que han cambiado. Fija el nivel de cada tipo y descuenta las respuestas
+-- (done/right) que se usaron para decidirlo, en vez de ponerlas a 0: las que
+-- lleguen entre la lectura y esta escritura siguen contando para la siguiente ronda.
+--
+-- Aplicar una vez en el SQL editor de Supabase.
+
+create or replace function apply_level_transitions(p_id uuid, p_transitions jsonb)
+returns void
+language sql
+security definer
+set search_path = public
+as $$
+  update user_stats s set
+    multiple_choice_current_level   = coalesce((p_transitions->'multiple_choice'->>'level')::int,   s.multiple_choice_current_level),
+    multiple_choice_done            = s.multiple_choice_done            - coalesce((p_transitions->'multiple_choice'->>'done')::int, 0),
+    multiple_choice_right           = s.multiple_choice_right           - coalesce((p_transitions->'multiple_choice'->>'right')::int, 0),
+    fill_in_the_blank_current_level = coalesce((p_transitions->'fill_in_the_blank'->>'level')::int, s.fill_in_the_blank_current_level),
+    fill_in_the_blank_done          = s.fill_in_the_blank_done          - coalesce((p_transitions->'fill_in_the_blank'->>'done')::int, 0),
+    fill_in_the_blank_right         = s.fill_in_the_blank_right         - coalesce((p_transitions->'fill_in_the_blank'->>'right')::int, 0),
+    ordering_current_level          = coalesce((p_transitions->'ordering'->>'level')::int,          s.ordering_current_level),
+    ordering_done                   = s.ordering_done                   - coalesce((p_transitions->'ordering'->>'done')::int, 0),
+    ordering_right                  = s.ordering_right                  - coalesce((p_transitions->'ordering'->>'right')::int, 0)
+  where s.id = p_id;
+$$;
+
+grant execute on function apply_level_transitions(uuid, jsonb) to anon, authenticated, service_role;
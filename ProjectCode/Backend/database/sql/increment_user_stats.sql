@@ -0,0 +1,39 @@
+-- Incremento atómico de los contadores de ejercicios (database/db.py: increment_user_stats).
+--
+-- Recibe un array JSON de incrementos [{"id", "exercise_type", "done", "correct"}]
+-- (uno por respuesta, o ya agregados por usuario y tipo en el StatsBuffer) y los
+-- aplica en una sola sentencia: sin select previo y sin perder respuestas
+-- concurrentes del mismo paciente.
+--
+-- Aplicar una vez en el SQL editor de Supabase.
+
+create or replace function increment_user_stats(p_increments jsonb)
+returns void
+language sql
+security definer
+set search_path = public
+as $$
+  update user_stats s set
+    multiple_choice_done     = s.multiple_choice_done     + i.multiple_choice_done,
+    multiple_choice_right    = s.multiple_choice_right    + i.multiple_choice_right,
+    fill_in_the_blank_done   = s.fill_in_the_blank_done   + i.fill_in_the_blank_done,
+    fill_in_the_blank_right  = s.fill_in_the_blank_right  + i.fill_in_the_blank_right,
+    ordering_done            = s.ordering_done            + i.ordering_done,
+    ordering_right           = s.ordering_right           + i.ordering_right
+  from (
+    -- Una fila por usuario aunque el lote traiga varios tipos de ejercicio
+    select
+      x.id,
+      sum(case when x.exercise_type = 'multiple_choice'   then x.done    else 0 end) as multiple_choice_done,
+      sum(case when x.exercise_type = 'multiple_choice'   then x.correct else 0 end) as multiple_choice_right,
+      sum(case when x.exercise_type = 'fill_in_the_blank' then x.done    else 0 end) as fill_in_the_blank_done,
+      sum(case when x.exercise_type = 'fill_in_the_blank' then x.correct else 0 end) as fill_in_the_blank_right,
+      sum(case when x.exercise_type = 'ordering'          then x.done    else 0 end) as ordering_done,
+      sum(case when x.exercise_type = 'ordering'          then x.correct else 0 end) as ordering_right
+    from jsonb_to_recordset(p_increments) as x(id uuid, exercise_type text, done int, correct int)
+    group by x.id
+  ) i
+  where s.id = i.id;
+$$;
+
+grant execute on function increment_user_stats(jsonb) to anon, authenticated, service_role;
@@ -0,0 +1,38 @@
+-- Tablas que usa el backend (database/models.py), para crear un proyecto de Supabase nuevo.
+-- La versión SQLite de las mismas tablas está en database/sqlite_storage.py.
+--
+-- Después, aplicar las funciones de este mismo directorio
+-- (increment_user_stats.sql, apply_level_transitions.sql).
+
+create table if not exists users (
+  id uuid primary key,
+  full_name text,
+  email text
+);
+
+create table if not exists admins (
+  id uuid primary key,
+  full_name text,
+  email text
+);
+
+create table if not exists admin_user_links (
+  admin_id uuid not null references admins (id) on delete cascade,
+  user_id uuid not null references users (id) on delete cascade,
+  primary key (admin_id, user_id)
+);
+create index if not exists admin_user_links_user on admin_user_links (user_id);
+
+create table if not exists user_stats (
+  id uuid primary key references users (id) on delete cascade,
+  full_name text,
+  multiple_choice_done int not null default 0,
+  multiple_choice_right int not null default 0,
+  multiple_choice_current_level int not null default 1,
+  fill_in_the_blank_done int not null default 0,
+  fill_in_the_blank_right int not null default 0,
+  fill_in_the_blank_current_level int not null default 1,
+  ordering_done int not null default 0,
+  ordering_right int not null default 0,
+  ordering_current_level int not null default 1
+);
@@ -0,0 +1,158 @@
+import os
+import sqlite3
+import threading
+
+from database.models import STAT_TYPES, stat_columns
+from database.storage import Storage
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (id TEXT PRIMARY KEY, full_name TEXT, email TEXT);
+CREATE TABLE IF NOT EXISTS admins (id TEXT PRIMARY KEY, full_name TEXT, email TEXT);
+CREATE TABLE IF NOT EXISTS admin_user_links (admin_id TEXT NOT NULL, user_id TEXT NOT NULL, PRIMARY KEY (admin_id, user_id));
+CREATE INDEX IF NOT EXISTS admin_user_links_user ON admin_user_links (user_id);
+CREATE TABLE IF NOT EXISTS user_stats (
+    id TEXT PRIMARY KEY,
+    full_name TEXT,
+""" + ",\n".join(f"    {column} INTEGER NOT NULL DEFAULT {1 if column.endswith('_current_level') else 0}" for column in stat_columns()) + """
+);
+"""
+
+_COLUMNS = {
+    "users": {"id", "full_name", "email"},
+    "admins": {"id", "full_name", "email"},
+    "admin_user_links": {"admin_id", "user_id"},
+    "user_stats": {"id", "full_name", *stat_columns()},
+}
+
+
+def _check(table: str, columns) -> list:
+    """ Column names go into the SQL text, so only the known ones are accepted. """
+    unknown = set(columns) - _COLUMNS[table]
+    if unknown:
+        raise ValueError(f"Unknown columns for {table}: {sorted(unknown)}")
+    return list(columns)
+
+
+class SQLiteStorage(Storage):
+    """
+    Storage on a local SQLite file in WAL mode (DB_BACKEND=sqlite, SQLITE_DB_PATH).
+
+    One connection per thread: WAL lets readers run while a writer commits, and
+    writes that touch several columns/rows run in a single BEGIN IMMEDIATE
+    transaction, so the counters are updated atomically like the Supabase SQL functions.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, db_path: str):
+        print(f"\033[92m[sqlite_storage]\033[0m initialized ({db_path})")
+        self.db_path = db_path
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._local = threading.local()
+        self.create_schema()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_path, timeout=5, check_same_thread=False, isolation_level=None)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA busy_timeout=5000")
+            self._local.connection = connection
+        return connection
+
+    def _rows(self, sql: str, params=()) -> list:
+        return [dict(row) for row in self._connection().execute(sql, params).fetchall()]
+
+    def _transaction(self, statements: list):
+        """ Runs [(sql, params)] in one write transaction. """
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            for sql, params in statements:
+                connection.execute(sql, params)
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    # --- Users and admins ---
+    def get_users(self) -> list:
+        return self._rows("SELECT * FROM users")
+
+    def get_user(self, id: str) -> list:
+        return self._rows("SELECT * FROM users WHERE id = ?", (id,))
+
+    def get_admin(self, id: str) -> list:
+        return self._rows("SELECT * FROM admins WHERE id = ?", (id,))
+
+    def get_caretaker_id(self, user_id: str) -> str:
+        return self._rows("SELECT admin_id FROM admin_user_links WHERE user_id = ? LIMIT 1", (user_id,))[0]["admin_id"]
+
+    # --- user_stats ---
+    def get_user_stats(self, id: str, columns: list = None) -> list:
+        projection = ", ".join(_check("user_stats", columns)) if columns else "*"
+        return self._rows(f"SELECT {projection} FROM user_stats WHERE id = ?", (id,))
+
+    def _write_row(self, verb: str, row: dict) -> list:
+        columns = _check("user_stats", row)
+        self._transaction([(f"{verb} INTO user_stats ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                            [row[column] for column in columns])])
+        return [dict(row)]
+
+    def insert_user_stats(self, row: dict) -> list:
+        return self._write_row("INSERT", row)
+
+    def upsert_user_stats(self, row: dict) -> list:
+        return self._write_row("INSERT OR REPLACE", row)
+
+    def update_user_stats(self, id: str, values: dict) -> list:
+        columns = _check("user_stats", values)
+        self._transaction([(f"UPDATE user_stats SET {', '.join(f'{column} = ?' for column in columns)} WHERE id = ?",
+                            [values[column] for column in columns] + [id])])
+        return self.get_user_stats(id)
+
+    def delete_user_stats(self, id: str) -> list:
+        rows = self.get_user_stats(id)
+        self._transaction([("DELETE FROM user_stats WHERE id = ?", (id,))])
+        return rows
+
+    def increment_user_stats(self, increments: list):
+        statements = []
+        for row in increments:
+            ex_type = row["exercise_type"]
+            if ex_type not in STAT_TYPES:
+                continue
+            statements.append((f"UPDATE user_stats SET {ex_type}_done = {ex_type}_done + ?, {ex_type}_right = {ex_type}_right + ? WHERE id = ?",
+                               (row["done"], row["correct"], row["id"])))
+        self._transaction(statements)
+
+    def apply_level_transitions(self, id: str, transitions: dict):
+        statements = []
+        for ex_type, transition in transitions.items():
+            if ex_type not in STAT_TYPES:
+                continue
+            statements.append((f"UPDATE user_stats SET {ex_type}_current_level = ?, {ex_type}_done = {ex_type}_done - ?, "
+                               f"{ex_type}_right = {ex_type}_right - ? WHERE id = ?",
+                               (transition["level"], transition["done"], transition["right"], id)))
+        self._transaction(statements)
+
+    # --- Schema and seed data ---
+    def create_schema(self):
+        self._connection().executescript(SCHEMA)
+
+    def insert_rows(self, table: str, rows: list):
+        if not rows:
+            return
+        columns = _check(table, rows[0])
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany(f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                                   [[row[column] for column in columns] for row in rows])
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
@@ -0,0 +1,106 @@
+import os
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Storage behind database/db.py: "supabase" (default) or "sqlite" (local file, SQLITE_DB_PATH)
+DB_BACKEND = os.getenv("DB_BACKEND", "supabase").lower()
+
+
+class Storage:
+    """
+    Operations of the backend on users, admins, admin_user_links and user_stats.
+
+    database/db.py keeps its functions and delegates to the configured storage
+    (get_storage()). Rows are plain dicts and reads return lists of rows, like
+    the `data` of a Supabase response.
+
+    Implementations: SupabaseStorage (database/supabase_storage.py) and
+    SQLiteStorage (database/sqlite_storage.py).
+    """
+
+    name = "storage"
+
+    # --- Users and admins ---
+    def get_users(self) -> list:
+        raise NotImplementedError
+
+    def get_user(self, id: str) -> list:
+        raise NotImplementedError
+
+    def get_admin(self, id: str) -> list:
+        raise NotImplementedError
+
+    def get_caretaker_id(self, user_id: str) -> str:
+        """ admin_id linked to a patient (first link). """
+        raise NotImplementedError
+
+    # --- user_stats ---
+    def get_user_stats(self, id: str, columns: list = None) -> list:
+        """ The stats row of a user (only `columns` if given). """
+        raise NotImplementedError
+
+    def insert_user_stats(self, row: dict) -> list:
+        raise NotImplementedError
+
+    def upsert_user_stats(self, row: dict) -> list:
+        raise NotImplementedError
+
+    def update_user_stats(self, id: str, values: dict) -> list:
+        """ Sets some columns of a user's stats row; returns the updated row. """
+        raise NotImplementedError
+
+    def delete_user_stats(self, id: str) -> list:
+        raise NotImplementedError
+
+    def increment_user_stats(self, increments: list):
+        """ Atomically adds [{"id", "exercise_type", "done", "correct"}] to the counters. """
+        raise NotImplementedError
+
+    def apply_level_transitions(self, id: str, transitions: dict):
+        """ Atomically sets {ex_type: {"level", "done", "right"}}: new level, consumed counts taken off. """
+        raise NotImplementedError
+
+    # --- Schema and seed data ---
+    def create_schema(self):
+        """ Creates the tables if they do not exist. """
+        raise NotImplementedError
+
+    def insert_rows(self, table: str, rows: list):
+        """ Bulk insert, used by the seed data generator (database/seed.py). """
+        raise NotImplementedError
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def create_storage(backend: str = None) -> Storage:
+    """ New storage for a backend name ("supabase" / "sqlite"), DB_BACKEND by default. """
+    backend = (backend or DB_BACKEND).lower()
+    if backend == "sqlite":
+        from database.sqlite_storage import SQLiteStorage
+        return SQLiteStorage(os.getenv("SQLITE_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "local.db")))
+    if backend == "supabase":
+        from database.supabase_storage import SupabaseStorage
+        return SupabaseStorage()
+    raise ValueError(f"Unknown DB_BACKEND '{backend}' (supabase or sqlite)")
+
+
+def get_storage() -> Storage:
+    """ Returns the process-wide storage selected by DB_BACKEND. """
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = create_storage()
+    return _storage
+
+
+def set_storage(storage: Storage):
+    """ Replaces the process-wide storage (benchmarks, scripts). """
+    global _storage
+    with _storage_lock:
+        _storage = storage
@@ -0,0 +1,76 @@
+import os
+
+from dotenv import load_dotenv
+from supabase import create_client, Client
+
+from database.storage import Storage
+
+
+def init() -> Client:
+    """ Initializes the Supabase client using environment variables. """
+    load_dotenv()
+    url: str = os.getenv("VITE_SUPABASE_URL")
+    key: str = os.getenv("VITE_SUPABASE_ANON_KEY")
+    client: Client = create_client(url, key)
+
+    if client is None:
+        raise Exception("Error: supabase connect is not initialized")
+
+    return client
+
+
+class SupabaseStorage(Storage):
+    """
+    Storage on the Supabase project (PostgREST). The atomic counter updates are
+    the SQL functions of database/sql/, called with rpc().
+    """
+
+    name = "supabase"
+
+    def __init__(self, client=None):
+        print("\033[92m[supabase_storage]\033[0m initialized")
+        self.client = client if client is not None else init()
+
+    # --- Users and admins ---
+    def get_users(self) -> list:
+        return self.client.table("users").select("*").execute().data
+
+    def get_user(self, id: str) -> list:
+        return self.client.table("users").select("*").eq("id", id).execute().data
+
+    def get_admin(self, id: str) -> list:
+        return self.client.table("admins").select("*").eq("id", id).execute().data
+
+    def get_caretaker_id(self, user_id: str) -> str:
+        return self.client.table("admin_user_links").select("admin_id").eq("user_id", user_id).execute().data[0]["admin_id"]
+
+    # --- user_stats ---
+    def get_user_stats(self, id: str, columns: list = None) -> list:
+        return self.client.table("user_stats").select(",".join(columns) if columns else "*").eq("id", id).execute().data
+
+    def insert_user_stats(self, row: dict) -> list:
+        return self.client.table("user_stats").insert(row).execute().data
+
+    def upsert_user_stats(self, row: dict) -> list:
+        return self.client.table("user_stats").upsert(row).execute().data
+
+    def update_user_stats(self, id: str, values: dict) -> list:
+        return self.client.table("user_stats").update(values).eq("id", id).execute().data
+
+    def delete_user_stats(self, id: str) -> list:
+        return self.client.table("user_stats").delete().eq("id", id).execute().data
+
+    def increment_user_stats(self, increments: list):
+        return self.client.rpc("increment_user_stats", {"p_increments": increments}).execute().data
+
+    def apply_level_transitions(self, id: str, transitions: dict):
+        return self.client.rpc("apply_level_transitions", {"p_id": id, "p_transitions": transitions}).execute().data
+
+    # --- Schema and seed data ---
+    def create_schema(self):
+        # DDL cannot go through PostgREST: apply database/sql/*.sql in the Supabase SQL editor
+        raise NotImplementedError("Apply database/sql/schema.sql and the functions in database/sql/ in the Supabase SQL editor")
+
+    def insert_rows(self, table: str, rows: list):
+        if rows:
+            self.client.table(table).insert(rows).execute()
@@ -1,25 +1,160 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
 from core.orchestrator import Orchestrator
-import random
-import re
+from core.deadline import Deadline, DeadlineExceeded
+from core.singleflight import SingleFlight
+from core.selection_cache import get_selection_cache
+from core.fallback import fallback_multiple_choice, fallback_fill_in_the_blank, fallback_ordering
 
 class ExerciseService:
+    """
+    Shared by every request of the process (see get_exercise_service): it only
+    holds the agents and configuration, never per-request state, which lives in
+    the arguments and locals of each call.
+    """
     # _____ Default Agents Flow _____    
     def __init__(self):
         print("\033[32m[ExerciseService]\033[0m Initializing ExerciseService")
         self.orchestrator = Orchestrator()
 
-    def generate(self, user_id, title: str, description: str, analysis: str):
+        # Readiness, set once warm_up() has finished
+        self.ready = threading.Event()
+        self.warmup = {"status": "pending"}
+
+        # Duplicate generation requests (same user and memory) attach to the running pipeline
+        self.pipelines = SingleFlight("pipeline")
+        self.apipelines = SingleFlight("pipeline-async")
+
+        # Selection cache fills of created/edited memories run here, off the request threads
+        self.preprocessing = ThreadPoolExecutor(max_workers=int(os.getenv("PREPROCESS_WORKERS", "2")), thread_name_prefix="preprocess")
+
+    def warm_up(self, ping: bool = False, llm: bool = True):
+        """ Runs the boot warm-up and marks the service ready (only if it succeeds). """
+        print("\033[32m[ExerciseService]\033[0m Warming up")
+        start = time.perf_counter()
+        try:
+            report = self.orchestrator.warm_up(ping=ping, llm=llm)
+        except Exception as e:
+            print(f"\033[32m[ExerciseService]\033[0m Warm-up failed: {e}")
+            self.warmup = {"status": "failed", "error": str(e), "elapsed_ms": int((time.perf_counter() - start) * 1000)}
+            return self.warmup
+
+        self.warmup = dict(report, status="ok", elapsed_ms=int((time.perf_counter() - start) * 1000))
+        self.ready.set()
+        print(f"\033[32m[ExerciseService]\033[0m Ready: {self.warmup}")
+        return self.warmup
+
+    @staticmethod
+    def pipeline_key(user_id, title: str, description: str, selector: str = None) -> str:
+        content = json.dumps([user_id, title, description, selector], ensure_ascii=False, default=str)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def generate(self, user_id, title: str, description: str, analysis: str, deadline: Deadline = None, on_event=None, selector: str = None, memory_id=None):
+        """
+        Runs the pipeline. A request for the same (user_id, title, description) as
+        one already running waits for it and gets the same result, unless it
+        streams (`on_event`), since the running pipeline cannot replay its events.
+        """
         print("\033[32m[ExerciseService]\033[0m Generating exercises")
-        return self.orchestrator.run_pipeline(
+        run = lambda: self.orchestrator.run_pipeline(
             title=title,
             description=description,
             analysis=analysis,
-            user_id=user_id
-        ) 
+            user_id=user_id,
+            deadline=deadline,
+            on_event=on_event,
+            selector=selector,
+            memory_id=memory_id
+        )
+        if on_event is not None:
+            return run()
+
+        try:
+            result, coalesced = self.pipelines.do(self.pipeline_key(user_id, title, description, selector), run,
+                                                  timeout=deadline.remaining() if deadline is not None else None)
+        except FutureTimeoutError:
+            raise DeadlineExceeded("The pipeline this request attached to did not finish in time")
+        if coalesced:
+            print("\033[32m[ExerciseService]\033[0m Attached to the pipeline already running for this memory")
+        return result
     
-    def correct_fill_in_the_blank(self, user_answer: str, correct_answer:str):
+    async def agenerate(self, user_id, title: str, description: str, analysis: str, deadline: Deadline = None, on_event=None, selector: str = None, memory_id=None):
+        """ Async version of generate, with the same coalescing of duplicate requests. """
+        print("\033[32m[ExerciseService]\033[0m Generating exercises (async)")
+        run = lambda: self.orchestrator.arun_pipeline(
+            title=title,
+            description=description,
+            analysis=analysis,
+            user_id=user_id,
+            deadline=deadline,
+            on_event=on_event,
+            selector=selector,
+            memory_id=memory_id
+        )
+        if on_event is not None:
+            return await run()
+
+        task, coalesced = self.apipelines.submit(self.pipeline_key(user_id, title, description, selector), lambda: asyncio.ensure_future(run()))
+        if coalesced:
+            print("\033[32m[ExerciseService]\033[0m Attached to the pipeline already running for this memory")
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout=deadline.remaining() if deadline is not None else None)
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded("The pipeline this request attached to did not finish in time")
+
+    def coalescing_stats(self) -> dict:
+        return {"sync": self.pipelines.stats(), "async": self.apipelines.stats()}
+
+    # _____ Memory preprocessing _____
+    def preprocess(self, memory_id, user_id, title: str, description: str, analysis, selector: str = None) -> dict:
+        """
+        Called when a memory is created or edited: drops the selections stored for
+        its previous text and fills the selection cache in the background for the
+        distribution the user's next session would get (every exercise type when
+        the user is unknown), so that session skips the selector.
+        """
+        print(f"\033[32m[ExerciseService]\033[0m Preprocessing memory {memory_id}")
+        invalidated = self.invalidate(memory_id) if memory_id is not None else 0
+
+        orchestrator = self.orchestrator
+        distribution = list(orchestrator.exercise_types)
+        if user_id is not None:
+            try:
+                distribution = orchestrator.preview_distribution(user_id)
+            except Exception as e:
+                print(f"\033[32m[ExerciseService]\033[0m Could not read the difficulties of {user_id}: {e}")
+        if not distribution:
+            # Every exercise type is deactivated: the user gets no session to prepare
+            return {"memory_id": memory_id, "invalidated": invalidated, "distribution": None, "queued": False}
+
+        def fill():
+            try:
+                cached = orchestrator.selector.prepare(title, description, analysis, distribution, selector, memory_id=memory_id)
+                print(f"\033[32m[ExerciseService]\033[0m Memory {memory_id} preprocessed ({'already cached' if cached else 'selected'})")
+            except Exception as e:
+                print(f"\033[32m[ExerciseService]\033[0m Preprocessing of memory {memory_id} failed: {e}")
+
+        self.preprocessing.submit(fill)
+        return {"memory_id": memory_id, "invalidated": invalidated, "distribution": distribution, "queued": True}
+
+    def invalidate(self, memory_id) -> int:
+        """ Drops the cached selections of a memory (edited or deleted). Returns how many. """
+        cache = get_selection_cache()
+        return cache.invalidate(memory_id) if cache is not None else 0
+
+    def correct_fill_in_the_blank(self, user_answer: str, correct_answer:str, deadline: Deadline = None):
         print("\033[32m[ExerciseService]\033[0m Correcting fill in the blank")
-        return self.orchestrator.correct_fill_in_the_blank(user_answer, correct_answer)
+        return self.orchestrator.correct_fill_in_the_blank(user_answer, correct_answer, deadline=deadline)
+
+    async def acorrect_fill_in_the_blank(self, user_answer: str, correct_answer:str, deadline: Deadline = None):
+        print("\033[32m[ExerciseService]\033[0m Correcting fill in the blank (async)")
+        return await self.orchestrator.acorrect_fill_in_the_blank(user_answer, correct_answer, deadline=deadline)
         
     def generate_fallback_exercises(self, memory_data, count=1):
         """Generates fallback exercises dynamically if the AI fails."""
@@ -27,105 +162,12 @@ class ExerciseService:
 
         title = memory_data.get('title', 'este recuerdo')
         description = memory_data.get('user_description', '')
-        
-        # Extract words from description
-        words = re.findall(r'\b[a-zA-ZáéíóúÁÉÍÓÚñÑüÜ]+\b', description)
-        long_words = [w for w in words if len(w) > 4]
-        
-        # 1. Multiple Choice
-        if len(long_words) > 0:
-            correct_word = random.choice(long_words)
-            generic_options = ["familia", "amigos", "viaje", "comida", "casa", "fiesta", "trabajo", "regalo"]
-            options = random.sample([opt for opt in generic_options if opt.lower() != correct_word.lower()], 3) + [correct_word]
-            random.shuffle(options)
-            correct_idx = options.index(correct_word)
-            mc_exercise = {
-                "type": "multiple_choice",
-                "question": f"Sobre el recuerdo '{title}', ¿cuál de estas palabras es clave en tu historia?",
-                "options": options,
-                "correct_answer": correct_idx,
-                "hint": f"Empieza por la letra '{correct_word[0].upper()}'.",
-                "difficulty": "media"
-            }
-        else:
-            # Static fallback if description is too short
-            mc_exercise = {
-                "type": "multiple_choice",
-                "question": f"Sobre el recuerdo '{title}', ¿cómo te sentiste principalmente?",
-                "options": ["Feliz", "Nostálgico", "Tranquilo", "Emocionado"],
-                "correct_answer": 0,
-                "hint": "Casi todos los buenos recuerdos traen emociones positivas.",
-                "difficulty": "fácil"
-            }
-            
-        # 2. Fill in the blank
-        fib_exercise = None
-        if len(long_words) > 1:
-            # Take a sentence and blank a word
-            sentences = re.split(r'[.!?]+', description)
-            valid_sentences = [s.strip() for s in sentences if len(s.split()) > 3]
-            
-            if valid_sentences:
-                chosen_sentence = random.choice(valid_sentences)
-                sentence_words = re.findall(r'\b[a-zA-ZáéíóúÁÉÍÓÚñÑüÜ]+\b', chosen_sentence)
-                blanks = [w for w in sentence_words if len(w) > 4]
-                if blanks:
-                    blank_word = random.choice(blanks)
-                    # Replace the exact word in the sentence keeping punctuation
-                    question = re.sub(rf'\b{blank_word}\b', "______", chosen_sentence, count=1) + "."
-                    fib_exercise = {
-                        "type": "fill_in_the_blank",
-                        "question": question,
-                        "correct_answer": blank_word,
-                        "hint": f"La palabra tiene {len(blank_word)} letras y empieza por '{blank_word[:2]}'.",
-                        "difficulty": "difícil"
-                    }
-                    
-        if not fib_exercise:
-            # Static fallback
-            fib_exercise = {
-                "type": "fill_in_the_blank",
-                "question": f"¿Cómo de importante dirías que es este recuerdo '{title}'? (Muy importante / Algo importante)",
-                "correct_answer": "Muy importante",
-                "hint": "Probablemente tiene mucho valor para ti.",
-                "difficulty": "media"
-            }
-            
-        # 3. Ordering
-        sentences = re.split(r'[.!?]+', description)
-        valid_sentences = [s.strip() for s in sentences if len(s.split()) > 2]
-        
-        if len(valid_sentences) >= 3:
-            # Extract first 3 or 4 valid sentences
-            to_order = valid_sentences[:3]
-            correct_order = list(to_order)
-            # We need options shuffled
-            shuffled = list(to_order)
-            # Ensure it's not accidentally in the right order if possible
-            attempts = 0
-            while  shuffled == correct_order and attempts < 10:
-                random.shuffle(shuffled)
-                attempts += 1
-                
-            ord_exercise = {
-                "type": "ordering",
-                "question": f"Ordena cronológicamente estas partes de tu historia:",
-                "options": shuffled,
-                "correct_answer": correct_order,
-                "hint": "Intenta recordar cómo empezó todo.",
-                "difficulty": "difícil"
-            }
-        else:
-            ord_exercise = {
-                "type": "ordering",
-                "question": f"Normalmente, ¿cómo sucedió el evento de '{title}'?",
-                "options": ["Los preparativos", "El evento principal", "El momento posterior"],
-                "correct_answer": ["Los preparativos", "El evento principal", "El momento posterior"],
-                "hint": "Todo evento suele contar con un antes, un durante y un después.",
-                "difficulty": "media"
-            }
-            
-        fallbacks = [mc_exercise, fib_exercise, ord_exercise]
+
+        fallbacks = [
+            fallback_multiple_choice(title, description),
+            fallback_fill_in_the_blank(title, description),
+            fallback_ordering(title, description),
+        ]
         
         if count == 1:
             return {"exercises": [fallbacks[0]]}
@@ -133,5 +175,15 @@ class ExerciseService:
         return {"exercises": fallbacks[:count]}
 
 
+_service = None
+_service_lock = threading.Lock()
 
 
+def get_exercise_service() -> ExerciseService:
+    """ Process-wide ExerciseService, built on first use. """
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = ExerciseService()
+    return _service
@@ -0,0 +1,145 @@
+import contextvars
+import hashlib
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class QueueFull(Exception):
+    """ Raised when a job is submitted while the queue is at its depth limit (HTTP 429). """
+
+
+class Job:
+    """ One generation request and its result. """
+
+    def __init__(self, job_id: str, key: str, user_id: str, payload: dict):
+        self.id = job_id
+        self.key = key
+        self.user_id = user_id
+        self.payload = payload
+        self.status = "queued"
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.done = threading.Event()
+
+    def to_dict(self) -> dict:
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created,
+            "started_at": self.started,
+            "finished_at": self.finished,
+        }
+        if self.status == "done":
+            data["result"] = self.result
+        if self.status == "failed":
+            data["error"] = self.error
+        return data
+
+
+class JobQueue:
+    """
+    Bounded worker pool for exercise generation jobs.
+
+    - `runner(payload)` does the actual work; any callable works, so the pool can
+      be driven by the real ExerciseService or by a stub LLM.
+    - Identical in-flight jobs of the same user are deduplicated: the second
+      submit gets the id of the job already queued or running.
+    - At most `max_pending` jobs may be queued or running; beyond that submit()
+      raises QueueFull.
+    - Finished jobs are kept `result_ttl` seconds and then evicted.
+    """
+
+    def __init__(self, runner, max_workers: int = 4, max_pending: int = 32, result_ttl: float = 600):
+        print(f"\033[32m[JobQueue]\033[0m initialized ({max_workers} workers, {max_pending} max pending)")
+        self.runner = runner
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._inflight = {}   # dedup key -> job id
+        self.counters = {"submitted": 0, "deduplicated": 0, "rejected": 0, "done": 0, "failed": 0, "evicted": 0}
+
+    @staticmethod
+    def job_key(user_id: str, payload: dict) -> str:
+        """ Dedup key: same user asking for the same memory content. """
+        content = json.dumps([user_id, payload.get("title"), payload.get("user_description"), payload.get("ai_analysis")],
+                             sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def submit(self, user_id: str, payload: dict):
+        """ Queues a job. Returns (job, deduplicated). Raises QueueFull at the depth limit. """
+        key = self.job_key(user_id, payload)
+
+        with self._lock:
+            self._evict_expired()
+
+            job_id = self._inflight.get(key)
+            if job_id is not None:
+                self.counters["deduplicated"] += 1
+                return self._jobs[job_id], True
+
+            if len(self._inflight) >= self.max_pending:
+                self.counters["rejected"] += 1
+                raise QueueFull(f"{len(self._inflight)} jobs pending")
+
+            job = Job(uuid.uuid4().hex, key, user_id, payload)
+            self._jobs[job.id] = job
+            self._inflight[key] = job.id
+            self.counters["submitted"] += 1
+
+        self._executor.submit(contextvars.copy_context().run, self._run, job)
+        return job, False
+
+    def _run(self, job: Job):
+        job.status = "running"
+        job.started = time.time()
+        try:
+            job.result = self.runner(job.payload)
+            job.status = "done"
+        except Exception as e:
+            print(f"\033[32m[JobQueue]\033[0m Job {job.id} failed: {e}")
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished = time.time()
+            with self._lock:
+                self._inflight.pop(job.key, None)
+                self.counters[job.status] += 1
+            job.done.set()
+
+    def get(self, job_id: str) -> Job:
+        with self._lock:
+            self._evict_expired()
+            return self._jobs.get(job_id)
+
+    def wait(self, job_id: str, timeout: float) -> Job:
+        """ Long-poll: returns the job once it is finished or after `timeout` seconds. """
+        job = self.get(job_id)
+        if job is not None:
+            job.done.wait(timeout)
+        return job
+
+    def _evict_expired(self):
+        """ Drops finished jobs older than result_ttl. Must be called with the lock held. """
+        now = time.time()
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished is not None and now - job.finished > self.result_ttl]
+        for job_id in expired:
+            del self._jobs[job_id]
+        self.counters["evicted"] += len(expired)
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+            stats["pending"] = len(self._inflight)
+            stats["retained"] = len(self._jobs)
+        stats["max_pending"] = self.max_pending
+        return stats
@@ -0,0 +1,4 @@
+"""
+Behaviour tests of the backend. Run from Backend/:
+    python -m pytest tests
+"""
@@ -0,0 +1,77 @@
+"""
+Behaviour of the local fill_in_the_blank matcher (utils/answer_matcher.py):
+what it grades on its own and what it leaves to the corrector (AMBIGUOUS).
+"""
+import pytest
+
+from utils.answer_matcher import AMBIGUOUS, CORRECT, INCORRECT, damerau_levenshtein, match_answer
+
+
+@pytest.mark.parametrize("user, expected", [
+    ("playa", "playa"),
+    ("La Playa.", "playa"),
+    ("malaga", "Málaga"),
+    ("con mi hermano", "hermano"),
+    ("nada", "nada"),
+])
+def test_same_answer_is_correct(user, expected):
+    assert match_answer(user, expected) == CORRECT
+
+
+@pytest.mark.parametrize("user, expected", [
+    ("", "playa"),
+    ("   ", "playa"),
+    ("no me acuerdo", "playa"),
+    ("ni idea", "Benidorm"),
+    ("3", "4"),
+    ("1975", "1957"),
+])
+def test_empty_dont_know_and_other_numbers_are_incorrect(user, expected):
+    assert match_answer(user, expected) == INCORRECT
+
+
+@pytest.mark.parametrize("user, expected", [
+    ("bicicelta", "bicicleta"),   # swapped letters
+    ("bicileta", "bicicleta"),    # missing letter
+    ("ermanos", "hermanos"),
+    ("guitarrra", "guitarra"),    # extra letter
+])
+def test_typos_within_the_budget_are_correct(user, expected):
+    assert match_answer(user, expected) == CORRECT
+
+
+@pytest.mark.parametrize("user, expected", [
+    ("Marta", "María"),
+    ("plaza", "playa"),
+    ("color", "calor"),
+    ("marco", "marzo"),
+])
+def test_one_changed_letter_goes_to_the_corrector(user, expected):
+    # Another word as often as a typo: never graded correct locally
+    assert match_answer(user, expected) == AMBIGUOUS
+
+
+@pytest.mark.parametrize("user, expected", [
+    ("nieta", "nieto"),
+    ("flores", "flor"),
+    ("puerto", "puerta"),
+])
+def test_gender_and_plural_variants_go_to_the_corrector(user, expected):
+    assert match_answer(user, expected) == AMBIGUOUS
+
+
+@pytest.mark.parametrize("user, expected", [
+    ("pato", "gato"),        # short words have no typo budget
+    ("coche", "automóvil"),  # a synonym is for the LLM to judge
+])
+def test_other_words_go_to_the_corrector(user, expected):
+    assert match_answer(user, expected) == AMBIGUOUS
+
+
+def test_damerau_levenshtein():
+    assert damerau_levenshtein("playa", "playa", 2) == 0
+    assert damerau_levenshtein("ab", "ba", 2) == 1
+    assert damerau_levenshtein("playa", "plaza", 2) == 1
+    assert damerau_levenshtein("playa", "plaza", 2, substitution=2) == 2
+    # Past the limit it stops and answers limit + 1
+    assert damerau_levenshtein("playa", "montaña", 1) == 2
@@ -0,0 +1,128 @@
+"""
+State machine of core.backend_router.CircuitBreaker, and how BackendRouter skips
+and fails over between backends.
+"""
+import pytest
+
+from core import backend_router
+from core.backend_router import BackendRouter, CircuitBreaker, NoBackendAvailable
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(backend_router.time, "monotonic", clock)
+    return clock
+
+
+def open_breaker(clock, **kwargs) -> CircuitBreaker:
+    breaker = CircuitBreaker(failures=3, cooldown_s=30, probe_timeout_s=60, **kwargs)
+    for _ in range(3):
+        breaker.failure()
+    return breaker
+
+
+def test_closed_until_enough_consecutive_failures(clock):
+    breaker = CircuitBreaker(failures=3, cooldown_s=30)
+    breaker.failure()
+    breaker.failure()
+    breaker.success()
+    breaker.failure()
+    breaker.failure()
+    assert breaker.state == "closed" and breaker.allow()
+
+    breaker.failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_half_open_lets_a_single_probe_through_after_the_cooldown(clock):
+    breaker = open_breaker(clock)
+    clock.now += 29
+    assert not breaker.allow()
+
+    clock.now += 1
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()
+
+
+def test_probe_success_closes_the_circuit(clock):
+    breaker = open_breaker(clock)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == "closed"
+    assert breaker.allow() and breaker.allow()
+
+
+def test_probe_failure_opens_it_again(clock):
+    breaker = open_breaker(clock)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    # A new cooldown starts from the failed probe
+    clock.now += 30
+    assert breaker.allow()
+
+
+def test_cancelled_probe_lets_the_next_call_probe(clock):
+    breaker = open_breaker(clock)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.cancelled()
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+
+
+def test_silent_probe_stops_blocking_after_the_probe_timeout(clock):
+    breaker = open_breaker(clock)
+    clock.now += 30
+    assert breaker.allow()
+    clock.now += 59
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+
+
+def test_router_fails_over_and_then_skips_an_open_backend():
+    router = BackendRouter()
+    calls = []
+
+    def run(backend):
+        calls.append(backend)
+        if backend == "down":
+            raise ConnectionError("refused")
+        return f"answer from {backend}"
+
+    for _ in range(backend_router.BREAKER_FAILURES):
+        assert router.call(["down", "up"], "test", run) == "answer from up"
+    assert router.stats()["backends"]["down"]["circuit"] == "open"
+
+    calls.clear()
+    assert router.call(["down", "up"], "test", run) == "answer from up"
+    assert calls == ["up"]
+
+
+def test_router_raises_when_every_circuit_is_open():
+    router = BackendRouter()
+
+    def run(backend):
+        raise ConnectionError("refused")
+
+    for _ in range(backend_router.BREAKER_FAILURES):
+        with pytest.raises(ConnectionError):
+            router.call(["only"], "test", run)
+    with pytest.raises(NoBackendAvailable):
+        router.call(["only"], "test", run)
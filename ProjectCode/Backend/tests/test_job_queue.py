@@ -0,0 +1,109 @@
+"""
+services.job_queue.JobQueue: deduplication of in-flight jobs and the depth
+limit, which /api/jobs/generate_exercise answers with 429.
+"""
+import threading
+
+import pytest
+
+from services.job_queue import JobQueue, QueueFull
+
+
+def memory(user_id: str = "user-1", title: str = "Día de playa") -> dict:
+    return {"user_id": user_id, "title": title, "user_description": "Fui a la playa con mi nieto."}
+
+
+@pytest.fixture
+def release():
+    release = threading.Event()
+    yield release
+    release.set()
+
+
+def blocked_queue(release, max_pending: int = 4) -> JobQueue:
+    """ A queue whose jobs run until `release` is set. """
+    def runner(payload):
+        release.wait(5)
+        return {"title": payload["title"]}
+    return JobQueue(runner, max_workers=2, max_pending=max_pending, result_ttl=60)
+
+
+def test_identical_in_flight_job_is_reused(release):
+    jobs = blocked_queue(release)
+    first, deduplicated = jobs.submit("user-1", memory())
+    assert not deduplicated
+
+    again, deduplicated = jobs.submit("user-1", memory())
+    assert deduplicated and again is first
+    assert jobs.stats()["submitted"] == 1 and jobs.stats()["deduplicated"] == 1
+
+
+def test_other_user_or_memory_is_another_job(release):
+    jobs = blocked_queue(release)
+    first, _ = jobs.submit("user-1", memory())
+    other_user, deduplicated = jobs.submit("user-2", memory("user-2"))
+    assert not deduplicated and other_user is not first
+    other_memory, deduplicated = jobs.submit("user-1", memory(title="Boda de mi hija"))
+    assert not deduplicated and other_memory is not first
+
+
+def test_finished_job_is_not_reused(release):
+    jobs = blocked_queue(release)
+    release.set()
+    first, _ = jobs.submit("user-1", memory())
+    assert jobs.wait(first.id, 5).status == "done"
+    assert first.result == {"title": "Día de playa"}
+
+    second, deduplicated = jobs.submit("user-1", memory())
+    assert not deduplicated and second is not first
+
+
+def test_full_queue_rejects_new_jobs_but_not_duplicates(release):
+    jobs = blocked_queue(release, max_pending=1)
+    first, _ = jobs.submit("user-1", memory())
+
+    with pytest.raises(QueueFull):
+        jobs.submit("user-2", memory("user-2"))
+    assert jobs.stats()["rejected"] == 1
+
+    # A double tap of the running job still gets its id
+    again, deduplicated = jobs.submit("user-1", memory())
+    assert deduplicated and again is first
+
+    release.set()
+    jobs.wait(first.id, 5)
+    _, deduplicated = jobs.submit("user-2", memory("user-2"))
+    assert not deduplicated
+
+
+def test_failed_job_frees_its_place():
+    def runner(payload):
+        raise RuntimeError("LLM down")
+
+    jobs = JobQueue(runner, max_workers=1, max_pending=1)
+    job, _ = jobs.submit("user-1", memory())
+    assert jobs.wait(job.id, 5).status == "failed"
+    assert job.to_dict()["error"] == "LLM down"
+    assert jobs.stats()["pending"] == 0
+
+
+def test_endpoint_answers_429_when_the_queue_is_full(release, monkeypatch):
+    # The app builds its ExerciseService on import: no LLM clients, caches or history for this
+    for name, value in {"WARMUP_LLM": "0", "LLM_CACHE_SIZE": "0", "SELECTION_CACHE": "0", "NOVELTY": "0"}.items():
+        monkeypatch.setenv(name, value)
+    monkeypatch.delenv("LLM_CACHE_DB", raising=False)
+    flask_app = pytest.importorskip("app").app
+
+    monkeypatch.setitem(flask_app.extensions, "job_queue", blocked_queue(release, max_pending=1))
+    client = flask_app.test_client()
+
+    accepted = client.post("/api/jobs/generate_exercise", json=memory())
+    assert accepted.status_code == 202 and not accepted.get_json()["deduplicated"]
+
+    duplicate = client.post("/api/jobs/generate_exercise", json=memory())
+    assert duplicate.status_code == 202
+    assert duplicate.get_json()["job_id"] == accepted.get_json()["job_id"] and duplicate.get_json()["deduplicated"]
+
+    rejected = client.post("/api/jobs/generate_exercise", json=memory("user-2"))
+    assert rejected.status_code == 429
+    assert rejected.headers["Retry-After"] == "5"
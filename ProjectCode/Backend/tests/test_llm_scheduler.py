@@ -0,0 +1,108 @@
+"""
+core.llm_scheduler.LLMScheduler: priorities, the provider's 429s and slots of
+async callers that give up.
+"""
+import asyncio
+import threading
+
+import pytest
+
+from core import llm_scheduler
+from core.llm_scheduler import LLMScheduler, SchedulerFull
+
+
+class ProviderError(Exception):
+    def __init__(self, status_code: int, retry_after: str = None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = type("Response", (), {"headers": {"retry-after": retry_after} if retry_after else {}})()
+
+
+def scheduler(max_in_flight: int = 1) -> LLMScheduler:
+    return LLMScheduler(rpm=0, tpm=0, max_in_flight=max_in_flight)
+
+
+def take_slot(s: LLMScheduler, priority: str = "generation", order: list = None) -> threading.Event:
+    granted = threading.Event()
+
+    def grant():
+        if order is not None:
+            order.append(priority)
+        granted.set()
+
+    s.enqueue(priority, 1, grant, lambda error: None)
+    return granted
+
+
+def test_corrections_go_before_waiting_generations():
+    s = scheduler()
+    assert take_slot(s).wait(2)
+
+    order = []
+    for priority in ("background", "generation", "correction"):
+        take_slot(s, priority, order)
+    # One slot: every release lets the next waiter in
+    for granted in range(1, 4):
+        s.release()
+        for _ in range(100):
+            if len(order) == granted:
+                break
+            threading.Event().wait(0.01)
+    assert order == ["correction", "generation", "background"]
+
+
+def test_full_priority_class_is_rejected(monkeypatch):
+    monkeypatch.setattr(llm_scheduler, "LLM_QUEUE_MAX", 2)
+    s = scheduler()
+    assert take_slot(s).wait(2)
+    take_slot(s)
+    take_slot(s)
+    with pytest.raises(SchedulerFull):
+        take_slot(s)
+    # Other classes have their own queue
+    take_slot(s, "correction")
+
+
+def test_429_pauses_and_slows_down_then_retries_up_to_the_limit():
+    s = scheduler()
+    assert s.on_error(ProviderError(429, retry_after="3"), attempt=0)
+    stats = s.stats()
+    assert stats["rate_limited"] == 1 and stats["rate_scale"] == 0.5
+    assert 2.5 < stats["paused_s"] <= 3
+
+    assert not s.on_error(ProviderError(429), attempt=llm_scheduler.LLM_RATE_LIMIT_RETRIES)
+    s.on_success()
+    assert s.stats()["rate_scale"] == 0.55
+
+
+def test_only_transient_errors_are_retried():
+    s = scheduler()
+    assert s.on_error(ProviderError(503), attempt=0)
+    assert s.on_error(TimeoutError(), attempt=0)
+    assert not s.on_error(ProviderError(400), attempt=0)
+    assert not s.on_error(ValueError("not JSON"), attempt=0)
+
+
+def test_cancelled_async_waiters_never_keep_a_slot():
+    async def main():
+        s = scheduler()
+        await s.wait_turn("generation", 1)
+
+        # Cancelled while queued: it leaves the queue
+        waiting = asyncio.create_task(s.wait_turn("generation", 1))
+        await asyncio.sleep(0.05)
+        waiting.cancel()
+        await asyncio.sleep(0.05)
+        assert s.stats()["queued"]["generation"] == 0
+
+        # Granted while the loop is busy, cancelled before it resumes: the slot comes back
+        waiting = asyncio.create_task(s.wait_turn("generation", 1))
+        await asyncio.sleep(0.05)
+        s.release()
+        threading.Event().wait(0.1)
+        waiting.cancel()
+        await asyncio.sleep(0.05)
+        assert waiting.cancelled()
+        assert s.stats()["in_flight"] == 0
+
+    asyncio.run(main())
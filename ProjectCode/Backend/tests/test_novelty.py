@@ -0,0 +1,72 @@
+"""
+Repeat rules of core.novelty.NoveltyIndex: what counts as asking the same thing
+again, and whose history a candidate is checked against.
+"""
+import pytest
+
+from core.novelty import NoveltyIndex, memory_key
+
+
+def fill(question: str, answer: str) -> dict:
+    return {"type": "fill_in_the_blank", "question": question, "correct_answer": answer}
+
+
+SERVED = fill("¿Con quién fuiste a la playa de Benidorm en 1975?", "mi hermano Paco")
+REWORDED = fill("¿Quién te acompañó a la playa de Benidorm en el año 1975?", "mi hermano Paco")
+OTHER_ANSWER = fill("¿Con quién fuiste a la playa de Benidorm en 1975?", "la vecina Dolores")
+NEW = fill("¿Qué comisteis en el mercado de Vigo en 1980?", "una tortilla de patatas")
+
+LONG_QUESTION = "¿Qué llevaba la abuela Carmen a la feria de Cuenca en el verano de 1962, junto al primo Julián y la vecina Pilar?"
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = NoveltyIndex(str(tmp_path / "novelty.db"))
+    index.record("user-1", "Verano", [SERVED], memory_id="m1")
+    return index
+
+
+def test_same_question_and_answer_in_other_words_is_a_repeat(index):
+    repeated = index.near_duplicate("user-1", "Verano", REWORDED, memory_id="m1")
+    assert repeated is not None
+    assert "mi hermano Paco" in repeated[0]
+    assert repeated[1] >= index.threshold
+
+
+def test_similar_question_with_another_answer_is_new(index):
+    assert index.near_duplicate("user-1", "Verano", OTHER_ANSWER, memory_id="m1") is None
+    assert index.near_duplicate("user-1", "Verano", NEW, memory_id="m1") is None
+
+
+def test_near_identical_question_is_a_repeat_whatever_its_answer(tmp_path):
+    index = NoveltyIndex(str(tmp_path / "novelty.db"))
+    index.record("user-1", "Feria", [fill(LONG_QUESTION, "una cesta de mimbre")], memory_id="m1")
+    repeated = index.near_duplicate("user-1", "Feria", fill(LONG_QUESTION, "una cesta de flores"), memory_id="m1")
+    assert repeated is not None and repeated[1] >= index.identical
+
+
+def test_history_is_per_user_and_per_memory(index):
+    assert index.near_duplicate("user-2", "Verano", REWORDED, memory_id="m1") is None
+    # Another memory with the same title has its own history
+    assert index.near_duplicate("user-1", "Verano", REWORDED, memory_id="m2") is None
+
+
+def test_title_keys_the_memory_without_an_id(tmp_path):
+    index = NoveltyIndex(str(tmp_path / "novelty.db"))
+    index.record("user-1", "Verano", [SERVED])
+    assert index.near_duplicate("user-1", " verano ", REWORDED) is not None
+    assert memory_key("Verano", "m1") != memory_key("Verano", "m2")
+    assert memory_key("Verano") != memory_key("Verano", "m1")
+
+
+def test_repeat_of_another_exercise_of_the_same_set(tmp_path):
+    index = NoveltyIndex(str(tmp_path / "novelty.db"))
+    assert index.near_duplicate("user-1", "Verano", REWORDED, others=[SERVED]) is not None
+    assert index.near_duplicate("user-1", "Verano", OTHER_ANSWER, others=[SERVED]) is None
+
+
+def test_to_avoid_lists_the_memory_questions_recorded_by_another_worker(index, tmp_path):
+    other_worker = NoveltyIndex(str(tmp_path / "novelty.db"))
+    avoid = other_worker.to_avoid("user-1", "Verano", "fill_in_the_blank", "Fui a la playa de Benidorm en 1975.", memory_id="m1")
+    assert avoid == ["¿Con quién fuiste a la playa de Benidorm en 1975? (respuesta: mi hermano Paco)"]
+    assert other_worker.to_avoid("user-1", "Verano", "fill_in_the_blank", "playa", memory_id="m2") == []
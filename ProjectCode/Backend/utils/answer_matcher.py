@@ -0,0 +1,154 @@
+import re
+import threading
+import unicodedata
+from functools import lru_cache
+
+CORRECT = "correct"
+INCORRECT = "incorrect"
+AMBIGUOUS = "ambiguous"
+
+# Articles, possessives and prepositions a user may add or drop without changing the answer
+STOPWORDS = {
+    "el", "la", "los", "las", "lo", "un", "una", "unos", "unas",
+    "al", "del", "de", "a", "en", "con", "por", "para",
+    "mi", "mis", "tu", "tus", "su", "sus", "y",
+}
+
+# Answers that mean "I don't remember": always incorrect, no need to ask the LLM
+DONT_KNOW = {
+    "no se", "no lo se", "nose", "no me acuerdo", "no lo recuerdo", "no recuerdo", "ni idea", "nada",
+}
+
+_counters = {CORRECT: 0, INCORRECT: 0, AMBIGUOUS: 0}
+_counters_lock = threading.Lock()
+
+
+def normalize(text: str) -> str:
+    """ Accent-free, lower-case, punctuation-free, single-spaced text. """
+    text = unicodedata.normalize("NFKD", str(text or ""))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[^\w\s]", " ", text.casefold())
+    return " ".join(text.split())
+
+
+def strip_stopwords(text: str) -> str:
+    """ Removes articles/prepositions, unless that would leave nothing. """
+    words = [w for w in text.split() if w not in STOPWORDS]
+    return " ".join(words) if words else text
+
+
+def _plural_stem(word: str) -> str:
+    """ Spanish plural -> singular approximation ("casas" -> "casa", "flores" -> "flor"). """
+    if len(word) > 4 and word.endswith("es"):
+        return word[:-2]
+    if len(word) > 3 and word.endswith("s"):
+        return word[:-1]
+    return word
+
+
+def _gender_stem(word: str) -> str:
+    """ Drops the final gender vowel ("nieta"/"nieto" -> "niet"). """
+    word = _plural_stem(word)
+    if len(word) > 3 and word[-1] in "ao":
+        return word[:-1]
+    return word
+
+
+def _stems(text: str, stem) -> str:
+    return " ".join(stem(w) for w in text.split())
+
+
+def typo_budget(length: int) -> int:
+    """ Edits tolerated as typos, scaled with the length of the expected answer. """
+    # Short words stay exact: one letter already separates "gato" from "pato"
+    if length <= 4:
+        return 0
+    if length <= 7:
+        return 1
+    if length <= 11:
+        return 2
+    return 3
+
+
+def damerau_levenshtein(a: str, b: str, limit: int, substitution: int = 1) -> int:
+    """
+    Optimal-string-alignment distance (substitutions, insertions, deletions and
+    adjacent transpositions). Stops early and returns limit + 1 once the
+    distance is known to exceed `limit`. `substitution=2` prices a substitution
+    as a deletion plus an insertion, so it never fits a budget of one.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = current[0]
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else substitution
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+            row_min = min(row_min, current[j])
+
+        if row_min > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+
+    return min(previous[-1], limit + 1)
+
+
+@lru_cache(maxsize=4096)
+def _match_normalized(user: str, expected: str) -> str:
+    """ Verdict for an already normalized (user, expected) pair; memoised. """
+    if not user:
+        return INCORRECT
+
+    user_key = strip_stopwords(user)
+    expected_key = strip_stopwords(expected)
+
+    if user_key == expected_key:
+        return CORRECT
+
+    # Only once it is not the expected answer ("nada" may be the right word)
+    if user in DONT_KNOW:
+        return INCORRECT
+
+    # Different numbers ("3" vs "4") can never be a typo or a synonym
+    if user_key.isdigit() and expected_key.isdigit():
+        return INCORRECT
+
+    # Plural/singular or masculine/feminine of the same stem: "flores"/"flor" but also
+    # "casa"/"caso" or "puerta"/"puerto", different nouns. The corrector decides, and
+    # before the typo budget, which would accept the one-letter difference
+    if _stems(user_key, _gender_stem) == _stems(expected_key, _gender_stem):
+        return AMBIGUOUS
+
+    # Typos: swapped, missing or extra letters. A changed letter makes another word
+    # too often ("María"/"Marta", "playa"/"plaza", "marzo"/"marco"): the corrector decides
+    limit = typo_budget(len(expected_key))
+    if damerau_levenshtein(user_key, expected_key, limit, substitution=2) <= limit:
+        return CORRECT
+
+    # Anything else may still be a synonym, which only the LLM can judge
+    return AMBIGUOUS
+
+
+def match_answer(user_answer: str, correct_answer: str) -> str:
+    """ Local verdict for a fill_in_the_blank answer: CORRECT, INCORRECT or AMBIGUOUS (ask the LLM). """
+    verdict = _match_normalized(normalize(user_answer), normalize(correct_answer))
+    with _counters_lock:
+        _counters[verdict] += 1
+    return verdict
+
+
+def stats() -> dict:
+    """ Verdict counters and memo hits, exposed on /api/metrics. """
+    info = _match_normalized.cache_info()
+    with _counters_lock:
+        counters = dict(_counters)
+    counters["memo_hits"] = info.hits
+    counters["memo_size"] = info.currsize
+    return counters
@@ -0,0 +1,162 @@
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# One keep-alive HTTP transport for every LLM call of the process (sync and async),
+# so TCP/TLS connections to the provider are reused across slots, retries and requests.
+# httpx and openai are only imported when the first client is created (worker boot
+# does not pay for them; see utils/http_transport.py).
+
+try:
+    import h2  # noqa: F401  (httpx only speaks HTTP/2 when the h2 package is installed)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+MAX_CONNECTIONS = int(os.getenv("HTTP_POOL_MAX_CONNECTIONS", "100"))
+MAX_PER_HOST = int(os.getenv("HTTP_POOL_MAX_PER_HOST", str(MAX_CONNECTIONS)))
+KEEPALIVE_S = float(os.getenv("HTTP_POOL_KEEPALIVE_S", "60"))
+CONNECT_TIMEOUT_S = float(os.getenv("HTTP_CONNECT_TIMEOUT_S", "5"))
+READ_TIMEOUT_S = float(os.getenv("HTTP_READ_TIMEOUT_S", "120"))
+POOL_TIMEOUT_S = float(os.getenv("HTTP_POOL_TIMEOUT_S", "30"))
+HTTP2 = HTTP2_AVAILABLE and os.getenv("HTTP2", "1") == "1"
+
+
+class PoolMetrics:
+    """ Counters shared by the sync and async transports. """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {"requests": 0, "active": 0, "waits": 0, "wait_ms": 0.0, "connections_opened": 0, "connect_ms": 0.0}
+
+    def add(self, key: str, value=1):
+        with self._lock:
+            self.counters[key] += value
+
+    def tracer(self, previous=None, is_async: bool = False):
+        """ httpcore trace hook: counts new connections and the time spent opening them (TCP + TLS). """
+        started = {}
+
+        def record(event_name: str):
+            phase, _, stage = event_name.rpartition(".")
+            if phase not in ("connection.connect_tcp", "connection.start_tls"):
+                return
+            if stage == "started":
+                started[phase] = time.perf_counter()
+            elif stage == "complete" and phase in started:
+                self.add("connect_ms", (time.perf_counter() - started.pop(phase)) * 1000)
+                if phase == "connection.connect_tcp":
+                    self.add("connections_opened")
+
+        if is_async:
+            async def trace(event_name, info):
+                record(event_name)
+                if previous is not None:
+                    await previous(event_name, info)
+        else:
+            def trace(event_name, info):
+                record(event_name)
+                if previous is not None:
+                    previous(event_name, info)
+        return trace
+
+
+_metrics = PoolMetrics()
+
+
+def _limits():
+    import httpx
+    return httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS, keepalive_expiry=KEEPALIVE_S)
+
+
+def _timeout():
+    import httpx
+    return httpx.Timeout(connect=CONNECT_TIMEOUT_S, read=READ_TIMEOUT_S, write=CONNECT_TIMEOUT_S, pool=POOL_TIMEOUT_S)
+
+
+_client = None
+_async_client = None
+_clients_lock = threading.Lock()
+
+
+def get_http_client():
+    """ Process-wide sync httpx client (crewai/litellm and the OpenAI SDK clients). """
+    global _client
+    if _client is None:
+        with _clients_lock:
+            if _client is None:
+                import httpx
+                from utils.http_transport import PooledTransport
+                print(f"\033[36m[http_pool]\033[0m initialized ({MAX_CONNECTIONS} connections, http2={HTTP2})")
+                _client = httpx.Client(transport=PooledTransport(_metrics, MAX_PER_HOST, limits=_limits(), http2=HTTP2), timeout=_timeout())
+    return _client
+
+
+def get_async_http_client():
+    """ Process-wide async httpx client, used by the async LLM path from the event loop of the server. """
+    global _async_client
+    if _async_client is None:
+        with _clients_lock:
+            if _async_client is None:
+                import httpx
+                from utils.http_transport import AsyncPooledTransport
+                _async_client = httpx.AsyncClient(transport=AsyncPooledTransport(_metrics, MAX_PER_HOST, limits=_limits(), http2=HTTP2), timeout=_timeout())
+    return _async_client
+
+
+def attach_llm(llm):
+    """
+    Makes a crewai LLM send its requests through the shared clients.
+
+    LLMs routed through litellm use litellm.client_session / aclient_session.
+    crewai's native OpenAI provider keeps an OpenAI SDK client per LLM object, so
+    those are rebuilt on top of the shared httpx clients.
+    """
+    try:
+        import litellm  # crewai loads litellm lazily (and only needs it for non-native providers)
+        litellm.client_session = get_http_client()
+        litellm.aclient_session = get_async_http_client()
+    except ImportError:
+        pass
+
+    from openai import OpenAI, AsyncOpenAI
+
+    # _client, _async_client and _get_client_params() are crewai internals (see the pin in
+    # requirements.txt): if they move, the LLM keeps its own connections, and that is logged
+    if isinstance(getattr(llm, "_client", None), OpenAI) and hasattr(llm, "_get_client_params"):
+        params = llm._get_client_params()
+        llm._client = OpenAI(**params, http_client=get_http_client())
+        llm._async_client = AsyncOpenAI(**params, http_client=get_async_http_client())
+    elif getattr(llm, "provider", None) == "openai" or hasattr(llm, "_client"):
+        print(f"\033[93m[http_pool]\033[0m {type(llm).__name__} ({getattr(llm, 'model', '?')}) not attached: "
+              f"it has no OpenAI _client/_get_client_params(), so it does not use the shared pool")
+    return llm
+
+
+def _pool_state(client) -> tuple:
+    """ (open, idle) connections of a client's pool. """
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", []))
+    return len(connections), sum(1 for connection in connections if connection.is_idle())
+
+
+def stats() -> dict:
+    with _metrics._lock:
+        data = dict(_metrics.counters)
+    data["wait_ms"] = round(data["wait_ms"], 1)
+    data["connect_ms"] = round(data["connect_ms"], 1)
+    data["avg_connect_ms"] = round(data["connect_ms"] / data["connections_opened"], 2) if data["connections_opened"] else 0.0
+
+    open_connections, idle = 0, 0
+    for client in (_client, _async_client):
+        if client is not None:
+            client_open, client_idle = _pool_state(client)
+            open_connections += client_open
+            idle += client_idle
+    data.update(open_connections=open_connections, idle_connections=idle,
+                max_connections=MAX_CONNECTIONS, max_per_host=MAX_PER_HOST, http2=HTTP2)
+    return data
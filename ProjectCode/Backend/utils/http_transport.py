@@ -0,0 +1,134 @@
+"""
+httpx transports of the shared pool (utils/http_pool.py), in their own module so
+httpx is only imported when the first pooled client is created.
+"""
+import asyncio
+import threading
+import time
+
+import httpx
+
+
+def _releaser(metrics, release_slot):
+    """ Frees a request's per-host slot once, however many times it is called. """
+    lock = threading.Lock()
+    released = []
+
+    def release():
+        with lock:
+            if released:
+                return
+            released.append(True)
+        metrics.add("active", -1)
+        release_slot()
+    return release
+
+
+class _SlotStream(httpx.SyncByteStream):
+    """ Response body that frees the per-host slot of its request when it is closed. """
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            self._release()
+
+
+class _AsyncSlotStream(httpx.AsyncByteStream):
+    """ Async twin of _SlotStream. """
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._release()
+
+
+class PooledTransport(httpx.HTTPTransport):
+    """ Keep-alive transport with a per-host concurrency limit and metrics. """
+
+    def __init__(self, metrics, max_per_host: int, **kwargs):
+        super().__init__(**kwargs)
+        self.metrics = metrics
+        self.max_per_host = max_per_host
+        self._hosts = {}
+        self._hosts_lock = threading.Lock()
+
+    def _slot(self, host: str) -> threading.BoundedSemaphore:
+        with self._hosts_lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._hosts[host]
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        slot = self._slot(request.url.host)
+        if not slot.acquire(blocking=False):
+            start = time.perf_counter()
+            slot.acquire()
+            self.metrics.add("waits")
+            self.metrics.add("wait_ms", (time.perf_counter() - start) * 1000)
+
+        request.extensions["trace"] = self.metrics.tracer(request.extensions.get("trace"))
+        self.metrics.add("requests")
+        self.metrics.add("active")
+        release = _releaser(self.metrics, slot.release)
+        try:
+            response = super().handle_request(request)
+        except BaseException:
+            release()
+            raise
+        # The slot is held until the body has been read (or the response closed)
+        response.stream = _SlotStream(response.stream, release)
+        return response
+
+
+class AsyncPooledTransport(httpx.AsyncHTTPTransport):
+    """ Async twin of PooledTransport (its per-host semaphores belong to the event loop using it). """
+
+    def __init__(self, metrics, max_per_host: int, **kwargs):
+        super().__init__(**kwargs)
+        self.metrics = metrics
+        self.max_per_host = max_per_host
+        self._hosts = {}
+
+    def _slot(self, host: str):
+        if host not in self._hosts:
+            self._hosts[host] = asyncio.Semaphore(self.max_per_host)
+        return self._hosts[host]
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        slot = self._slot(request.url.host)
+        if slot.locked():
+            start = time.perf_counter()
+            await slot.acquire()
+            self.metrics.add("waits")
+            self.metrics.add("wait_ms", (time.perf_counter() - start) * 1000)
+        else:
+            await slot.acquire()
+
+        request.extensions["trace"] = self.metrics.tracer(request.extensions.get("trace"), is_async=True)
+        self.metrics.add("requests")
+        self.metrics.add("active")
+        release = _releaser(self.metrics, slot.release)
+        try:
+            response = await super().handle_async_request(request)
+        except BaseException:
+            release()
+            raise
+        response.stream = _AsyncSlotStream(response.stream, release)
+        return response
@@ -25,3 +25,31 @@ def parse_llm_json(raw_output: str) -> dict:
         return json.loads(json_str)
     except json.JSONDecodeError as e:
         raise ValueError(f"Invalid JSON format: {e}")
+
+
+def parse_llm_json_array(raw_output: str) -> list:
+    """
+    Igual que parse_llm_json pero para respuestas que deben ser un array JSON [...].
+    """
+
+    if not raw_output:
+        raise ValueError("Empty response")
+
+    # Eliminar bloques markdown ```json ... ```
+    cleaned = re.sub(r"```json|```", "", raw_output).strip()
+
+    # Extraer el bloque [...] más externo
+    match = re.search(r"\[.*\]", cleaned, re.DOTALL)
+    if not match:
+        raise ValueError("No valid JSON array found in response")
+
+    # Parsear
+    try:
+        parsed = json.loads(match.group(0))
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON format: {e}")
+
+    if not isinstance(parsed, list):
+        raise ValueError("Response is not a JSON array")
+
+    return parsed
@@ -1,4 +1,5 @@
 import { supabase } from "../supabaseClient";
+import { preprocessMemory } from "./preprocessMemory";
 
 /**
  * Handles uploading assets and creating a memory record.
@@ -49,13 +50,17 @@ const handleCreate = async (formData: any, targetDbId: string) => {
     }
 
     // 3. Insert record into the 'memories' table
-    const { error: insertError } = await supabase.from("memories").insert({
-      title: formData.title,
-      description: formData.description,
-      image: imageUrl,
-      audio: audioUrl || null,
-      user_id: targetDbId, // The Foreign Key to public.users(id)
-    });
+    const { data: created, error: insertError } = await supabase
+      .from("memories")
+      .insert({
+        title: formData.title,
+        description: formData.description,
+        image: imageUrl,
+        audio: audioUrl || null,
+        user_id: targetDbId, // The Foreign Key to public.users(id)
+      })
+      .select("id, user_id, title, description")
+      .single();
 
     if (insertError) {
       console.error("❌ Supabase DB Error:", insertError.message);
@@ -64,6 +69,9 @@ const handleCreate = async (formData: any, targetDbId: string) => {
     }
 
     console.log("✅ Success: Memory saved for ID:", targetDbId);
+
+    // 4. Let the backend prepare the exercises content (not awaited)
+    if (created) preprocessMemory(created);
     return { success: true };
     
   } catch (err) {
@@ -1,5 +1,6 @@
 import { supabase } from "../supabaseClient";
 import { toast } from "sonner";
+import { invalidateMemory } from "./preprocessMemory";
 
 export const handleDeleteMemory = async (
   id: number,
@@ -15,6 +16,7 @@ export const handleDeleteMemory = async (
     alert("Failed to delete memory. Please try again.");
   } else {
     toast.success("Memory deleted successfully!");
+    invalidateMemory(id);
     onSuccess();
   }
 };
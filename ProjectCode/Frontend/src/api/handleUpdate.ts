@@ -1,4 +1,5 @@
 import { supabase } from "../supabaseClient";
+import { preprocessMemory } from "./preprocessMemory";
 
 const handleUpdate = async (id, formData) => {
   console.log("DEBUG: Updating Memory with ID:", id, "Type:", typeof id);
@@ -68,6 +69,9 @@ const handleUpdate = async (id, formData) => {
       throw new Error("Error");
     }
 
+    // The content changed: the backend drops and refills its cached selection (not awaited)
+    preprocessMemory(data[0]);
+
     return data;
   } catch (err) {
     console.error("Supabase Update Error:", err);
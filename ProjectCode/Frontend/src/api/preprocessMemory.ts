@@ -0,0 +1,43 @@
+const API_URL = "http://localhost:5001";
+
+/**
+ * Asks the backend to prepare the exercises content of a memory after it is
+ * created or edited (selection cache), so its practice sessions start faster.
+ * Fire-and-forget: a failure never blocks saving the memory.
+ */
+export const preprocessMemory = async (memory: {
+  id: number | string;
+  user_id?: string;
+  title: string;
+  description: string;
+}) => {
+  try {
+    await fetch(`${API_URL}/api/memories/preprocess`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({
+        memory_id: memory.id,
+        user_id: memory.user_id,
+        title: memory.title,
+        user_description: memory.description,
+      }),
+    });
+  } catch (err) {
+    console.warn("Memory preprocessing skipped:", err);
+  }
+};
+
+/** Drops what the backend prepared for a deleted memory. */
+export const invalidateMemory = async (id: number | string) => {
+  try {
+    await fetch(`${API_URL}/api/memories/invalidate`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ memory_id: id }),
+    });
+  } catch (err) {
+    console.warn("Memory invalidation skipped:", err);
+  }
+};
+
+export default preprocessMemory;
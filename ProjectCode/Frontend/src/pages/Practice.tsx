@@ -49,6 +49,7 @@ const Practice = () => {
             method: "POST",
             headers: { "Content-Type": "application/json" },
             body: JSON.stringify({
+              memory_id: memory.id,
               user_id: memory.user_id,
               title: memory.title,
               user_description: memory.description,